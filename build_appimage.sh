@@ -118,6 +118,9 @@ copy_app_files() {
     cp storage_analyzer_gui.py "$BUILD_DIR/usr/bin/"
     chmod +x "$BUILD_DIR/usr/bin/storage_analyzer_gui.py"
     
+    # Shared scanner and scan daemon client modules (imported from the script's directory)
+    cp storage_scanner.py storage_snapshot.py storage_daemon.py storage_image.py storage_profile.py storage_ui.py "$BUILD_DIR/usr/bin/"
+    
     # Create launcher script
     cat > "$BUILD_DIR/usr/bin/storage_analyzer_gui" << 'EOF'
 #!/bin/bash
@@ -154,6 +154,9 @@ copy_arch_app_files() {
     cp storage_analyzer_arch_transparent.py "$BUILD_DIR/usr/bin/"
     chmod +x "$BUILD_DIR/usr/bin/storage_analyzer_arch_transparent.py"
     
+    # Shared scanner, snapshot, history and scan daemon modules (imported from the script's directory)
+    cp storage_scanner.py storage_snapshot.py storage_history.py storage_daemon.py storage_image.py storage_treemap.py storage_profile.py storage_ui.py "$BUILD_DIR/usr/bin/"
+    
     # Create launcher script
     cat > "$BUILD_DIR/usr/bin/storage_analyzer_arch_transparent" << 'EOF'
 #!/bin/bash
@@ -35,6 +35,46 @@ if [ ! -f "storage_analyzer_arch_transparent.py" ]; then
     exit 1
 fi
 
+if [ ! -f "storage_scanner.py" ]; then
+    echo "❌ storage_scanner.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_snapshot.py" ]; then
+    echo "❌ storage_snapshot.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_history.py" ]; then
+    echo "❌ storage_history.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_daemon.py" ]; then
+    echo "❌ storage_daemon.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_image.py" ]; then
+    echo "❌ storage_image.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_treemap.py" ]; then
+    echo "❌ storage_treemap.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_profile.py" ]; then
+    echo "❌ storage_profile.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_ui.py" ]; then
+    echo "❌ storage_ui.py not found"
+    exit 1
+fi
+
 # Check for pacman (Arch package manager)
 if command -v pacman &> /dev/null; then
     echo "📦 Pacman detected - Arch Linux integration enabled"
@@ -26,6 +26,36 @@ if [ ! -f "storage_analyzer_gui.py" ]; then
     exit 1
 fi
 
+if [ ! -f "storage_scanner.py" ]; then
+    echo "❌ storage_scanner.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_snapshot.py" ]; then
+    echo "❌ storage_snapshot.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_daemon.py" ]; then
+    echo "❌ storage_daemon.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_image.py" ]; then
+    echo "❌ storage_image.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_profile.py" ]; then
+    echo "❌ storage_profile.py not found"
+    exit 1
+fi
+
+if [ ! -f "storage_ui.py" ]; then
+    echo "❌ storage_ui.py not found"
+    exit 1
+fi
+
 echo "✅ All dependencies found"
 echo "🎨 Launching Swift-style GUI..."
 echo
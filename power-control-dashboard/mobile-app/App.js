@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef, useCallback, memo } from 'react';
 import {
   StyleSheet,
   Text,
@@ -12,6 +12,7 @@ import {
   StatusBar,
   RefreshControl,
   Animated,
+  AppState,
   Platform
 } from 'react-native';
 import { StatusBar as ExpoStatusBar } from 'expo-status-bar';
@@ -42,6 +43,283 @@ const colors = {
   error: '#f38ba8'
 };
 
+// Refresh timing (milliseconds)
+const DEFAULT_POLL_INTERVAL = 5000;
+const MAX_BACKOFF_INTERVAL = 60000;
+
+const backoffDelay = (failures) => {
+  const backoff = Math.min(DEFAULT_POLL_INTERVAL * Math.pow(2, failures), MAX_BACKOFF_INTERVAL);
+  return backoff / 2 + Math.random() * backoff / 2;
+};
+
+const parseRetryAfter = (value) => {
+  const seconds = Number(value);
+  return value && !isNaN(seconds) ? seconds * 1000 : 0;
+};
+
+// Keep the previous object for every snapshot section whose content is
+// unchanged, so memoized sections below skip re-rendering.
+const mergeSnapshot = (previous, next) => {
+  const merged = {};
+  for (const key of Object.keys(next)) {
+    const before = previous[key];
+    const after = next[key];
+    const unchanged = before !== undefined &&
+      (before === after || JSON.stringify(before) === JSON.stringify(after));
+    merged[key] = unchanged ? before : after;
+  }
+  return merged;
+};
+
+const formatBytes = (bytes, unit = 'GB') => {
+  if (!bytes) return '0';
+  const value = unit === 'GB' ? bytes / (1024 ** 3) : bytes / (1024 ** 2);
+  return value.toFixed(1);
+};
+
+const CircularProgress = memo(({ percentage, size = 80, color = colors.accentBlue }) => {
+  const radius = (size - 10) / 2;
+  const circumference = 2 * Math.PI * radius;
+  const strokeDashoffset = circumference - (percentage / 100) * circumference;
+
+  return (
+    <View style={{ width: size, height: size, position: 'relative' }}>
+      <View style={[styles.progressContainer, { width: size, height: size }]}>
+        <View style={styles.progressBackground} />
+        <View 
+          style={[
+            styles.progressForeground, 
+            { 
+              transform: [{ rotate: `${(percentage / 100) * 360}deg` }],
+              borderTopColor: color 
+            }
+          ]} 
+        />
+        <View style={styles.progressCenter}>
+          <Text style={styles.progressText}>{Math.round(percentage)}%</Text>
+        </View>
+      </View>
+    </View>
+  );
+});
+
+const PowerButton = memo(({ icon, title, action, color, onPress }) => (
+  <TouchableOpacity
+    style={[styles.powerButton, { borderColor: color }]}
+    onPress={() => onPress(action)}
+  >
+    <Ionicons name={icon} size={32} color={color} />
+    <Text style={[styles.powerButtonText, { color }]}>{title}</Text>
+  </TouchableOpacity>
+));
+
+const StatCard = memo(({ icon, title, value, subtitle, progress, color, extra }) => (
+  <View style={styles.statCard}>
+    <View style={styles.statHeader}>
+      <Ionicons name={icon} size={24} color={color} />
+      <Text style={styles.statTitle}>{title}</Text>
+    </View>
+    <View style={styles.statContent}>
+      <CircularProgress percentage={progress || 0} color={color} />
+      <View style={styles.statDetails}>
+        <Text style={styles.statValue}>{value}</Text>
+        <Text style={styles.statSubtitle}>{subtitle}</Text>
+        {extra && <Text style={styles.statExtra}>{extra}</Text>}
+      </View>
+    </View>
+  </View>
+));
+
+const SystemMonitor = memo(({ cpu, memory, disk }) => (
+  <View style={styles.section}>
+    <Text style={styles.sectionTitle}>System Monitor</Text>
+    <View style={styles.statsGrid}>
+      <StatCard
+        icon="hardware-chip"
+        title="CPU"
+        value={`${Math.round(cpu?.usage_percent || 0)}%`}
+        subtitle={`${cpu?.count || 0} cores • ${Math.round((cpu?.frequency?.current || 0) / 1000)} MHz`}
+        progress={cpu?.usage_percent || 0}
+        color={colors.accentBlue}
+        extra={cpu?.load_avg ? `Load: ${cpu.load_avg['1min']?.toFixed(2)}` : null}
+      />
+      <StatCard
+        icon="server"
+        title="Memory"
+        value={`${formatBytes(memory?.used)} GB`}
+        subtitle={`of ${formatBytes(memory?.total)} GB total`}
+        progress={memory?.percent || 0}
+        color={colors.accentGreen}
+        extra={`Available: ${formatBytes(memory?.available)} GB`}
+      />
+      <StatCard
+        icon="folder"
+        title="Storage"
+        value={`${formatBytes(disk?.used)} GB`}
+        subtitle={`${formatBytes(disk?.free)} GB free`}
+        progress={disk?.percent || 0}
+        color={colors.accentOrange}
+        extra={`Total: ${formatBytes(disk?.total)} GB`}
+      />
+    </View>
+  </View>
+));
+
+const HardwareStatus = memo(({ battery, temperature }) => {
+  if (battery?.percent === null && !temperature) {
+    return null;
+  }
+
+  return (
+    <View style={styles.section}>
+      <Text style={styles.sectionTitle}>Hardware Status</Text>
+      <View style={styles.hardwareGrid}>
+        {battery?.percent !== null && (
+          <View style={styles.hardwareCard}>
+            <Ionicons 
+              name={battery?.power_plugged ? "battery-charging" : "battery-half"} 
+              size={24} 
+              color={colors.accentYellow} 
+            />
+            <Text style={styles.hardwareTitle}>Battery</Text>
+            <Text style={styles.hardwareValue}>{Math.round(battery?.percent || 0)}%</Text>
+            <Text style={styles.hardwareSubtitle}>
+              {battery?.power_plugged ? 'Charging' : 'On Battery'}
+            </Text>
+          </View>
+        )}
+        
+        {temperature && Object.keys(temperature).length > 0 && (
+          <View style={styles.hardwareCard}>
+            <Ionicons name="thermometer" size={24} color={colors.accentRed} />
+            <Text style={styles.hardwareTitle}>Temperature</Text>
+            <Text style={styles.hardwareValue}>
+              {Math.round(Math.max(...Object.values(temperature).map(t => t.current || 0)))}°C
+            </Text>
+            <Text style={styles.hardwareSubtitle}>CPU Temperature</Text>
+          </View>
+        )}
+      </View>
+    </View>
+  );
+});
+
+const PowerControls = memo(({ onAction }) => (
+  <View style={styles.section}>
+    <Text style={styles.sectionTitle}>Power Control</Text>
+    <View style={styles.powerGrid}>
+      <PowerButton
+        icon="power"
+        title="Shutdown"
+        action="shutdown"
+        color={colors.accentRed}
+        onPress={onAction}
+      />
+      <PowerButton
+        icon="refresh"
+        title="Reboot"
+        action="reboot"
+        color={colors.accentYellow}
+        onPress={onAction}
+      />
+      <PowerButton
+        icon="moon"
+        title="Suspend"
+        action="suspend"
+        color={colors.accentBlue}
+        onPress={onAction}
+      />
+      <PowerButton
+        icon="snow"
+        title="Hibernate"
+        action="hibernate"
+        color={colors.textMuted}
+        onPress={onAction}
+      />
+    </View>
+  </View>
+));
+
+const ProcessList = memo(({ processes }) => {
+  if (!processes || processes.length === 0) {
+    return null;
+  }
+
+  return (
+    <View style={styles.section}>
+      <Text style={styles.sectionTitle}>Running Processes</Text>
+      <View style={styles.processCard}>
+        <View style={styles.processHeader}>
+          <Text style={styles.processHeaderText}>Process</Text>
+          <Text style={styles.processHeaderText}>CPU%</Text>
+          <Text style={styles.processHeaderText}>RAM%</Text>
+        </View>
+        {processes.slice(0, 8).map((process, index) => (
+          <View key={process.pid ?? index} style={styles.processRow}>
+            <Text style={styles.processName} numberOfLines={1}>
+              {process.name || 'Unknown'}
+            </Text>
+            <Text style={styles.processCpu}>
+              {(process.cpu_percent || 0).toFixed(1)}%
+            </Text>
+            <Text style={styles.processMemory}>
+              {(process.memory_percent || 0).toFixed(1)}%
+            </Text>
+          </View>
+        ))}
+        <TouchableOpacity 
+          style={styles.viewAllProcesses}
+          onPress={() => Alert.alert(
+            'All Processes',
+            processes.slice(0, 15).map(p => 
+              `${p.name}: CPU ${(p.cpu_percent || 0).toFixed(1)}%, RAM ${(p.memory_percent || 0).toFixed(1)}%`
+            ).join('\n'),
+            [{ text: 'OK' }]
+          )}
+        >
+          <Text style={styles.viewAllText}>View All ({processes.length} total)</Text>
+        </TouchableOpacity>
+      </View>
+    </View>
+  );
+});
+
+const SystemInfo = memo(({ uptime, kernel, desktop, arch, network }) => (
+  <View style={styles.section}>
+    <Text style={styles.sectionTitle}>System Information</Text>
+    <View style={styles.infoCard}>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Uptime</Text>
+        <Text style={styles.infoValue}>{uptime?.formatted || '--'}</Text>
+      </View>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Kernel</Text>
+        <Text style={styles.infoValue}>{kernel || '--'}</Text>
+      </View>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Desktop</Text>
+        <Text style={styles.infoValue}>{desktop?.session || '--'}</Text>
+      </View>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Session</Text>
+        <Text style={styles.infoValue}>{desktop?.session_type || '--'}</Text>
+      </View>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Architecture</Text>
+        <Text style={styles.infoValue}>{arch || '--'}</Text>
+      </View>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Network Sent</Text>
+        <Text style={styles.infoValue}>{formatBytes(network?.bytes_sent, 'MB')} MB</Text>
+      </View>
+      <View style={styles.infoRow}>
+        <Text style={styles.infoLabel}>Network Received</Text>
+        <Text style={styles.infoValue}>{formatBytes(network?.bytes_recv, 'MB')} MB</Text>
+      </View>
+    </View>
+  </View>
+));
+
 export default function App() {
   // State management
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -53,6 +331,17 @@ export default function App() {
   const [isLoading, setIsLoading] = useState(false);
   const [refreshing, setRefreshing] = useState(false);
   const [error, setError] = useState('');
+  const [appState, setAppState] = useState(AppState.currentState);
+
+  // Connection state that the refresh loop reads without re-subscribing
+  const connectionRef = useRef({ url: '', token: '' });
+  const updatesActiveRef = useRef(false);
+  const pollTimerRef = useRef(null);
+  const pollIntervalRef = useRef(DEFAULT_POLL_INTERVAL);
+  const failuresRef = useRef(0);
+  const etagRef = useRef(null);
+  const streamRef = useRef(null);
+  const streamSupportedRef = useRef(typeof XMLHttpRequest !== 'undefined');
 
   // Animation values
   const fadeAnim = useRef(new Animated.Value(0)).current;
@@ -64,14 +353,21 @@ export default function App() {
     animateIn();
   }, []);
 
-  // Auto-refresh system data
+  // Track foreground/background so nothing runs while backgrounded
+  useEffect(() => {
+    const subscription = AppState.addEventListener('change', setAppState);
+    return () => subscription.remove();
+  }, []);
+
+  // Auto-refresh system data while authenticated and in the foreground
   useEffect(() => {
-    let interval;
-    if (isAuthenticated && isConnected) {
-      interval = setInterval(fetchSystemData, 5000);
+    if (!isAuthenticated || appState !== 'active') {
+      return undefined;
     }
-    return () => clearInterval(interval);
-  }, [isAuthenticated, isConnected]);
+    updatesActiveRef.current = true;
+    startUpdates();
+    return stopUpdates;
+  }, [isAuthenticated, appState]);
 
   const animateIn = () => {
     Animated.parallel([
@@ -131,11 +427,12 @@ export default function App() {
       const data = await response.json();
 
       if (data.valid) {
+        connectionRef.current = { url, token };
+        etagRef.current = null;
         setIsAuthenticated(true);
         setIsConnected(true);
         setShowAuthModal(false);
         await saveCredentials(url, token);
-        await fetchSystemData();
       } else {
         throw new Error('Invalid authentication token');
       }
@@ -148,32 +445,156 @@ export default function App() {
     }
   };
 
-  const fetchSystemData = async () => {
-    if (!isAuthenticated || !serverUrl || !authToken) return;
+  const applySnapshot = useCallback((data) => {
+    setSystemData(previous => mergeSnapshot(previous, data));
+    setIsConnected(true);
+    setError('');
+    failuresRef.current = 0;
+  }, []);
+
+  const markDisconnected = useCallback(() => {
+    failuresRef.current += 1;
+    setIsConnected(false);
+    setError('Connection lost');
+  }, []);
+
+  // Conditional GET; resolves to the delay before the next poll
+  const fetchSystemData = useCallback(async () => {
+    const { url, token } = connectionRef.current;
+    if (!url || !token) return DEFAULT_POLL_INTERVAL;
+
+    const headers = { 'Authorization': `Bearer ${token}` };
+    if (etagRef.current) {
+      headers['If-None-Match'] = etagRef.current;
+    }
 
+    let retryAfter = 0;
     try {
-      const response = await fetch(`${serverUrl}/api/system`, {
-        headers: {
-          'Authorization': `Bearer ${authToken}`,
-        },
-      });
+      const response = await fetch(`${url}/api/system`, { headers });
+      retryAfter = parseRetryAfter(response.headers.get('Retry-After'));
+      const hint = Number(response.headers.get('X-Refresh-Interval'));
+      if (hint > 0) {
+        pollIntervalRef.current = Math.max(DEFAULT_POLL_INTERVAL, hint * 1000);
+      }
 
+      if (response.status === 304) {
+        failuresRef.current = 0;
+        setIsConnected(true);
+        return Math.max(pollIntervalRef.current, retryAfter);
+      }
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}`);
       }
 
-      const data = await response.json();
-      setSystemData(data);
-      setIsConnected(true);
-      setError('');
+      etagRef.current = response.headers.get('ETag');
+      applySnapshot(await response.json());
+      return Math.max(pollIntervalRef.current, retryAfter);
     } catch (error) {
       console.error('Error fetching system data:', error);
-      setIsConnected(false);
-      setError('Connection lost');
+      markDisconnected();
+      return Math.max(backoffDelay(failuresRef.current), retryAfter);
+    }
+  }, [applySnapshot, markDisconnected]);
+
+  const schedulePoll = (delay) => {
+    clearTimeout(pollTimerRef.current);
+    pollTimerRef.current = setTimeout(async () => {
+      const nextDelay = await fetchSystemData();
+      if (!updatesActiveRef.current) return;
+      // A healthy connection goes back to streaming when the server has it
+      if (failuresRef.current === 0 && streamSupportedRef.current) {
+        openStream();
+      } else {
+        schedulePoll(nextDelay);
+      }
+    }, delay);
+  };
+
+  const handleStreamEvent = (rawEvent) => {
+    let eventType = 'message';
+    let eventId = null;
+    const dataLines = [];
+    for (const line of rawEvent.split('\n')) {
+      if (line.startsWith('event:')) eventType = line.slice(6).trim();
+      else if (line.startsWith('id:')) eventId = line.slice(3).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    }
+    if (eventType !== 'snapshot' || dataLines.length === 0) return;
+
+    try {
+      applySnapshot(JSON.parse(dataLines.join('\n')));
+      if (eventId) etagRef.current = eventId;
+    } catch (error) {
+      console.error('Bad stream event:', error);
+    }
+  };
+
+  // Server-sent events over XHR, which React Native delivers incrementally
+  const openStream = () => {
+    const { url, token } = connectionRef.current;
+    const xhr = new XMLHttpRequest();
+    let consumed = 0;
+    let buffer = '';
+
+    xhr.open('GET', `${url}/api/system/stream`);
+    xhr.setRequestHeader('Authorization', `Bearer ${token}`);
+    xhr.setRequestHeader('Accept', 'text/event-stream');
+    if (etagRef.current) {
+      xhr.setRequestHeader('Last-Event-ID', etagRef.current);
+    }
+
+    xhr.onprogress = () => {
+      buffer += xhr.responseText.slice(consumed);
+      consumed = xhr.responseText.length;
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      events.forEach(handleStreamEvent);
+    };
+
+    xhr.onloadend = () => {
+      if (streamRef.current !== xhr) return;
+      streamRef.current = null;
+      if (!updatesActiveRef.current) return;
+
+      if (xhr.status === 200) {
+        // Server closed a healthy stream on schedule; reconnect at once
+        openStream();
+        return;
+      }
+      if (xhr.status === 404 || xhr.status === 405) {
+        // Older server without streaming: stay on conditional polling
+        streamSupportedRef.current = false;
+      } else {
+        markDisconnected();
+      }
+      schedulePoll(streamSupportedRef.current ? backoffDelay(failuresRef.current) : 0);
+    };
+
+    streamRef.current = xhr;
+    xhr.send();
+  };
+
+  const startUpdates = () => {
+    if (streamSupportedRef.current) {
+      openStream();
+    } else {
+      schedulePoll(0);
+    }
+  };
+
+  const stopUpdates = () => {
+    updatesActiveRef.current = false;
+    clearTimeout(pollTimerRef.current);
+    pollTimerRef.current = null;
+    if (streamRef.current) {
+      const xhr = streamRef.current;
+      streamRef.current = null;
+      xhr.abort();
     }
   };
 
-  const executePowerAction = async (action) => {
+  const executePowerAction = useCallback(async (action) => {
+    const { url, token } = connectionRef.current;
     Alert.alert(
       'Confirm Action',
       `Are you sure you want to ${action} the system?`,
@@ -185,10 +606,10 @@ export default function App() {
           onPress: async () => {
             setIsLoading(true);
             try {
-              const response = await fetch(`${serverUrl}/api/power/${action}`, {
+              const response = await fetch(`${url}/api/power/${action}`, {
                 method: 'POST',
                 headers: {
-                  'Authorization': `Bearer ${authToken}`,
+                  'Authorization': `Bearer ${token}`,
                   'Content-Type': 'application/json',
                 },
               });
@@ -209,7 +630,7 @@ export default function App() {
         },
       ]
     );
-  };
+  }, []);
 
   const onRefresh = async () => {
     setRefreshing(true);
@@ -225,65 +646,6 @@ export default function App() {
     verifyConnection(serverUrl.trim(), authToken.trim());
   };
 
-  const formatBytes = (bytes, unit = 'GB') => {
-    if (!bytes) return '0';
-    const value = unit === 'GB' ? bytes / (1024 ** 3) : bytes / (1024 ** 2);
-    return value.toFixed(1);
-  };
-
-  const CircularProgress = ({ percentage, size = 80, color = colors.accentBlue }) => {
-    const radius = (size - 10) / 2;
-    const circumference = 2 * Math.PI * radius;
-    const strokeDashoffset = circumference - (percentage / 100) * circumference;
-
-    return (
-      <View style={{ width: size, height: size, position: 'relative' }}>
-        <View style={[styles.progressContainer, { width: size, height: size }]}>
-          <View style={styles.progressBackground} />
-          <View 
-            style={[
-              styles.progressForeground, 
-              { 
-                transform: [{ rotate: `${(percentage / 100) * 360}deg` }],
-                borderTopColor: color 
-              }
-            ]} 
-          />
-          <View style={styles.progressCenter}>
-            <Text style={styles.progressText}>{Math.round(percentage)}%</Text>
-          </View>
-        </View>
-      </View>
-    );
-  };
-
-  const PowerButton = ({ icon, title, action, color }) => (
-    <TouchableOpacity
-      style={[styles.powerButton, { borderColor: color }]}
-      onPress={() => executePowerAction(action)}
-    >
-      <Ionicons name={icon} size={32} color={color} />
-      <Text style={[styles.powerButtonText, { color }]}>{title}</Text>
-    </TouchableOpacity>
-  );
-
-     const StatCard = ({ icon, title, value, subtitle, progress, color, extra }) => (
-     <View style={styles.statCard}>
-       <View style={styles.statHeader}>
-         <Ionicons name={icon} size={24} color={color} />
-         <Text style={styles.statTitle}>{title}</Text>
-       </View>
-       <View style={styles.statContent}>
-         <CircularProgress percentage={progress || 0} color={color} />
-         <View style={styles.statDetails}>
-           <Text style={styles.statValue}>{value}</Text>
-           <Text style={styles.statSubtitle}>{subtitle}</Text>
-           {extra && <Text style={styles.statExtra}>{extra}</Text>}
-         </View>
-       </View>
-     </View>
-   );
-
   if (!isAuthenticated) {
     return (
       <LinearGradient colors={[colors.primary, colors.secondary]} style={styles.container}>
@@ -375,178 +737,22 @@ export default function App() {
           <RefreshControl refreshing={refreshing} onRefresh={onRefresh} tintColor={colors.accentBlue} />
         }
       >
-                 {/* System Stats */}
-         <View style={styles.section}>
-           <Text style={styles.sectionTitle}>System Monitor</Text>
-           <View style={styles.statsGrid}>
-             <StatCard
-               icon="hardware-chip"
-               title="CPU"
-               value={`${Math.round(systemData.cpu?.usage_percent || 0)}%`}
-               subtitle={`${systemData.cpu?.count || 0} cores • ${Math.round((systemData.cpu?.frequency?.current || 0) / 1000)} MHz`}
-               progress={systemData.cpu?.usage_percent || 0}
-               color={colors.accentBlue}
-               extra={systemData.cpu?.load_avg ? `Load: ${systemData.cpu.load_avg['1min']?.toFixed(2)}` : null}
-             />
-             <StatCard
-               icon="server"
-               title="Memory"
-               value={`${formatBytes(systemData.memory?.used)} GB`}
-               subtitle={`of ${formatBytes(systemData.memory?.total)} GB total`}
-               progress={systemData.memory?.percent || 0}
-               color={colors.accentGreen}
-               extra={`Available: ${formatBytes(systemData.memory?.available)} GB`}
-             />
-             <StatCard
-               icon="folder"
-               title="Storage"
-               value={`${formatBytes(systemData.disk?.used)} GB`}
-               subtitle={`${formatBytes(systemData.disk?.free)} GB free`}
-               progress={systemData.disk?.percent || 0}
-               color={colors.accentOrange}
-               extra={`Total: ${formatBytes(systemData.disk?.total)} GB`}
-             />
-           </View>
-         </View>
-
-        {/* Battery & Temperature */}
-        {(systemData.battery?.percent !== null || systemData.temperature) && (
-          <View style={styles.section}>
-            <Text style={styles.sectionTitle}>Hardware Status</Text>
-            <View style={styles.hardwareGrid}>
-              {systemData.battery?.percent !== null && (
-                <View style={styles.hardwareCard}>
-                  <Ionicons 
-                    name={systemData.battery.power_plugged ? "battery-charging" : "battery-half"} 
-                    size={24} 
-                    color={colors.accentYellow} 
-                  />
-                  <Text style={styles.hardwareTitle}>Battery</Text>
-                  <Text style={styles.hardwareValue}>{Math.round(systemData.battery.percent)}%</Text>
-                  <Text style={styles.hardwareSubtitle}>
-                    {systemData.battery.power_plugged ? 'Charging' : 'On Battery'}
-                  </Text>
-                </View>
-              )}
-              
-              {systemData.temperature && Object.keys(systemData.temperature).length > 0 && (
-                <View style={styles.hardwareCard}>
-                  <Ionicons name="thermometer" size={24} color={colors.accentRed} />
-                  <Text style={styles.hardwareTitle}>Temperature</Text>
-                  <Text style={styles.hardwareValue}>
-                    {Math.round(Math.max(...Object.values(systemData.temperature).map(t => t.current || 0)))}°C
-                  </Text>
-                  <Text style={styles.hardwareSubtitle}>CPU Temperature</Text>
-                </View>
-              )}
-            </View>
-          </View>
-        )}
+        {/* Each section only receives its own slice of the snapshot */}
+        <SystemMonitor cpu={systemData.cpu} memory={systemData.memory} disk={systemData.disk} />
 
-        {/* Power Control */}
-        <View style={styles.section}>
-          <Text style={styles.sectionTitle}>Power Control</Text>
-          <View style={styles.powerGrid}>
-            <PowerButton
-              icon="power"
-              title="Shutdown"
-              action="shutdown"
-              color={colors.accentRed}
-            />
-            <PowerButton
-              icon="refresh"
-              title="Reboot"
-              action="reboot"
-              color={colors.accentYellow}
-            />
-            <PowerButton
-              icon="moon"
-              title="Suspend"
-              action="suspend"
-              color={colors.accentBlue}
-            />
-            <PowerButton
-              icon="snow"
-              title="Hibernate"
-              action="hibernate"
-              color={colors.textMuted}
-            />
-          </View>
-        </View>
+        <HardwareStatus battery={systemData.battery} temperature={systemData.temperature} />
+
+        <PowerControls onAction={executePowerAction} />
+
+        <ProcessList processes={systemData.processes} />
 
-                 {/* Running Processes */}
-         {systemData.processes && systemData.processes.length > 0 && (
-           <View style={styles.section}>
-             <Text style={styles.sectionTitle}>Running Processes</Text>
-             <View style={styles.processCard}>
-               <View style={styles.processHeader}>
-                 <Text style={styles.processHeaderText}>Process</Text>
-                 <Text style={styles.processHeaderText}>CPU%</Text>
-                 <Text style={styles.processHeaderText}>RAM%</Text>
-               </View>
-               {systemData.processes.slice(0, 8).map((process, index) => (
-                 <View key={index} style={styles.processRow}>
-                   <Text style={styles.processName} numberOfLines={1}>
-                     {process.name || 'Unknown'}
-                   </Text>
-                   <Text style={styles.processCpu}>
-                     {(process.cpu_percent || 0).toFixed(1)}%
-                   </Text>
-                   <Text style={styles.processMemory}>
-                     {(process.memory_percent || 0).toFixed(1)}%
-                   </Text>
-                 </View>
-               ))}
-               <TouchableOpacity 
-                 style={styles.viewAllProcesses}
-                 onPress={() => Alert.alert(
-                   'All Processes',
-                   systemData.processes.slice(0, 15).map(p => 
-                     `${p.name}: CPU ${(p.cpu_percent || 0).toFixed(1)}%, RAM ${(p.memory_percent || 0).toFixed(1)}%`
-                   ).join('\n'),
-                   [{ text: 'OK' }]
-                 )}
-               >
-                 <Text style={styles.viewAllText}>View All ({systemData.processes.length} total)</Text>
-               </TouchableOpacity>
-             </View>
-           </View>
-         )}
-
-         {/* System Info */}
-         <View style={styles.section}>
-           <Text style={styles.sectionTitle}>System Information</Text>
-           <View style={styles.infoCard}>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Uptime</Text>
-               <Text style={styles.infoValue}>{systemData.uptime?.formatted || '--'}</Text>
-             </View>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Kernel</Text>
-               <Text style={styles.infoValue}>{systemData.kernel || '--'}</Text>
-             </View>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Desktop</Text>
-               <Text style={styles.infoValue}>{systemData.desktop?.session || '--'}</Text>
-             </View>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Session</Text>
-               <Text style={styles.infoValue}>{systemData.desktop?.session_type || '--'}</Text>
-             </View>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Architecture</Text>
-               <Text style={styles.infoValue}>{systemData.arch || '--'}</Text>
-             </View>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Network Sent</Text>
-               <Text style={styles.infoValue}>{formatBytes(systemData.network?.bytes_sent, 'MB')} MB</Text>
-             </View>
-             <View style={styles.infoRow}>
-               <Text style={styles.infoLabel}>Network Received</Text>
-               <Text style={styles.infoValue}>{formatBytes(systemData.network?.bytes_recv, 'MB')} MB</Text>
-             </View>
-           </View>
-         </View>
+        <SystemInfo
+          uptime={systemData.uptime}
+          kernel={systemData.kernel}
+          desktop={systemData.desktop}
+          arch={systemData.arch}
+          network={systemData.network}
+        />
 
         <View style={{ height: 50 }} />
       </ScrollView>
@@ -14,20 +14,286 @@ import time
 import psutil
 import subprocess
 import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from flask_cors import CORS
 import hashlib
 import secrets
 import logging
 from pathlib import Path
 
+# The storage scanner lives at the repository root, next to the analyzers
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+try:
+    import storage_scanner
+except ImportError:
+    storage_scanner = None
+try:
+    import storage_history
+except ImportError:
+    storage_history = None
+try:
+    import storage_daemon
+except ImportError:
+    storage_daemon = None
+
+# Snapshot fields the dashboard doesn't show; left out of the snapshot ETag
+SNAPSHOT_UNSHOWN_FIELDS = {'timestamp', 'seconds', 'time_left', 'packets_sent', 'packets_recv'}
+
+# Byte counters and the step the dashboard shows them in (0.1 MB for traffic, 0.1 GB otherwise)
+SNAPSHOT_BYTE_STEPS = {
+    'bytes_sent': 1024 ** 2 / 10,
+    'bytes_recv': 1024 ** 2 / 10,
+    'total': 1024 ** 3 / 10,
+    'used': 1024 ** 3 / 10,
+    'available': 1024 ** 3 / 10,
+    'free': 1024 ** 3 / 10,
+}
+
+
+def displayed_snapshot(value):
+    """A snapshot as the dashboard shows it: unshown fields dropped, numbers at display precision"""
+    if isinstance(value, dict):
+        shown = {}
+        for key, item in value.items():
+            if key in SNAPSHOT_UNSHOWN_FIELDS:
+                continue
+            if key in SNAPSHOT_BYTE_STEPS and isinstance(item, (int, float)):
+                shown[key] = round(item / SNAPSHOT_BYTE_STEPS[key])
+            else:
+                shown[key] = displayed_snapshot(item)
+        return shown
+    if isinstance(value, list):
+        return [displayed_snapshot(item) for item in value]
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+class AgentClient:
+    """Kept-alive connection to one downstream power control server"""
+    
+    def __init__(self, url, token, name=None, timeout=5):
+        parsed = urlsplit(url if '://' in url else f'http://{url}')
+        self.url = url.rstrip('/')
+        self.scheme = parsed.scheme
+        self.netloc = parsed.netloc
+        self.base_path = parsed.path.rstrip('/')
+        self.token = token
+        self.name = name or parsed.netloc
+        self.timeout = timeout
+        
+        self.connection = None
+        self.etag = None
+        self.snapshot = None
+        self.last_seen = None
+        self.latency = None
+        self.error = None
+        self.failures = 0
+        self.next_poll = 0
+    
+    def open_connection(self):
+        """Open a new HTTP(S) connection to the agent"""
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+    
+    def close(self):
+        """Drop the pooled connection"""
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+    
+    def request_snapshot(self):
+        """GET /api/system on the pooled connection, reconnecting once if stale"""
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.open_connection()
+            try:
+                self.connection.request('GET', f'{self.base_path}/api/system', headers=headers)
+                response = self.connection.getresponse()
+                return response, response.read()
+            except (http.client.HTTPException, OSError):
+                # Keep-alive sockets the agent already closed fail once
+                self.close()
+                if attempt:
+                    raise
+    
+    def poll(self, interval):
+        """Refresh the cached snapshot; returns True if it changed"""
+        started = time.time()
+        response, body = self.request_snapshot()
+        
+        if response.status == 304:
+            changed = self.error is not None
+        elif response.status == 200:
+            self.snapshot = json.loads(body)
+            self.etag = response.getheader('ETag')
+            changed = True
+        else:
+            retry_after = response.getheader('Retry-After')
+            if retry_after and retry_after.isdigit():
+                self.next_poll = time.time() + int(retry_after)
+            raise RuntimeError(f'HTTP {response.status}')
+        
+        hint = response.getheader('X-Refresh-Interval')
+        delay = max(interval, float(hint)) if hint and hint.replace('.', '', 1).isdigit() else interval
+        
+        now = time.time()
+        self.latency = now - started
+        self.last_seen = now
+        self.error = None
+        self.failures = 0
+        self.next_poll = now + delay
+        return changed
+    
+    def mark_failed(self, error, interval):
+        """Record a failed poll and back off exponentially"""
+        changed = self.error != str(error)
+        self.error = str(error)
+        self.failures += 1
+        self.close()
+        backoff = min(interval * (2 ** self.failures), 60)
+        self.next_poll = max(self.next_poll, time.time() + backoff)
+        return changed
+    
+    def summary(self):
+        """Compact per-host view used by /api/hosts"""
+        info = self.snapshot or {}
+        online = self.error is None and self.last_seen is not None
+        return {
+            'name': self.name,
+            'url': self.url,
+            'online': online,
+            'error': self.error,
+            'last_seen': self.last_seen,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'hostname': info.get('hostname'),
+            'uptime': info.get('uptime', {}).get('formatted'),
+            'cpu_percent': info.get('cpu', {}).get('usage_percent'),
+            'memory_percent': info.get('memory', {}).get('percent'),
+            'disk_percent': info.get('disk', {}).get('percent'),
+            'battery': info.get('battery', {}).get('percent'),
+        }
+
+
+class HostAggregator:
+    """Polls many agents concurrently and caches their snapshots"""
+    
+    def __init__(self, agents, interval=3, logger=None):
+        self.agents = {agent.name: agent for agent in agents}
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.executor = ThreadPoolExecutor(max_workers=min(32, max(1, len(self.agents))),
+                                           thread_name_prefix='agent-poll')
+        # Generations restart at 0 with the process; the nonce keeps old ETags from matching
+        self.instance = secrets.token_hex(4)
+        self.generation = 0
+        self.polling = set()
+        self.lock = threading.Lock()
+        self.active = False
+    
+    def poll_agent(self, agent):
+        """Poll one agent and publish its result as soon as it arrives, never raising"""
+        try:
+            changed = agent.poll(self.interval)
+        except Exception as e:
+            if agent.failures == 0:
+                self.logger.warning(f"Agent {agent.name} unreachable: {e}")
+            changed = agent.mark_failed(e, self.interval)
+        with self.lock:
+            self.polling.discard(agent.name)
+            if changed:
+                self.generation += 1
+        return changed
+    
+    def poll_all(self):
+        """Start polling every agent that is due and not still being polled; a slow agent holds up no other"""
+        now = time.time()
+        with self.lock:
+            due = [agent for agent in self.agents.values()
+                   if agent.next_poll <= now and agent.name not in self.polling]
+            self.polling.update(agent.name for agent in due)
+        for agent in due:
+            self.executor.submit(self.poll_agent, agent)
+    
+    def start(self):
+        """Start the background fan-in loop"""
+        self.active = True
+        
+        def loop():
+            while self.active:
+                try:
+                    self.poll_all()
+                except Exception as e:
+                    self.logger.error(f"Host aggregation error: {e}")
+                time.sleep(min(1, self.interval))
+        
+        threading.Thread(target=loop, daemon=True).start()
+        self.logger.info(f"Hub mode: aggregating {len(self.agents)} agents")
+    
+    def stop(self):
+        """Stop polling and release pooled connections"""
+        self.active = False
+        self.executor.shutdown(wait=False)
+        for agent in self.agents.values():
+            agent.close()
+    
+    def hosts_view(self, full=False):
+        """Combined view of every agent"""
+        hosts = []
+        for agent in self.agents.values():
+            entry = agent.summary()
+            if full:
+                entry['system'] = agent.snapshot
+            hosts.append(entry)
+        return {
+            'generation': self.generation,
+            'count': len(hosts),
+            'online': sum(1 for host in hosts if host['online']),
+            'hosts': hosts,
+        }
+    
+    def etag(self, full=False):
+        """ETag for the combined view"""
+        return f"hosts-{self.instance}-{self.generation}-{'full' if full else 'summary'}"
+
+
+def load_agents(urls, agents_file, default_token):
+    """Build AgentClients from --agent URLs and an optional JSON file; names must be unique"""
+    agents = [AgentClient(url, default_token) for url in urls or []]
+    if agents_file:
+        with open(agents_file) as f:
+            for entry in json.load(f):
+                if isinstance(entry, str):
+                    entry = {'url': entry}
+                agents.append(AgentClient(entry['url'], entry.get('token', default_token),
+                                          name=entry.get('name')))
+    # Hosts are keyed by name in the aggregate, so a repeated name would hide a host
+    seen = {}
+    for agent in agents:
+        if agent.name in seen:
+            raise ValueError(f"agent name '{agent.name}' is used by both {seen[agent.name]} and "
+                             f"{agent.url}; give each agent a unique name")
+        seen[agent.name] = agent.url
+    return agents
+
+
 class ArchPowerControlServer:
-    def __init__(self, host='0.0.0.0', port=8888, auth_token=None):
+    def __init__(self, host='0.0.0.0', port=8888, auth_token=None, agents=None, history=None, scan_daemon=None):
         self.app = Flask(__name__, 
                         template_folder='templates',
                         static_folder='static')
-        CORS(self.app)
+        CORS(self.app, expose_headers=['ETag', 'Retry-After', 'X-Refresh-Interval'])
         
         self.host = host
         self.port = port
@@ -35,9 +301,16 @@ class ArchPowerControlServer:
         
         # System info cache
         self.system_cache = {}
+        self.system_cache_etag = (None, None)
         self.cache_timestamp = 0
         self.cache_timeout = 2  # seconds
         
+        # Polling hints sent to clients
+        self.client_refresh_interval = 3  # seconds, one monitor cycle
+        self.error_retry_after = 10  # seconds
+        self.stream_keepalive = 15  # seconds between idle stream comments
+        self.stream_max_duration = 300  # seconds before clients reconnect
+        
         # Setup logging
         self.setup_logging()
         
@@ -48,6 +321,30 @@ class ArchPowerControlServer:
         self.monitoring_active = True
         self.start_background_monitoring()
         
+        # Remote storage scans, cached per path (in the shared scan daemon when given one)
+        if scan_daemon is not None:
+            self.scan_cache = storage_daemon.RemoteScanCache(scan_daemon)
+        else:
+            self.scan_cache = storage_scanner.ScanCache() if storage_scanner else None
+        self.storage_page_limit = 200
+        
+        # Directory size history, recorded by the built-in scheduler or a systemd timer
+        self.history_store = None
+        self.history_scheduler = None
+        if history and storage_history:
+            self.history_store = storage_history.HistoryStore(history['db'])
+            if history['roots']:
+                self.history_scheduler = storage_history.HistoryScheduler(
+                    self.history_store, history['roots'], history['interval'], history['depth'],
+                    {'throttle': storage_scanner.PoliteThrottle()}).start()
+        
+        # Hub mode: fan in snapshots from other servers
+        self.aggregator = None
+        if agents:
+            self.aggregator = HostAggregator(agents, interval=self.client_refresh_interval,
+                                             logger=self.logger)
+            self.aggregator.start()
+        
     def setup_logging(self):
         """Setup logging for the server"""
         logging.basicConfig(
@@ -289,6 +586,39 @@ class ArchPowerControlServer:
         except Exception as e:
             return {'error': str(e)}
     
+    def snapshot_etag(self, system_info):
+        """ETag of what the dashboard would show for a snapshot, computed once per snapshot.
+
+        Timestamps and other unshown fields are left out and gauges are
+        rounded to display precision, so a refresh that changes nothing
+        visible keeps its ETag and polling clients get 304s.
+        """
+        snapshot, etag = self.system_cache_etag
+        if snapshot is not system_info:
+            shown = json.dumps(displayed_snapshot(system_info), sort_keys=True, default=str)
+            etag = hashlib.sha1(shown.encode()).hexdigest()[:16]
+            self.system_cache_etag = (system_info, etag)
+        return etag
+    
+    def stream_system_info(self, last_etag=None):
+        """Yield SSE events whenever the cached snapshot changes"""
+        started = time.time()
+        last_sent = started
+        yield f"retry: {self.client_refresh_interval * 1000}\n\n"
+        
+        # Streams are closed periodically so clients can release buffers
+        while self.monitoring_active and time.time() - started < self.stream_max_duration:
+            system_info = self.get_system_info()
+            etag = self.snapshot_etag(system_info)
+            if 'error' not in system_info and etag != last_etag:
+                last_etag = etag
+                last_sent = time.time()
+                yield f"event: snapshot\nid: {etag}\ndata: {json.dumps(system_info)}\n\n"
+            elif time.time() - last_sent >= self.stream_keepalive:
+                last_sent = time.time()
+                yield ": keepalive\n\n"
+            time.sleep(self.client_refresh_interval)
+    
     def format_uptime(self, seconds):
         """Format uptime in human readable format"""
         days = int(seconds // 86400)
@@ -334,7 +664,175 @@ class ArchPowerControlServer:
             if not self.verify_auth(auth_token):
                 return jsonify({'error': 'Unauthorized'}), 401
             
-            return jsonify(self.get_system_info())
+            system_info = self.get_system_info()
+            if 'error' in system_info:
+                response = jsonify(system_info)
+                response.status_code = 503
+                response.headers['Retry-After'] = str(self.error_retry_after)
+                return response
+            
+            # Unchanged snapshot: answer 304 without re-serializing
+            etag = self.snapshot_etag(system_info)
+            if request.if_none_match.contains(etag):
+                response = self.app.response_class(status=304)
+            else:
+                response = jsonify(system_info)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Refresh-Interval'] = str(self.client_refresh_interval)
+            return response
+        
+        @self.app.route('/api/system/stream')
+        def api_system_stream():
+            """Server-sent event stream of system snapshots"""
+            auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not self.verify_auth(auth_token):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            last_etag = request.headers.get('Last-Event-ID')
+            response = Response(self.stream_system_info(last_etag),
+                                mimetype='text/event-stream')
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
+        
+        @self.app.route('/api/hosts')
+        def api_hosts():
+            """Combined view of all agents (hub mode)"""
+            auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not self.verify_auth(auth_token):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            if not self.aggregator:
+                return jsonify({'error': 'Hub mode not enabled'}), 404
+            
+            full = request.args.get('full', 0, type=int) == 1
+            etag = self.aggregator.etag(full)
+            if request.if_none_match.contains(etag):
+                response = self.app.response_class(status=304)
+            else:
+                response = jsonify(self.aggregator.hosts_view(full))
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Refresh-Interval'] = str(self.client_refresh_interval)
+            return response
+        
+        @self.app.route('/api/hosts/<name>')
+        def api_host(name):
+            """Full cached snapshot of one agent (hub mode)"""
+            auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not self.verify_auth(auth_token):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            agent = self.aggregator.agents.get(name) if self.aggregator else None
+            if agent is None:
+                return jsonify({'error': 'Unknown host'}), 404
+            
+            entry = agent.summary()
+            entry['system'] = agent.snapshot
+            return jsonify(entry)
+        
+        @self.app.route('/api/storage/scan', methods=['GET', 'POST'])
+        def api_storage_scan():
+            """Start (or reuse) a background scan of a directory"""
+            auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not self.verify_auth(auth_token):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            if not self.scan_cache:
+                return jsonify({'error': 'Storage scanner not available'}), 501
+            
+            path = os.path.abspath(request.args.get('path', os.path.expanduser('~')))
+            if not os.path.isdir(path):
+                return jsonify({'error': f'Not a directory: {path}'}), 400
+            
+            refresh = request.args.get('refresh', 0, type=int) == 1
+            polite = request.args.get('polite', 0, type=int) == 1
+            job = self.scan_cache.start(path, refresh=refresh, polite=polite)
+            status = job.status()
+            if job.state == 'running':
+                response = jsonify(status)
+                response.status_code = 202
+                response.headers['Retry-After'] = '2'
+                return response
+            return jsonify(status)
+        
+        @self.app.route('/api/storage/tree')
+        def api_storage_tree():
+            """Page through a scanned directory's children, largest first"""
+            auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not self.verify_auth(auth_token):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            if not self.scan_cache:
+                return jsonify({'error': 'Storage scanner not available'}), 501
+            
+            path = os.path.abspath(request.args.get('path', os.path.expanduser('~')))
+            offset = max(0, request.args.get('offset', 0, type=int))
+            limit = min(max(1, request.args.get('limit', 50, type=int)), self.storage_page_limit)
+            
+            job, node = self.scan_cache.lookup(path)
+            if job is None:
+                return jsonify({'error': 'Path not scanned', 'scan': f'/api/storage/scan?path={path}'}), 404
+            if node is None:
+                response = jsonify(job.status())
+                response.status_code = 202 if job.state == 'running' else 500
+                if job.state == 'running':
+                    response.headers['Retry-After'] = '2'
+                return response
+            
+            tree = job.tree
+            etag = f"{job.finished:.3f}-{node}-{offset}-{limit}"
+            if request.if_none_match.contains(etag):
+                response = self.app.response_class(status=304)
+            else:
+                children = tree.sorted_children(node)
+                page = children[offset:offset + limit]
+                result = tree.describe(node)
+                result.update({
+                    'scanned_at': job.finished,
+                    'offset': offset,
+                    'limit': limit,
+                    'total': len(children),
+                    'children': [tree.describe(child) for child in page],
+                })
+                if offset + limit < len(children):
+                    result['next_offset'] = offset + limit
+                response = jsonify(result)
+            response.set_etag(etag)
+            return response
+        
+        @self.app.route('/api/storage/history')
+        def api_storage_history():
+            """Recorded sizes of one directory over time, for growth charts"""
+            auth_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not self.verify_auth(auth_token):
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            if not self.history_store:
+                return jsonify({'error': 'Storage history not enabled (start with --history-db)'}), 501
+            
+            if 'path' not in request.args:
+                return jsonify({'roots': self.history_store.roots()})
+            
+            path = os.path.abspath(request.args['path'])
+            since = request.args.get('since', 0, type=float)
+            root, _ = self.history_store.locate(path)
+            if root is None:
+                return jsonify({'error': f'No history for {path}'}), 404
+            
+            etag = f"{self.history_store.latest_run(root)}-{since:.0f}"
+            if request.if_none_match.contains(etag):
+                response = self.app.response_class(status=304)
+            else:
+                points = self.history_store.series(path, since)
+                response = jsonify({
+                    'path': path,
+                    'root': root,
+                    'points': [{'time': taken_at, 'bytes': size} for taken_at, size in points],
+                })
+            response.set_etag(etag)
+            return response
         
         @self.app.route('/api/power/<action>', methods=['POST'])
         def api_power(action):
@@ -442,6 +940,22 @@ def main():
     parser.add_argument('--auth-token', help='Custom authentication token')
     parser.add_argument('--generate-token', action='store_true', 
                        help='Generate a new auth token and exit')
+    parser.add_argument('--agent', action='append', metavar='URL',
+                       help='Hub mode: aggregate another server (repeatable)')
+    parser.add_argument('--agents-file',
+                       help='Hub mode: JSON list of agents ({"url", "token", "name"})')
+    parser.add_argument('--agent-token',
+                       help='Token for agents without their own (default: this server\'s token)')
+    parser.add_argument('--scan-daemon', nargs='?', const='', metavar='SOCKET',
+                       help='Answer /api/storage requests from the shared scan daemon (default socket if omitted)')
+    parser.add_argument('--history-db', metavar='FILE',
+                       help='Serve directory size history from this database at /api/storage/history')
+    parser.add_argument('--history-root', action='append', default=[], metavar='PATH',
+                       help='Record this directory into --history-db on a schedule (repeatable)')
+    parser.add_argument('--history-interval', default='1d',
+                       help='How often to record --history-root directories (e.g. 6h, 1d; default: 1d)')
+    parser.add_argument('--history-depth', type=int, default=3,
+                       help='Directory depth recorded below each --history-root (default: 3)')
     
     args = parser.parse_args()
     
@@ -454,10 +968,40 @@ def main():
     if os.geteuid() != 0:
         print("Warning: Not running as root. Power actions may require sudo.")
     
+    auth_token = args.auth_token or secrets.token_urlsafe(32)
+    try:
+        agents = load_agents(args.agent, args.agents_file, args.agent_token or auth_token)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not load agents: {e}")
+        sys.exit(1)
+    
+    history = None
+    if args.history_db or args.history_root:
+        if not storage_history:
+            print("❌ Storage history needs storage_history.py from the repository root")
+            sys.exit(1)
+        history = {
+            'db': args.history_db or storage_history.DEFAULT_HISTORY_DB,
+            'roots': args.history_root,
+            'interval': storage_history.parse_interval(args.history_interval),
+            'depth': args.history_depth,
+        }
+    
+    scan_daemon = None
+    if args.scan_daemon is not None:
+        socket_path = args.scan_daemon or (storage_daemon.DEFAULT_SOCKET if storage_daemon else '')
+        scan_daemon = storage_daemon.DaemonClient.connect(socket_path) if storage_daemon else None
+        if scan_daemon is None:
+            print(f"❌ No storage daemon listening on {socket_path} (start storage_daemon.py first)")
+            sys.exit(1)
+    
     server = ArchPowerControlServer(
         host=args.host,
         port=args.port,
-        auth_token=args.auth_token
+        auth_token=auth_token,
+        agents=agents,
+        history=history,
+        scan_daemon=scan_daemon
     )
     
     try:
@@ -465,6 +1009,10 @@ def main():
     except KeyboardInterrupt:
         print("\n⚡ Power Control Dashboard stopped by user")
         server.monitoring_active = False
+        if server.aggregator:
+            server.aggregator.stop()
+        if server.history_scheduler:
+            server.history_scheduler.stop()
     except Exception as e:
         print(f"❌ Server error: {e}")
         sys.exit(1)
@@ -10,13 +10,27 @@ const API_ENDPOINTS = {
     auth: '/api/auth/verify'
 };
 
+// Polling configuration (milliseconds)
+const DEFAULT_POLL_INTERVAL = 3000;
+const BLURRED_POLL_INTERVAL = 10000;
+const MAX_BACKOFF_INTERVAL = 60000;
+
 // Global state
 let systemData = {};
 let isConnected = false;
 let updateTimer = null;
-let reconnectTimer = null;
 let reconnectAttempts = 0;
 const MAX_RECONNECT_ATTEMPTS = 5;
+let pollInterval = DEFAULT_POLL_INTERVAL;
+let windowFocused = true;
+let requestInFlight = false;
+let lastEtag = null;
+
+// Render state: cached nodes, pending frame and keyed process rows
+const elementCache = {};
+const processRows = new Map();
+let pendingRenderData = null;
+let renderFrame = null;
 
 // Authentication functions
 function showAuthModal() {
@@ -115,68 +129,175 @@ function verifyAuthentication() {
 
 // System monitoring functions
 function startMonitoring() {
-    if (updateTimer) {
-        clearInterval(updateTimer);
-    }
-    
-    // Initial load
+    stopPolling();
+    reconnectAttempts = 0;
+
+    // Initial load; the response schedules the next poll
     updateSystemData();
-    
-    // Start regular updates
-    updateTimer = setInterval(updateSystemData, 3000);
-    
+
     updateConnectionStatus(true);
 }
 
 function stopMonitoring() {
+    stopPolling();
+    updateConnectionStatus(false);
+}
+
+function stopPolling() {
     if (updateTimer) {
-        clearInterval(updateTimer);
+        clearTimeout(updateTimer);
         updateTimer = null;
     }
-    
-    updateConnectionStatus(false);
+}
+
+function scheduleNextPoll(delay) {
+    stopPolling();
+
+    // Hidden tabs don't poll at all; visibilitychange resumes them
+    if (document.hidden || !isAuthenticated) {
+        return;
+    }
+
+    if (delay === undefined) {
+        delay = windowFocused ? pollInterval : Math.max(pollInterval, BLURRED_POLL_INTERVAL);
+    }
+    updateTimer = setTimeout(updateSystemData, delay);
+}
+
+function parseRetryAfter(value) {
+    // Retry-After is either delta-seconds or an HTTP date
+    if (!value) {
+        return null;
+    }
+    const seconds = Number(value);
+    if (!isNaN(seconds)) {
+        return Math.max(0, seconds * 1000);
+    }
+    const date = Date.parse(value);
+    return isNaN(date) ? null : Math.max(0, date - Date.now());
+}
+
+function applyServerHints(response) {
+    const hint = Number(response.headers.get('X-Refresh-Interval'));
+    if (hint > 0) {
+        pollInterval = Math.max(1000, hint * 1000);
+    }
+    return parseRetryAfter(response.headers.get('Retry-After'));
 }
 
 function updateSystemData() {
-    if (!isAuthenticated || !currentToken) {
+    if (!isAuthenticated || !currentToken || requestInFlight) {
         return;
     }
-    
-    fetch(API_ENDPOINTS.system, {
-        headers: {
-            'Authorization': `Bearer ${currentToken}`
-        }
-    })
+
+    const headers = {
+        'Authorization': `Bearer ${currentToken}`
+    };
+    if (lastEtag) {
+        headers['If-None-Match'] = lastEtag;
+    }
+
+    requestInFlight = true;
+    fetch(API_ENDPOINTS.system, { headers: headers, cache: 'no-cache' })
     .then(response => {
+        const retryAfter = applyServerHints(response);
+
+        if (response.status === 304) {
+            // Snapshot unchanged since the last poll
+            return { data: null, retryAfter: retryAfter };
+        }
         if (!response.ok) {
-            throw new Error(`HTTP ${response.status}`);
+            const error = new Error(`HTTP ${response.status}`);
+            error.retryAfter = retryAfter;
+            throw error;
         }
-        return response.json();
+
+        lastEtag = response.headers.get('ETag');
+        return response.json().then(data => ({ data: data, retryAfter: retryAfter }));
     })
-    .then(data => {
-        systemData = data;
-        updateUI(data);
+    .then(result => {
+        requestInFlight = false;
+        if (result.data) {
+            systemData = result.data;
+            scheduleRender(result.data);
+        }
+        if (reconnectAttempts > 0) {
+            showNotification('Connection restored', 'success');
+        }
         updateConnectionStatus(true);
         reconnectAttempts = 0;
+        scheduleNextPoll(result.retryAfter !== null ? Math.max(result.retryAfter, pollInterval) : undefined);
     })
     .catch(error => {
+        requestInFlight = false;
         console.error('Failed to update system data:', error);
         updateConnectionStatus(false);
-        handleConnectionError();
+        handleConnectionError(error.retryAfter);
     });
 }
 
-function handleConnectionError() {
-    if (reconnectAttempts < MAX_RECONNECT_ATTEMPTS) {
-        reconnectAttempts++;
-        showNotification(`Connection lost. Retrying... (${reconnectAttempts}/${MAX_RECONNECT_ATTEMPTS})`, 'warning');
-        
-        setTimeout(() => {
-            updateSystemData();
-        }, 5000 * reconnectAttempts);
-    } else {
-        stopMonitoring();
-        showNotification('Connection lost. Please refresh the page.', 'error');
+function handleConnectionError(retryAfter) {
+    reconnectAttempts++;
+
+    // Exponential backoff with jitter, capped; a server Retry-After wins
+    const backoff = Math.min(pollInterval * Math.pow(2, reconnectAttempts), MAX_BACKOFF_INTERVAL);
+    let delay = backoff / 2 + Math.random() * backoff / 2;
+    if (retryAfter !== undefined && retryAfter !== null) {
+        delay = Math.max(delay, retryAfter);
+    }
+
+    if (reconnectAttempts <= MAX_RECONNECT_ATTEMPTS) {
+        showNotification(`Connection lost. Retrying in ${Math.round(delay / 1000)}s... (${reconnectAttempts}/${MAX_RECONNECT_ATTEMPTS})`, 'warning');
+    } else if (reconnectAttempts === MAX_RECONNECT_ATTEMPTS + 1) {
+        showNotification('Connection lost. Still retrying in the background.', 'error');
+    }
+
+    scheduleNextPoll(delay);
+}
+
+// Rendering: writes are coalesced into one animation frame and only
+// touch nodes whose content actually changed.
+function scheduleRender(data) {
+    pendingRenderData = data;
+    if (renderFrame !== null) {
+        return;
+    }
+    renderFrame = requestAnimationFrame(() => {
+        renderFrame = null;
+        const latest = pendingRenderData;
+        pendingRenderData = null;
+        if (latest) {
+            updateUI(latest);
+        }
+    });
+}
+
+function byId(elementId) {
+    let element = elementCache[elementId];
+    if (!element || !element.isConnected) {
+        element = document.getElementById(elementId);
+        elementCache[elementId] = element;
+    }
+    return element;
+}
+
+function setText(element, text) {
+    if (!element) return;
+    text = String(text);
+    // Patch the existing text node instead of replacing children
+    const node = element.firstChild;
+    if (node && node.nodeType === Node.TEXT_NODE && !node.nextSibling) {
+        if (node.nodeValue !== text) {
+            node.nodeValue = text;
+        }
+    } else if (element.textContent !== text) {
+        element.textContent = text;
+    }
+}
+
+function setStyle(element, property, value) {
+    if (element && element.style[property] !== value) {
+        element.style[property] = value;
     }
 }
 
@@ -189,28 +310,28 @@ function updateUI(data) {
     // Update CPU
     if (data.cpu) {
         updateProgressRing('cpuProgress', data.cpu.usage_percent);
-        document.getElementById('cpuPercent').textContent = `${Math.round(data.cpu.usage_percent)}%`;
-        document.getElementById('cpuCores').textContent = data.cpu.count;
+        setText(byId('cpuPercent'), `${Math.round(data.cpu.usage_percent)}%`);
+        setText(byId('cpuCores'), data.cpu.count);
         
         if (data.cpu.frequency && data.cpu.frequency.current) {
-            document.getElementById('cpuFreq').textContent = `${Math.round(data.cpu.frequency.current / 1000)} MHz`;
+            setText(byId('cpuFreq'), `${Math.round(data.cpu.frequency.current / 1000)} MHz`);
         }
     }
     
     // Update Memory
     if (data.memory) {
         updateProgressRing('memoryProgress', data.memory.percent);
-        document.getElementById('memoryPercent').textContent = `${Math.round(data.memory.percent)}%`;
-        document.getElementById('memoryUsed').textContent = `${data.memory.used_gb} GB`;
-        document.getElementById('memoryTotal').textContent = `${data.memory.total_gb} GB`;
+        setText(byId('memoryPercent'), `${Math.round(data.memory.percent)}%`);
+        setText(byId('memoryUsed'), `${data.memory.used_gb} GB`);
+        setText(byId('memoryTotal'), `${data.memory.total_gb} GB`);
     }
     
     // Update Disk
     if (data.disk) {
         updateProgressRing('diskProgress', data.disk.percent);
-        document.getElementById('diskPercent').textContent = `${Math.round(data.disk.percent)}%`;
-        document.getElementById('diskUsed').textContent = `${data.disk.used_gb} GB`;
-        document.getElementById('diskFree').textContent = `${data.disk.free_gb} GB`;
+        setText(byId('diskPercent'), `${Math.round(data.disk.percent)}%`);
+        setText(byId('diskUsed'), `${data.disk.used_gb} GB`);
+        setText(byId('diskFree'), `${data.disk.free_gb} GB`);
     }
     
     // Update Temperature
@@ -225,18 +346,18 @@ function updateUI(data) {
     
     // Update System Info
     if (data.uptime) {
-        document.getElementById('uptime').textContent = data.uptime.formatted;
+        setText(byId('uptime'), data.uptime.formatted);
     }
     
     if (data.kernel) {
-        document.getElementById('kernel').textContent = data.kernel;
+        setText(byId('kernel'), data.kernel);
     }
     
     if (data.desktop) {
         const session = data.desktop.session || 'Unknown';
         const type = data.desktop.session_type || '';
-        document.getElementById('desktop').textContent = session;
-        document.getElementById('session').textContent = type;
+        setText(byId('desktop'), session);
+        setText(byId('session'), type);
     }
     
     // Update Processes
@@ -246,12 +367,12 @@ function updateUI(data) {
 }
 
 function updateProgressRing(elementId, percentage) {
-    const circle = document.getElementById(elementId);
+    const circle = byId(elementId);
     if (!circle) return;
     
     const circumference = 2 * Math.PI * 35; // radius = 35
     const offset = circumference - (percentage / 100) * circumference;
-    circle.style.strokeDashoffset = offset;
+    setStyle(circle, 'strokeDashoffset', String(offset));
 }
 
 function updateTemperature(tempData) {
@@ -267,7 +388,8 @@ function updateTemperature(tempData) {
     }
     
     if (maxTemp > 0) {
-        document.getElementById('tempValue').textContent = `${Math.round(maxTemp)}°C`;
+        const tempValue = byId('tempValue');
+        setText(tempValue, `${Math.round(maxTemp)}°C`);
         
         // Update temperature status and progress bar
         let status = 'Normal';
@@ -275,66 +397,97 @@ function updateTemperature(tempData) {
         
         if (maxTemp > 80) {
             status = 'Hot';
-            document.getElementById('tempValue').style.color = 'var(--accent-red)';
+            setStyle(tempValue, 'color', 'var(--accent-red)');
         } else if (maxTemp > 60) {
             status = 'Warm';
-            document.getElementById('tempValue').style.color = 'var(--accent-yellow)';
+            setStyle(tempValue, 'color', 'var(--accent-yellow)');
         } else {
-            document.getElementById('tempValue').style.color = 'var(--accent-green)';
+            setStyle(tempValue, 'color', 'var(--accent-green)');
         }
         
-        document.getElementById('tempStatus').textContent = status;
-        document.getElementById('tempProgress').style.width = `${Math.min(progressWidth, 100)}%`;
+        setText(byId('tempStatus'), status);
+        setStyle(byId('tempProgress'), 'width', `${Math.min(progressWidth, 100)}%`);
     }
 }
 
 function updateBattery(batteryData) {
-    const batteryIndicator = document.getElementById('batteryIndicator');
+    const batteryIndicator = byId('batteryIndicator');
     const batteryPercent = batteryIndicator.querySelector('.battery-percent');
     const batteryIcon = batteryIndicator.querySelector('.battery-icon');
     
     if (batteryData.percent !== null) {
-        batteryPercent.textContent = `${Math.round(batteryData.percent)}%`;
+        setText(batteryPercent, `${Math.round(batteryData.percent)}%`);
         
         // Update battery icon based on level and charging status
         if (batteryData.power_plugged) {
-            batteryIcon.textContent = '🔌';
+            setText(batteryIcon, '🔌');
         } else if (batteryData.percent > 75) {
-            batteryIcon.textContent = '🔋';
+            setText(batteryIcon, '🔋');
         } else if (batteryData.percent > 50) {
-            batteryIcon.textContent = '🔋';
+            setText(batteryIcon, '🔋');
         } else if (batteryData.percent > 25) {
-            batteryIcon.textContent = '🪫';
+            setText(batteryIcon, '🪫');
         } else {
-            batteryIcon.textContent = '🪫';
+            setText(batteryIcon, '🪫');
         }
     } else {
-        batteryPercent.textContent = 'AC';
-        batteryIcon.textContent = '🔌';
+        setText(batteryPercent, 'AC');
+        setText(batteryIcon, '🔌');
     }
 }
 
+function createProcessRow() {
+    const item = document.createElement('div');
+    item.className = 'process-item';
+    
+    const row = { element: item };
+    for (const field of ['name', 'cpu', 'memory']) {
+        const cell = document.createElement('div');
+        cell.className = `process-${field}`;
+        cell.appendChild(document.createTextNode(''));
+        item.appendChild(cell);
+        row[field] = cell;
+    }
+    return row;
+}
+
 function updateProcessList(processes) {
-    const processList = document.getElementById('processList');
+    const processList = byId('processList');
     const header = processList.querySelector('.process-header');
-    
-    // Clear existing items except header
-    const items = processList.querySelectorAll('.process-item');
-    items.forEach(item => item.remove());
-    
-    // Add new process items
-    processes.slice(0, 10).forEach(process => {
-        const item = document.createElement('div');
-        item.className = 'process-item';
+    const visible = processes.slice(0, 10);
+    const seen = new Set();
+    
+    // Rows are keyed by pid; existing nodes are patched and moved, never rebuilt
+    let cursor = header;
+    visible.forEach(process => {
+        const key = process.pid !== undefined ? process.pid : process.name;
+        if (seen.has(key)) return;
+        seen.add(key);
+        
+        let row = processRows.get(key);
+        if (!row) {
+            row = createProcessRow();
+            processRows.set(key, row);
+        }
         
-        item.innerHTML = `
-            <div class="process-name">${process.name || 'Unknown'}</div>
-            <div class="process-cpu">${(process.cpu_percent || 0).toFixed(1)}%</div>
-            <div class="process-memory">${(process.memory_percent || 0).toFixed(1)}%</div>
-        `;
+        setText(row.name, process.name || 'Unknown');
+        setText(row.cpu, `${(process.cpu_percent || 0).toFixed(1)}%`);
+        setText(row.memory, `${(process.memory_percent || 0).toFixed(1)}%`);
         
-        processList.appendChild(item);
+        const expected = cursor ? cursor.nextSibling : processList.firstChild;
+        if (row.element !== expected) {
+            processList.insertBefore(row.element, expected);
+        }
+        cursor = row.element;
     });
+    
+    // Drop rows for processes that left the top list
+    for (const [key, row] of processRows) {
+        if (!seen.has(key)) {
+            row.element.remove();
+            processRows.delete(key);
+        }
+    }
 }
 
 function updateConnectionStatus(connected) {
@@ -429,25 +582,24 @@ document.addEventListener('keydown', function(event) {
 // Handle page visibility changes
 document.addEventListener('visibilitychange', function() {
     if (document.hidden) {
-        stopMonitoring();
+        // Pause polling entirely while the tab is hidden
+        stopPolling();
     } else if (isAuthenticated) {
-        startMonitoring();
+        updateSystemData();
     }
 });
 
 // Handle window focus/blur
 window.addEventListener('focus', function() {
-    if (isAuthenticated && !updateTimer) {
-        startMonitoring();
+    windowFocused = true;
+    if (isAuthenticated && !updateTimer && !requestInFlight) {
+        updateSystemData();
     }
 });
 
 window.addEventListener('blur', function() {
     // Reduce update frequency when window is not focused
-    if (updateTimer) {
-        clearInterval(updateTimer);
-        updateTimer = setInterval(updateSystemData, 10000); // Update every 10 seconds
-    }
+    windowFocused = false;
 });
 
 // Cleanup on page unload
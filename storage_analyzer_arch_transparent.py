@@ -5,13 +5,26 @@ Swift-style interface with transparent background and excellent readability
 """
 
 import os
+import sqlite3
 import sys
 import threading
 import time
+from collections import deque
+from contextlib import nullcontext
 from tkinter import *
 from tkinter import ttk, messagebox, filedialog
 import tkinter.font as tkfont
 
+from storage_scanner import ScanProgress, SubtreeView, scan_tree
+from storage_daemon import DaemonClient, DaemonError, RemoteTree
+from storage_image import IMAGE_SUFFIX, ImageError, image_name, open_image, saved_entries, write_image
+from storage_profile import ScanProfile
+from storage_snapshot import (DEFAULT_SNAPSHOT_DIR, diff_entries, list_snapshots, snapshot_name,
+                              tree_entries, write_snapshot)
+from storage_history import DEFAULT_HISTORY_DB, DEFAULT_HISTORY_DEPTH, HistoryStore
+from storage_treemap import REST, TreemapLayout
+from storage_ui import UIUpdateQueue
+
 class ArchTransparentStorageAnalyzer:
     def __init__(self):
         self.root = Tk()
@@ -59,8 +72,47 @@ class ArchTransparentStorageAnalyzer:
         self.history = []
         self.current_unit = "GB"
         self.scanning = False
+        self.scan_result = None
+        self.largest_count = 50
+        
+        # Shared scan daemon, if one is running; otherwise scans run in this process
+        self.daemon = DaemonClient.connect()
+        # Opened scan image; directories inside it are browsed from the file instead of scanned
+        self.image = None
+        self.history_store = None
+        self.growth_points = []
+        
+        # Directory rows are inserted a page at a time; item id -> (parent item, node, next index)
+        self.page_size = 200
+        self.pending_more = {}
+        
+        # Treemap: layouts cached per scan, zoom path, and a cap on canvas items per redraw
+        self.treemap_layout = None
+        self.treemap_zoom = [0]
+        self.treemap_items = {}
+        self.treemap_max_items = 1000
+        self.treemap_redraw = None
+        
+        # Cold-data column: label -> (timestamp kind, minimum age in days)
+        self.cold_options = {
+            "Unmodified 30d+": ('mtime', 30),
+            "Unmodified 90d+": ('mtime', 90),
+            "Unmodified 1y+": ('mtime', 365),
+            "Unaccessed 30d+": ('atime', 30),
+            "Unaccessed 90d+": ('atime', 90),
+            "Unaccessed 1y+": ('atime', 365),
+        }
+        
+        # Debug toggle (F12): profile each scan and show where the time went
+        self.profiling = False
+        self.profile = None
+        self.profile_window = None
+        
+        # Worker threads reach the widgets only through this queue, drained every 50 ms
+        self.ui = UIUpdateQueue(self.root)
         
         self.setup_ui()
+        self.root.bind('<F12>', self.toggle_profiling)
         self.refresh_data()
     
     def setup_transparent_window(self):
@@ -244,6 +296,14 @@ class ArchTransparentStorageAnalyzer:
                                             self.browse_folder, self.colors['accent'])
         browse_btn.pack(fill=X, pady=(15, 0))
         
+        image_buttons = [
+            ("🗂️ Open Scan Image...", self.open_scan_image, self.colors['secondary']),
+            ("💾 Save Scan Image", self.save_scan_image, self.colors['primary']),
+        ]
+        for text, command, color in image_buttons:
+            btn = self.create_glass_button(nav_section, text, command, color)
+            btn.pack(fill=X, pady=(3, 0))
+        
         # Arch system info section
         self.create_arch_system_info(left_frame)
     
@@ -269,7 +329,7 @@ class ArchTransparentStorageAnalyzer:
         controls_frame.pack(side=RIGHT)
         
         self.refresh_btn = self.create_glass_button(controls_frame, "🔄 Refresh", 
-                                                   self.refresh_data, self.colors['primary'])
+                                                   lambda: self.refresh_data(rescan=True), self.colors['primary'])
         self.refresh_btn.pack(side=RIGHT, padx=(10, 0))
         
         # Clear cache button
@@ -277,6 +337,23 @@ class ArchTransparentStorageAnalyzer:
                                            self.clear_cache, self.colors['warning'])
         clear_btn.pack(side=RIGHT)
         
+        # Cold data selector and filter
+        cold_frame = Frame(controls_frame, bg='#ffffff40')
+        cold_frame.pack(side=RIGHT, padx=(0, 10))
+        
+        self.cold_var = StringVar(value="Unmodified 90d+")
+        cold_menu = ttk.Combobox(cold_frame, textvariable=self.cold_var,
+                                 values=list(self.cold_options), state="readonly", width=16,
+                                 font=self.fonts['caption'])
+        cold_menu.pack(side=LEFT, padx=(0, 8))
+        cold_menu.bind('<<ComboboxSelected>>', lambda e: self.populate_tree())
+        
+        self.cold_only_var = BooleanVar(value=False)
+        Checkbutton(cold_frame, text="❄️ Mostly cold only", variable=self.cold_only_var,
+                    command=self.populate_tree, font=self.fonts['caption'],
+                    fg=self.colors['text_primary'], bg='#ffffff40',
+                    activebackground='#ffffff60', highlightthickness=0).pack(side=LEFT)
+        
         # Loading indicator
         self.loading_frame = Frame(right_frame, bg='#ffffff40')
         self.loading_label = Label(self.loading_frame, text="⚡ Scanning directories...", 
@@ -288,8 +365,33 @@ class ArchTransparentStorageAnalyzer:
         list_container = self.create_glass_frame(right_frame, '#ffffff70')
         list_container.pack(fill=BOTH, expand=True, padx=25, pady=(0, 25))
         
-        # Directory tree
-        self.create_directory_tree(list_container)
+        # Tabbed views over the same scan
+        self.notebook = ttk.Notebook(list_container)
+        self.notebook.pack(fill=BOTH, expand=True)
+        
+        directories_tab = Frame(self.notebook, bg='#ffffff70')
+        self.notebook.add(directories_tab, text="📊 Directories")
+        self.create_directory_tree(directories_tab)
+        
+        treemap_tab = Frame(self.notebook, bg='#ffffff70')
+        self.notebook.add(treemap_tab, text="🗺️ Treemap")
+        self.create_treemap_panel(treemap_tab)
+        
+        largest_tab = Frame(self.notebook, bg='#ffffff70')
+        self.notebook.add(largest_tab, text="📄 Largest Files")
+        self.create_largest_files_panel(largest_tab)
+        
+        types_tab = Frame(self.notebook, bg='#ffffff70')
+        self.notebook.add(types_tab, text="🧩 File Types")
+        self.create_type_breakdown_panel(types_tab)
+        
+        changes_tab = Frame(self.notebook, bg='#ffffff70')
+        self.notebook.add(changes_tab, text="📈 Changes")
+        self.create_changes_panel(changes_tab)
+        
+        growth_tab = Frame(self.notebook, bg='#ffffff70')
+        self.notebook.add(growth_tab, text="📉 Growth")
+        self.create_growth_panel(growth_tab)
     
     def create_directory_tree(self, parent):
         """Create the directory tree view with enhanced styling"""
@@ -297,7 +399,7 @@ class ArchTransparentStorageAnalyzer:
         tree_frame.pack(fill=BOTH, expand=True, padx=2, pady=2)
         
         # Columns
-        columns = ('Name', 'Size', 'Type', 'Permission')
+        columns = ('Name', 'Size', 'Type', 'Cold', 'Permission')
         self.tree = ttk.Treeview(tree_frame, columns=columns, show='tree headings', height=22)
         
         # Configure columns
@@ -305,18 +407,21 @@ class ArchTransparentStorageAnalyzer:
         self.tree.heading('Name', text='Directory Name', anchor=W)
         self.tree.heading('Size', text='Size', anchor=E)
         self.tree.heading('Type', text='Type', anchor=W)
+        self.tree.heading('Cold', text=self.cold_var.get(), anchor=E)
         self.tree.heading('Permission', text='Access', anchor=W)
         
         self.tree.column('#0', width=60, minwidth=60)
         self.tree.column('Name', width=350, minwidth=250)
         self.tree.column('Size', width=120, minwidth=100)
-        self.tree.column('Type', width=100, minwidth=80)
+        self.tree.column('Type', width=160, minwidth=100)
+        self.tree.column('Cold', width=150, minwidth=110, anchor=E)
         self.tree.column('Permission', width=100, minwidth=80)
         
         # Scrollbars with styling
         v_scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(tree_frame, orient=HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(yscrollcommand=lambda first, last: self.on_tree_scrolled(v_scrollbar, first, last),
+                            xscrollcommand=h_scrollbar.set)
         
         # Pack scrollbars and tree
         v_scrollbar.pack(side=RIGHT, fill=Y)
@@ -326,6 +431,8 @@ class ArchTransparentStorageAnalyzer:
         # Bind events
         self.tree.bind('<Double-1>', self.on_directory_double_click)
         self.tree.bind('<Button-3>', self.show_context_menu)  # Right-click menu
+        self.tree.bind('<<TreeviewSelect>>', self.on_selection_changed)
+        self.tree.bind('<<TreeviewOpen>>', self.on_tree_open)
         
         # Style the treeview for transparency
         style = ttk.Style()
@@ -345,6 +452,508 @@ class ArchTransparentStorageAnalyzer:
         self.tree.tag_configure('large', background='#ff950020')
         self.tree.tag_configure('restricted', background='#ff3b3020')
         self.tree.tag_configure('normal', background='#ffffff00')
+        self.tree.tag_configure('cold', background='#1793d120')
+    
+    def create_largest_files_panel(self, parent):
+        """Create the largest files list, filled from the scan's top-K index"""
+        panel = Frame(parent, bg='#ffffff70')
+        panel.pack(fill=BOTH, expand=True, padx=2, pady=2)
+        
+        self.largest_scope_label = Label(panel, text="Largest files in the current directory",
+                                         font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                         bg='#ffffff70', anchor=W)
+        self.largest_scope_label.pack(fill=X, padx=10, pady=(8, 4))
+        
+        columns = ('Name', 'Size', 'Location')
+        self.largest_tree = ttk.Treeview(panel, columns=columns, show='headings', height=20)
+        self.largest_tree.heading('Name', text='File Name', anchor=W)
+        self.largest_tree.heading('Size', text='Size', anchor=E)
+        self.largest_tree.heading('Location', text='Location', anchor=W)
+        self.largest_tree.column('Name', width=280, minwidth=180)
+        self.largest_tree.column('Size', width=120, minwidth=100, anchor=E)
+        self.largest_tree.column('Location', width=400, minwidth=200)
+        
+        v_scrollbar = ttk.Scrollbar(panel, orient=VERTICAL, command=self.largest_tree.yview)
+        self.largest_tree.configure(yscrollcommand=v_scrollbar.set)
+        v_scrollbar.pack(side=RIGHT, fill=Y)
+        self.largest_tree.pack(side=LEFT, fill=BOTH, expand=True)
+    
+    def create_changes_panel(self, parent):
+        """Create the snapshot comparison view"""
+        panel = Frame(parent, bg='#ffffff70')
+        panel.pack(fill=BOTH, expand=True, padx=2, pady=2)
+        
+        header = Frame(panel, bg='#ffffff70')
+        header.pack(fill=X, padx=10, pady=(8, 4))
+        
+        self.changes_label = Label(header, text="Save a snapshot, then compare a later scan against it",
+                                   font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                   bg='#ffffff70', anchor=W)
+        self.changes_label.pack(side=LEFT, fill=X, expand=True)
+        
+        buttons = [
+            ("📂 Compare...", self.compare_with_snapshot, self.colors['secondary']),
+            ("🕘 Since Last Snapshot", self.compare_with_last_snapshot, self.colors['arch_blue']),
+            ("💾 Save Snapshot", self.save_snapshot, self.colors['primary']),
+        ]
+        for text, command, color in buttons:
+            btn = self.create_glass_button(header, text, command, color)
+            btn.pack(side=RIGHT, padx=(8, 0))
+        
+        columns = ('Change', 'Before', 'After', 'Growth')
+        self.changes_tree = ttk.Treeview(panel, columns=columns, show='tree headings', height=18)
+        self.changes_tree.heading('#0', text='Directory', anchor=W)
+        self.changes_tree.heading('Change', text='Change', anchor=E)
+        self.changes_tree.heading('Before', text='Before', anchor=E)
+        self.changes_tree.heading('After', text='After', anchor=E)
+        self.changes_tree.heading('Growth', text='Growth', anchor=E)
+        self.changes_tree.column('#0', width=380, minwidth=200)
+        self.changes_tree.column('Change', width=120, minwidth=90, anchor=E)
+        self.changes_tree.column('Before', width=110, minwidth=90, anchor=E)
+        self.changes_tree.column('After', width=110, minwidth=90, anchor=E)
+        self.changes_tree.column('Growth', width=80, minwidth=60, anchor=E)
+        self.changes_tree.tag_configure('section', font=self.fonts['body_medium'])
+        
+        v_scrollbar = ttk.Scrollbar(panel, orient=VERTICAL, command=self.changes_tree.yview)
+        self.changes_tree.configure(yscrollcommand=v_scrollbar.set)
+        v_scrollbar.pack(side=RIGHT, fill=Y)
+        self.changes_tree.pack(side=LEFT, fill=BOTH, expand=True)
+    
+    def save_snapshot(self):
+        """Write the current scan to the snapshot directory"""
+        tree = self.scan_result
+        if tree is None:
+            messagebox.showinfo("No Scan", "Wait for the current scan to finish first.")
+            return
+        target = os.path.join(DEFAULT_SNAPSHOT_DIR, snapshot_name(tree.root_path, tree.scanned_at))
+        
+        def save_thread():
+            try:
+                write_snapshot(tree, target)
+                self.ui.post(lambda: self.changes_label.config(text=f"Saved snapshot of {tree.root_path}"),
+                             key='changes')
+            except OSError as e:
+                self.ui.post(messagebox.showerror, "Snapshot Failed", str(e))
+        
+        threading.Thread(target=save_thread, daemon=True).start()
+    
+    def compare_with_last_snapshot(self):
+        """Compare the current scan with the newest snapshot of the same directory"""
+        if self.scan_result is None:
+            messagebox.showinfo("No Scan", "Wait for the current scan to finish first.")
+            return
+        snapshots = list_snapshots(self.scan_result.root_path)
+        if not snapshots:
+            messagebox.showinfo("No Snapshot", f"No snapshot of {self.scan_result.root_path} saved yet.")
+            return
+        self.show_changes(snapshots[0])
+    
+    def compare_with_snapshot(self):
+        """Pick any snapshot file to compare the current scan with"""
+        if self.scan_result is None:
+            messagebox.showinfo("No Scan", "Wait for the current scan to finish first.")
+            return
+        snapshot = filedialog.askopenfilename(initialdir=DEFAULT_SNAPSHOT_DIR,
+                                              filetypes=[("Storage snapshots", "*.snap.gz"),
+                                                         ("Scan images", f"*{IMAGE_SUFFIX}")])
+        if snapshot:
+            self.show_changes(snapshot)
+    
+    def show_changes(self, snapshot):
+        """Diff a snapshot or scan image against the current scan in the background and list the results"""
+        tree = self.scan_result
+        try:
+            root_path, scanned_at, before = saved_entries(snapshot)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Invalid Snapshot", str(e))
+            return
+        if root_path != tree.root_path:
+            messagebox.showerror("Different Directory",
+                                 f"That snapshot is of {root_path}, not {tree.root_path}.")
+            return
+        self.changes_label.config(text="Comparing...")
+        
+        def diff_thread():
+            try:
+                diff = diff_entries(before, tree_entries(tree), limit=50)
+            except (OSError, ValueError) as e:
+                message = f"Comparison failed: {e}"
+                self.ui.post(lambda: self.changes_label.config(text=message), key='changes')
+                return
+            self.ui.post(self.populate_changes, diff, tree.root_path, scanned_at)
+        
+        threading.Thread(target=diff_thread, daemon=True).start()
+    
+    def populate_changes(self, diff, root_path, scanned_at):
+        """Fill the Changes view with one section per ranking"""
+        self.changes_tree.delete(*self.changes_tree.get_children())
+        unit = self.current_unit
+        growth = self.bytes_to_unit(diff.total_after - diff.total_before, unit)
+        self.changes_label.config(
+            text=f"Since {time.strftime('%Y-%m-%d %H:%M', time.localtime(scanned_at))}: "
+                 f"{growth:+.2f} {unit} in total")
+        
+        sections = [
+            ("📈 Grew the most", diff.grown),
+            ("🚀 Grew the most relative to size", diff.relative),
+            (f"🆕 New directories ({diff.new_trees})", diff.new),
+            (f"🗑️ Vanished directories ({diff.vanished_trees})", diff.vanished),
+            ("📉 Shrank the most", diff.shrunk),
+        ]
+        for title, changes in sections:
+            if not changes:
+                continue
+            section = self.changes_tree.insert('', 'end', text=title, open=True, tags=('section',))
+            for change in changes:
+                ratio = f"{change.ratio * 100:+.0f}%" if change.ratio is not None else "new"
+                before = "—" if change.before is None else f"{self.bytes_to_unit(change.before, unit):.2f} {unit}"
+                after = "—" if change.after is None else f"{self.bytes_to_unit(change.after, unit):.2f} {unit}"
+                location = os.path.join(root_path, change.path) if change.path else root_path
+                self.changes_tree.insert(section, 'end', text=location,
+                                         values=(f"{self.bytes_to_unit(change.delta, unit):+.2f} {unit}",
+                                                 before, after, ratio))
+    
+    def create_growth_panel(self, parent):
+        """Create the size-over-time chart, read from the history database"""
+        panel = Frame(parent, bg='#ffffff70')
+        panel.pack(fill=BOTH, expand=True, padx=2, pady=2)
+        
+        header = Frame(panel, bg='#ffffff70')
+        header.pack(fill=X, padx=10, pady=(8, 4))
+        
+        self.growth_label = Label(header, text="Record history to chart how directories grow",
+                                  font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                  bg='#ffffff70', anchor=W)
+        self.growth_label.pack(side=LEFT, fill=X, expand=True)
+        
+        record_btn = self.create_glass_button(header, "⏺ Record Now", self.record_history,
+                                              self.colors['primary'])
+        record_btn.pack(side=RIGHT, padx=(8, 0))
+        
+        self.growth_canvas = Canvas(panel, bg='#ffffff70', highlightthickness=0)
+        self.growth_canvas.pack(fill=BOTH, expand=True, padx=10, pady=(0, 10))
+        self.growth_canvas.bind('<Configure>', lambda e: self.draw_growth_chart())
+    
+    def open_history_store(self, create=False):
+        """History database, opened on first use; None if it does not exist yet or cannot be opened"""
+        if self.history_store is None and (create or os.path.exists(DEFAULT_HISTORY_DB)):
+            try:
+                self.history_store = HistoryStore()
+            except (OSError, sqlite3.Error) as e:
+                self.growth_label.config(text=f"History unavailable: {e}")
+        return self.history_store
+    
+    def growth_path(self):
+        """Directory charted in the Growth tab: the selected row, else the current directory"""
+        tree = self.scan_result
+        if tree is None:
+            return self.current_path
+        node = self.selected_scan_node()
+        return tree.path(node) if node else tree.root_path
+    
+    def record_history(self):
+        """Record the current directory's sizes into the history database in the background"""
+        store = self.open_history_store(create=True)
+        if store is None:
+            return
+        path = self.current_path
+        self.growth_label.config(text=f"Recording {path}...")
+        
+        def record_thread():
+            try:
+                result = store.record(path, DEFAULT_HISTORY_DEPTH)
+            except (OSError, sqlite3.Error) as e:
+                message = f"Recording failed: {e}"
+                self.ui.post(lambda: self.growth_label.config(text=message), key='growth')
+                return
+            self.ui.post(self.update_growth_chart, key='growth')
+        
+        threading.Thread(target=record_thread, daemon=True).start()
+    
+    def update_growth_chart(self):
+        """Load the recorded series for the charted directory and redraw"""
+        store = self.open_history_store()
+        if store is None:
+            self.growth_points = []
+            self.draw_growth_chart()
+            return
+        path = self.growth_path()
+        try:
+            self.growth_points = [(t, size) for t, size in store.series(path)]
+        except sqlite3.Error as e:
+            self.growth_points = []
+            self.growth_label.config(text=f"History unavailable: {e}")
+            return
+        
+        sizes = [size for _, size in self.growth_points if size is not None]
+        if not sizes:
+            self.growth_label.config(text=f"No history for {path} yet - press Record Now "
+                                          f"or schedule --record-history")
+        else:
+            unit = self.current_unit
+            change = self.bytes_to_unit(sizes[-1] - sizes[0], unit)
+            self.growth_label.config(text=f"{path}: {change:+.2f} {unit} over "
+                                          f"{len(self.growth_points)} recorded runs")
+        self.draw_growth_chart()
+    
+    def draw_growth_chart(self):
+        """Draw the loaded series as a line, with gaps while the directory did not exist"""
+        canvas = self.growth_canvas
+        canvas.delete('all')
+        points = self.growth_points
+        sizes = [size for _, size in points if size is not None]
+        if not sizes:
+            return
+        
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        left, right, top, bottom = 80, 20, 20, 30
+        if width - left - right < 10 or height - top - bottom < 10:
+            return
+        
+        first, last = points[0][0], points[-1][0]
+        span = (last - first) or 1
+        peak = max(sizes) or 1
+        unit = self.current_unit
+        
+        def xy(taken_at, size):
+            x = left + (taken_at - first) / span * (width - left - right)
+            y = height - bottom - size / peak * (height - top - bottom)
+            return x, y
+        
+        # Axes and labels
+        canvas.create_line(left, top, left, height - bottom, width - right, height - bottom,
+                           fill=self.colors['secondary'])
+        canvas.create_text(left - 6, top, anchor=E, font=self.fonts['caption'],
+                           text=f"{self.bytes_to_unit(peak, unit):.2f} {unit}")
+        canvas.create_text(left - 6, height - bottom, anchor=E, font=self.fonts['caption'], text=f"0 {unit}")
+        canvas.create_text(left, height - bottom + 6, anchor=NW, font=self.fonts['caption'],
+                           text=time.strftime('%Y-%m-%d', time.localtime(first)))
+        canvas.create_text(width - right, height - bottom + 6, anchor=NE, font=self.fonts['caption'],
+                           text=time.strftime('%Y-%m-%d', time.localtime(last)))
+        
+        # One polyline per stretch where the directory existed
+        segment = []
+        for taken_at, size in points + [(last, None)]:
+            if size is None:
+                if len(segment) >= 4:
+                    canvas.create_line(*segment, fill=self.colors['arch_blue'], width=2)
+                elif segment:
+                    x, y = segment
+                    canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill=self.colors['arch_blue'], outline='')
+                segment = []
+            else:
+                segment.extend(xy(taken_at, size))
+    
+    def create_treemap_panel(self, parent):
+        """Create the treemap view: click a directory to zoom in, right-click to zoom out"""
+        panel = Frame(parent, bg='#ffffff70')
+        panel.pack(fill=BOTH, expand=True, padx=2, pady=2)
+        
+        header = Frame(panel, bg='#ffffff70')
+        header.pack(fill=X, padx=10, pady=(8, 4))
+        
+        self.treemap_label = Label(header, text="Click a directory to zoom in, right-click to zoom out",
+                                   font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                   bg='#ffffff70', anchor=W)
+        self.treemap_label.pack(side=LEFT, fill=X, expand=True)
+        
+        zoom_out_btn = self.create_glass_button(header, "🔍 Zoom Out", self.treemap_zoom_out,
+                                                self.colors['secondary'])
+        zoom_out_btn.pack(side=RIGHT, padx=(8, 0))
+        
+        # Tile colors by dominant file category; directories without type data use the Arch blue
+        self.treemap_colors = {
+            'Video & Audio': '#ff9500', 'Images': '#34c759', 'Documents': '#5ac8fa',
+            'Archives': '#af52de', 'Disk & VM Images': '#ff3b30', 'Build Artifacts': '#ffcc00',
+            'Caches': '#8e8e93', 'Source Code': '#007aff', 'Other': '#a2845e',
+        }
+        
+        self.treemap_canvas = Canvas(panel, bg='#ffffff70', highlightthickness=0)
+        self.treemap_canvas.pack(fill=BOTH, expand=True, padx=10, pady=(0, 10))
+        self.treemap_canvas.bind('<Configure>', lambda e: self.schedule_treemap_redraw())
+        self.treemap_canvas.bind('<Button-1>', self.on_treemap_click)
+        self.treemap_canvas.bind('<Button-3>', lambda e: self.treemap_zoom_out())
+        self.treemap_canvas.bind('<Motion>', self.on_treemap_hover)
+    
+    def reset_treemap(self):
+        """Start a new layout cache for a new scan and show it from the top"""
+        self.treemap_layout = TreemapLayout(self.scan_result) if self.scan_result is not None else None
+        self.treemap_zoom = [0]
+        self.draw_treemap()
+    
+    def schedule_treemap_redraw(self):
+        """Redraw once resizing settles instead of on every Configure event"""
+        if self.treemap_redraw is not None:
+            self.root.after_cancel(self.treemap_redraw)
+        self.treemap_redraw = self.root.after(50, self.draw_treemap)
+    
+    def treemap_color(self, node, depth):
+        """Fill for a tile: its dominant category, paler with each nesting level"""
+        label = self.treemap_layout.tree.type_label(node, default='')
+        base = self.treemap_colors.get(label.rsplit(' ', 1)[0], self.colors['arch_blue'])
+        blend = min(depth * 0.15, 0.6)
+        red, green, blue = (int(base[i:i + 2], 16) for i in (1, 3, 5))
+        return '#%02x%02x%02x' % tuple(int(c + (255 - c) * blend) for c in (red, green, blue))
+    
+    def draw_treemap(self):
+        """Draw the zoomed directory breadth first until the item budget runs out.
+        
+        Tiles smaller than the layout's minimum area are merged into their
+        directory's rest block, and directories too small to hold a header
+        and children are drawn as one block, so the item count and the
+        redraw time depend on the canvas size, not on the tree.
+        """
+        self.treemap_redraw = None
+        canvas = self.treemap_canvas
+        canvas.delete('all')
+        self.treemap_items = {}
+        layout = self.treemap_layout
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        if layout is None or width < 20 or height < 20:
+            return
+        
+        tree = layout.tree
+        unit = self.current_unit
+        header, pad, nest = 16, 2, 40
+        started = time.perf_counter()
+        budget = self.treemap_max_items
+        queue = deque([(self.treemap_zoom[-1], 0, 0, width, height, 0)])
+        while queue and budget > 0:
+            node, x, y, w, h, depth = queue.popleft()
+            top = header if depth else 0
+            for tile in layout.layout(node, int(w) - 2 * pad, int(h) - top - pad):
+                if budget <= 0:
+                    break
+                x0, y0 = x + pad + tile.x, y + top + tile.y
+                x1, y1 = x0 + tile.width, y0 + tile.height
+                if tile.node == REST:
+                    fill, name = '#d1d1d6', "files & smaller"
+                else:
+                    fill, name = self.treemap_color(tile.node, depth), tree.name(tile.node)
+                item = canvas.create_rectangle(x0, y0, x1, y1, fill=fill, outline='#ffffff')
+                self.treemap_items[item] = (tile.node, node, tile.size)
+                budget -= 1
+                
+                if tile.width > 60 and tile.height > header:
+                    # Canvas text is not clipped; cut labels to roughly the tile's width
+                    label = f"{name}  {self.bytes_to_unit(tile.size, unit):.2f} {unit}"
+                    label = label[:max(int((tile.width - 8) / 7), 1)]
+                    text = canvas.create_text(x0 + 4, y0 + 2, anchor=NW, font=self.fonts['caption'],
+                                              text=label)
+                    self.treemap_items[text] = (tile.node, node, tile.size)
+                    budget -= 1
+                if tile.node != REST and tile.width >= nest and tile.height >= nest + header:
+                    queue.append((tile.node, x0, y0, tile.width, tile.height, depth + 1))
+        
+        elapsed = (time.perf_counter() - started) * 1000
+        zoomed = self.treemap_zoom[-1]
+        self.treemap_label.config(text=f"{tree.path(zoomed) if zoomed else tree.root_path}  "
+                                       f"({len(self.treemap_items)} items, {elapsed:.0f} ms)")
+    
+    def treemap_target(self):
+        """(node, parent node, bytes) under the mouse pointer, or None"""
+        current = self.treemap_canvas.find_withtag('current')
+        return self.treemap_items.get(current[0]) if current else None
+    
+    def on_treemap_hover(self, event):
+        """Show the path and size of the tile under the pointer"""
+        target = self.treemap_target()
+        if target is None:
+            return
+        node, parent, size = target
+        tree = self.treemap_layout.tree
+        path = tree.path(parent) if node == REST else tree.path(node)
+        what = "files and small entries in " if node == REST else ""
+        size_display = self.bytes_to_unit(size, self.current_unit)
+        self.treemap_label.config(text=f"{what}{path}  {size_display:.2f} {self.current_unit}")
+    
+    def on_treemap_click(self, event):
+        """Zoom into the clicked directory; its layouts stay cached for zooming back"""
+        target = self.treemap_target()
+        if target is None or target[0] == REST:
+            return
+        node = target[0]
+        if len(self.treemap_layout.tree.sorted_children(node)):
+            self.treemap_zoom.append(node)
+            self.draw_treemap()
+    
+    def treemap_zoom_out(self):
+        """Back to the directory shown before the last zoom"""
+        if len(self.treemap_zoom) > 1:
+            self.treemap_zoom.pop()
+            self.draw_treemap()
+    
+    def create_type_breakdown_panel(self, parent):
+        """Create the per-category breakdown, read from the scan's rollups"""
+        panel = Frame(parent, bg='#ffffff70')
+        panel.pack(fill=BOTH, expand=True, padx=2, pady=2)
+        
+        self.types_scope_label = Label(panel, text="File types in the current directory",
+                                       font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                       bg='#ffffff70', anchor=W)
+        self.types_scope_label.pack(fill=X, padx=10, pady=(8, 4))
+        
+        columns = ('Type', 'Size', 'Share', 'Files')
+        self.types_tree = ttk.Treeview(panel, columns=columns, show='headings', height=12)
+        self.types_tree.heading('Type', text='Type', anchor=W)
+        self.types_tree.heading('Size', text='Size', anchor=E)
+        self.types_tree.heading('Share', text='Share', anchor=E)
+        self.types_tree.heading('Files', text='Files', anchor=E)
+        self.types_tree.column('Type', width=220, minwidth=150)
+        self.types_tree.column('Size', width=120, minwidth=100, anchor=E)
+        self.types_tree.column('Share', width=80, minwidth=60, anchor=E)
+        self.types_tree.column('Files', width=100, minwidth=80, anchor=E)
+        self.types_tree.pack(fill=BOTH, expand=True)
+    
+    def selected_scan_node(self):
+        """Scan node of the selected directory row, or None for the current directory"""
+        selection = self.tree.selection()
+        if self.scan_result is None or not selection or not selection[0].isdigit():
+            return None
+        return int(selection[0])
+    
+    def on_selection_changed(self, event=None):
+        """Refresh the detail tabs for the selected directory"""
+        self.update_largest_files()
+        self.update_type_breakdown()
+        self.update_growth_chart()
+    
+    def update_type_breakdown(self):
+        """Show bytes per file category for the selected directory"""
+        self.types_tree.delete(*self.types_tree.get_children())
+        tree = self.scan_result
+        if tree is None:
+            return
+        
+        node = self.selected_scan_node() or 0
+        total = tree.sizes[node]
+        self.types_scope_label.config(text=f"File types in {tree.path(node)}")
+        for name, size, files in tree.type_breakdown(node):
+            size_display = self.bytes_to_unit(size, self.current_unit)
+            share = size / total * 100 if total else 0
+            self.types_tree.insert('', 'end',
+                                   values=(name, f"{size_display:.2f} {self.current_unit}",
+                                           f"{share:.1f}%", files))
+    
+    def update_largest_files(self):
+        """Show the largest files overall, or under the selected directory"""
+        self.largest_tree.delete(*self.largest_tree.get_children())
+        tree = self.scan_result
+        if tree is None or tree.largest is None:
+            return
+        
+        # A selected row narrows the list to that subdirectory
+        node = self.selected_scan_node()
+        
+        scope = tree.path(node) if node else tree.root_path
+        self.largest_scope_label.config(text=f"Largest files in {scope}")
+        for size, path in tree.largest.results_under(tree, node):
+            size_display = self.bytes_to_unit(size, self.current_unit)
+            self.largest_tree.insert('', 'end',
+                                     values=(os.path.basename(path),
+                                             f"{size_display:.2f} {self.current_unit}",
+                                             os.path.dirname(os.path.relpath(path, tree.root_path)) or '.'),
+                                     tags=(path,))
     
     def create_arch_system_info(self, parent):
         """Create Arch Linux specific system information"""
@@ -467,7 +1076,11 @@ class ArchTransparentStorageAnalyzer:
     
     def clear_cache(self):
         """Clear any cached data"""
+        self.scan_result = None
+        self.pending_more = {}
         self.tree.delete(*self.tree.get_children())
+        self.largest_tree.delete(*self.largest_tree.get_children())
+        self.types_tree.delete(*self.types_tree.get_children())
         self.stats_label.config(text="Cache cleared")
         messagebox.showinfo("Cache Cleared", "Directory cache has been cleared.")
     
@@ -476,7 +1089,7 @@ class ArchTransparentStorageAnalyzer:
         try:
             cache_path = "/var/cache/pacman/pkg"
             if os.path.exists(cache_path):
-                size = self.get_directory_size(cache_path)
+                size = scan_tree(cache_path).sizes[0]
                 return self.bytes_to_unit(size, self.current_unit)
             return 0
         except:
@@ -503,22 +1116,6 @@ class ArchTransparentStorageAnalyzer:
         else:
             return b
     
-    def get_directory_size(self, path):
-        """Get directory size (optimized for Arch Linux)"""
-        total = 0
-        try:
-            for entry in os.scandir(path):
-                try:
-                    if entry.is_file(follow_symlinks=False):
-                        total += entry.stat().st_size
-                    elif entry.is_dir(follow_symlinks=False):
-                        total += self.get_directory_size(entry.path)
-                except (PermissionError, OSError):
-                    continue
-        except (PermissionError, OSError):
-            pass
-        return total
-    
     def get_filesystem_info(self, path):
         """Get filesystem information"""
         try:
@@ -546,81 +1143,198 @@ class ArchTransparentStorageAnalyzer:
         # Update Arch-specific info
         self.update_arch_info()
     
-    def refresh_data(self):
-        """Refresh directory data in background thread"""
+    def refresh_data(self, rescan=False):
+        """Refresh directory data in background thread; rescan skips the daemon's cached scan"""
         if self.scanning:
             return
         
         self.scanning = True
         self.show_loading(True)
         self.refresh_btn.configure(text="⏳ Scanning...")
+        self.path_label.config(text=self.current_path)
+        self.tree.delete(*self.tree.get_children())
+        self.ui.post(self.update_filesystem_info, key='filesystem')
+        self.profile = ScanProfile() if self.profiling else None
+        progress = ScanProgress()
+        self.show_scan_progress(progress)
         
+        # The thread never touches widgets; everything it shows goes through self.ui
         def scan_thread():
             try:
-                # Update path display
-                self.path_label.config(text=self.current_path)
-                
-                # Update filesystem info
-                self.root.after(0, self.update_filesystem_info)
-                
-                # Clear tree
-                self.root.after(0, lambda: self.tree.delete(*self.tree.get_children()))
-                
-                # Scan directories
-                dirs = []
-                file_count = 0
-                try:
-                    for entry in os.scandir(self.current_path):
-                        if entry.is_dir(follow_symlinks=False):
-                            try:
-                                size = self.get_directory_size(entry.path)
-                                dirs.append((entry.name, entry.path, size))
-                            except (PermissionError, OSError):
-                                dirs.append((entry.name, entry.path, 0))
-                        else:
-                            file_count += 1
-                except (PermissionError, OSError):
-                    pass
-                
-                # Sort by size
-                dirs.sort(key=lambda x: x[2], reverse=True)
-                
-                # Update tree in main thread
-                self.root.after(0, lambda: self.populate_tree(dirs))
+                # Scan the whole subtree once; sizes and largest files come from the same pass
+                tree = self.scan_directory(rescan, progress)
+                with self.profile.phase('sort') if self.profile else nullcontext():
+                    children = tree.sorted_children(0)
+                file_count = tree.file_counts[0] - sum(tree.file_counts[node] for node in children)
                 
                 # Update stats
-                self.root.after(0, lambda: self.stats_label.config(
-                    text=f"{len(dirs)} directories, {file_count} files"))
-                
+                stats = f"{len(children)} directories, {file_count} files"
+                if tree.skipped_mounts:
+                    stats += f" ({len(tree.skipped_mounts)} pseudo/remote mounts skipped)"
+                if self.image is not None:
+                    stats += f" - from scan image of {time.strftime('%Y-%m-%d %H:%M', time.localtime(tree.scanned_at))}"
+                self.ui.post(self.show_scan_result, tree, stats)
             finally:
-                self.scanning = False
-                self.root.after(0, lambda: self.show_loading(False))
-                self.root.after(0, lambda: self.refresh_btn.configure(text="🔄 Refresh"))
+                self.ui.post(self.scan_finished)
         
         threading.Thread(target=scan_thread, daemon=True).start()
     
-    def populate_tree(self, dirs):
-        """Populate the tree view with directory data"""
-        for name, path, size in dirs:
+    def show_scan_progress(self, progress):
+        """Live counters in the loading indicator, refreshed every UI batch while scanning"""
+        if not self.scanning:
+            return
+        self.loading_label.config(text=f"⚡ Scanning directories... {progress.dirs:,} directories, "
+                                       f"{progress.files:,} files")
+        self.ui.post(self.show_scan_progress, progress, key='progress')
+    
+    def show_scan_result(self, tree, stats):
+        """Show a finished scan; rows, detail panels and stats change in the same batch"""
+        self.scan_result = tree
+        self.populate_tree()
+        self.on_selection_changed()
+        self.stats_label.config(text=stats)
+        if self.profile is not None:
+            self.show_profile()
+    
+    def scan_finished(self):
+        """Re-enable scanning once the scan thread is done, whether or not it succeeded"""
+        self.scanning = False
+        self.show_loading(False)
+        self.refresh_btn.configure(text="🔄 Refresh")
+    
+    def scan_directory(self, rescan=False, progress=None):
+        """Tree for the current directory: from the open scan image, the scan daemon, or a local scan"""
+        if self.image is not None:
+            node = None if rescan else self.image.find(self.current_path)
+            if node is not None:
+                return self.image if node == 0 else SubtreeView(self.image, node)
+            # Refresh, or a directory outside the image: back to live scans
+            self.image = None
+        # A profiled scan runs here, where its walk can be timed
+        if self.daemon is not None and self.profile is None:
+            try:
+                return self.daemon.open_tree(self.current_path, refresh=rescan, progress=progress)
+            except (OSError, DaemonError):
+                # Daemon gone or unable to scan this path; fall back to scanning here
+                self.daemon = None
+        return scan_tree(self.current_path, progress=progress, top_files=self.largest_count, file_types=True,
+                         ages=True, permissions=True, profile=self.profile)
+    
+    def populate_tree(self):
+        """Show the first page of the scanned directory; the rest loads on scroll or expand"""
+        with self.profile.phase('populate_tree') if self.profile else nullcontext():
+            self.tree.heading('Cold', text=self.cold_var.get())
+            self.tree.delete(*self.tree.get_children())
+            self.pending_more = {}
+            if self.scan_result is not None:
+                self.insert_rows('', 0, 0)
+            self.reset_treemap()
+    
+    def toggle_profiling(self, event=None):
+        """Turn scan profiling on or off; the next scan shows where its time went"""
+        self.profiling = not self.profiling
+        self.stats_label.config(text="🐞 Profiling scans (F12 to stop)" if self.profiling else "Profiling off")
+        if self.profiling:
+            self.refresh_data()
+    
+    def show_profile(self):
+        """Show the last scan's profile in a window and on stderr"""
+        text = "\n".join(self.profile.summary())
+        print(text, file=sys.stderr)
+        if self.profile_window is None or not self.profile_window.winfo_exists():
+            self.profile_window = Toplevel(self.root)
+            self.profile_window.title("Scan Profile")
+            self.profile_window.configure(bg='#f5f5f7')
+            self.profile_text = Text(self.profile_window, font=self.fonts['mono'], width=110, height=30,
+                                     bg='#ffffff', fg=self.colors['text_primary'], relief=FLAT)
+            self.profile_text.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        self.profile_text.config(state=NORMAL)
+        self.profile_text.delete('1.0', END)
+        self.profile_text.insert(END, text)
+        self.profile_text.config(state=DISABLED)
+    
+    def insert_rows(self, parent_item, node, start):
+        """Insert the next page of node's children, largest first, under parent_item"""
+        tree = self.scan_result
+        children = tree.sorted_children(node)
+        more_item = f"{node}:more"
+        if self.pending_more.pop(more_item, None):
+            self.tree.delete(more_item)
+        
+        kind, days = self.cold_options[self.cold_var.get()]
+        cold_only = self.cold_only_var.get()
+        index = start
+        shown = 0
+        while index < len(children) and shown < self.page_size:
+            child = children[index]
+            size = tree.sizes[child]
             size_display = self.bytes_to_unit(size, self.current_unit)
-            if size_display >= 0.01:  # Only show if above threshold
-                # Check permissions and classify
-                accessible = os.access(path, os.R_OK)
-                icon = "📁" if accessible else "🔒"
-                type_text = "Directory" if accessible else "System"
-                perm_text = "Read/Write" if accessible else "Restricted"
-                
-                # Determine tag for styling
-                tag = 'normal'
-                if not accessible:
-                    tag = 'restricted'
-                elif size_display > 1:  # Large directories (> 1 unit)
-                    tag = 'large'
-                
-                self.tree.insert('', 'end', text=icon,
-                               values=(name, f"{size_display:.2f} {self.current_unit}", 
-                                     type_text, perm_text),
-                               tags=(path, tag))
+            if size_display < 0.01:  # Only show if above threshold; the rest are smaller still
+                return
+            index += 1
+            cold = tree.cold_bytes(child, days, kind)
+            if cold_only and cold * 2 < size:
+                continue
+            self.insert_row(parent_item, child, size_display, cold)
+            shown += 1
+        
+        if index < len(children):
+            self.tree.insert(parent_item, 'end', iid=more_item, text="⋯",
+                             values=(f"{len(children) - index} more directories...", "", "", "", ""))
+            self.pending_more[more_item] = (parent_item, node, index)
+    
+    def insert_row(self, parent_item, node, size_display, cold):
+        """Insert one directory row; permissions come from the scan's mode bits"""
+        tree = self.scan_result
+        readable, writable = tree.access(node)
+        icon = "📁" if readable else "🔒"
+        type_text = tree.type_label(node) if readable else "System"
+        if not readable:
+            perm_text = "Restricted"
+        else:
+            perm_text = "Read/Write" if writable else "Read only"
+        
+        size = tree.sizes[node]
+        cold_share = cold / size * 100 if size else 0
+        cold_text = f"{self.bytes_to_unit(cold, self.current_unit):.2f} {self.current_unit} ({cold_share:.0f}%)"
+        
+        # Determine tag for styling
+        tag = 'normal'
+        if not readable:
+            tag = 'restricted'
+        elif size_display > 1:  # Large directories (> 1 unit)
+            tag = 'large'
+        elif cold_share >= 50:
+            tag = 'cold'
+        
+        item = str(node)
+        self.tree.insert(parent_item, 'end', iid=item, text=icon,
+                         values=(tree.name(node), f"{size_display:.2f} {self.current_unit}",
+                                 type_text, cold_text, perm_text),
+                         tags=(tree.path(node), tag))
+        # Placeholder child so the row can be expanded; replaced on first open
+        if tree.first_child[node] >= 0:
+            self.tree.insert(item, 'end', iid=f"{node}:stub", text="")
+    
+    def on_tree_open(self, event):
+        """Load a directory's children the first time it is expanded"""
+        item = self.tree.focus()
+        stub = f"{item}:stub"
+        if self.tree.exists(stub):
+            self.tree.delete(stub)
+            self.insert_rows(item, int(item), 0)
+    
+    def on_tree_scrolled(self, scrollbar, first, last):
+        """Keep the scrollbar in sync and load pages whose "more" row came into view"""
+        scrollbar.set(first, last)
+        if self.pending_more:
+            self.root.after_idle(self.load_visible_pages)
+    
+    def load_visible_pages(self):
+        """Replace visible "more" rows with the next page of directories"""
+        for more_item, page in list(self.pending_more.items()):
+            if more_item in self.pending_more and self.tree.bbox(more_item):
+                self.insert_rows(*page)
     
     def show_loading(self, show):
         """Show or hide loading indicator"""
@@ -633,11 +1347,15 @@ class ArchTransparentStorageAnalyzer:
         """Handle directory double-click"""
         selection = self.tree.selection()
         if selection:
+            if selection[0] in self.pending_more:
+                self.insert_rows(*self.pending_more[selection[0]])
+                return
             item = self.tree.item(selection[0])
             if item['tags']:
                 new_path = item['tags'][0]
                 if new_path.startswith('/') or new_path.startswith('~'):
-                    if os.access(new_path, os.R_OK):
+                    node = self.selected_scan_node()
+                    if node is not None and self.scan_result.access(node)[0]:
                         self.history.append(self.current_path)
                         self.current_path = new_path
                         self.refresh_data()
@@ -684,6 +1402,45 @@ class ArchTransparentStorageAnalyzer:
             self.current_path = folder
             self.refresh_data()
     
+    def open_scan_image(self):
+        """Browse a saved scan image; it opens instantly, without touching the scanned disk"""
+        path = filedialog.askopenfilename(initialdir=DEFAULT_SNAPSHOT_DIR,
+                                          filetypes=[("Scan images", f"*{IMAGE_SUFFIX}")])
+        if not path:
+            return
+        try:
+            image = open_image(path)
+        except (OSError, ImageError) as e:
+            messagebox.showerror("Invalid Scan Image", str(e))
+            return
+        self.image = image
+        self.history.append(self.current_path)
+        self.current_path = image.root_path
+        self.refresh_data()
+    
+    def save_scan_image(self):
+        """Write the current scan as a scan image in the snapshot directory"""
+        tree = self.scan_result
+        if tree is None:
+            messagebox.showinfo("No Scan", "Wait for the current scan to finish first.")
+            return
+        
+        def save_thread():
+            try:
+                if isinstance(tree, RemoteTree):
+                    # The daemon holds the scan and writes all of it, named after its root
+                    os.makedirs(DEFAULT_SNAPSHOT_DIR, exist_ok=True)
+                    target = tree.save_image(DEFAULT_SNAPSHOT_DIR)
+                else:
+                    whole = tree.tree if isinstance(tree, SubtreeView) else tree
+                    target = write_image(whole, os.path.join(DEFAULT_SNAPSHOT_DIR,
+                                                             image_name(whole.root_path, whole.scanned_at)))
+                self.ui.post(lambda: self.stats_label.config(text=f"Saved scan image to {target}"))
+            except (OSError, DaemonError) as e:
+                self.ui.post(messagebox.showerror, "Save Failed", str(e))
+        
+        threading.Thread(target=save_thread, daemon=True).start()
+    
     def open_in_filemanager(self):
         """Open selected directory in file manager"""
         selection = self.tree.selection()
@@ -6,6 +6,14 @@ import time
 from tkinter import *
 from tkinter import ttk, messagebox, filedialog
 import tkinter.font as tkfont
+from contextlib import nullcontext
+
+from storage_scanner import ScanProgress, SubtreeView, scan_tree
+from storage_daemon import DaemonClient, DaemonError, RemoteTree
+from storage_image import IMAGE_SUFFIX, ImageError, image_name, open_image, write_image
+from storage_profile import ScanProfile
+from storage_snapshot import DEFAULT_SNAPSHOT_DIR
+from storage_ui import UIUpdateQueue
 
 class SwiftStyleApp:
     def __init__(self):
@@ -36,8 +44,28 @@ class SwiftStyleApp:
         self.history = []
         self.current_unit = "GB"
         self.scanning = False
+        self.scan_result = None
+        self.largest_count = 50
+        
+        # Shared scan daemon, if one is running; otherwise scans run in this process
+        self.daemon = DaemonClient.connect()
+        # Opened scan image; directories inside it are browsed from the file instead of scanned
+        self.image = None
+        
+        # Directory rows are inserted a page at a time; item id -> (parent item, node, next index)
+        self.page_size = 200
+        self.pending_more = {}
+        
+        # Debug toggle (F12): profile each scan and show where the time went
+        self.profiling = False
+        self.profile = None
+        self.profile_window = None
+        
+        # Worker threads reach the widgets only through this queue, drained every 50 ms
+        self.ui = UIUpdateQueue(self.root)
         
         self.setup_ui()
+        self.root.bind('<F12>', self.toggle_profiling)
         self.refresh_data()
     
     def setup_fonts(self):
@@ -156,6 +184,14 @@ class SwiftStyleApp:
         browse_btn = self.create_modern_button(nav_section, "📂 Browse...", self.browse_folder, self.colors['accent'])
         browse_btn.pack(fill=X, pady=(10, 0))
         
+        image_buttons = [
+            ("🗂️ Open Scan...", self.open_scan_image, self.colors['secondary']),
+            ("💾 Save Scan", self.save_scan_image, self.colors['primary']),
+        ]
+        for text, command, color in image_buttons:
+            btn = self.create_modern_button(nav_section, text, command, color)
+            btn.pack(fill=X, pady=(2, 0))
+        
         # Filesystem info section
         self.create_filesystem_info(left_frame)
     
@@ -172,7 +208,7 @@ class SwiftStyleApp:
               fg=self.colors['text_primary'], bg=self.colors['card_bg']).pack(side=LEFT)
         
         # Refresh button
-        self.refresh_btn = self.create_modern_button(list_header, "🔄 Refresh", self.refresh_data, self.colors['primary'])
+        self.refresh_btn = self.create_modern_button(list_header, "🔄 Refresh", lambda: self.refresh_data(rescan=True), self.colors['primary'])
         self.refresh_btn.pack(side=RIGHT)
         
         # Loading indicator
@@ -186,8 +222,21 @@ class SwiftStyleApp:
         list_container = Frame(right_frame, bg=self.colors['bg'], relief=SOLID, bd=1)
         list_container.pack(fill=BOTH, expand=True, padx=20, pady=(0, 20))
         
-        # Treeview for directory listing
-        self.create_directory_tree(list_container)
+        # Tabbed views over the same scan
+        self.notebook = ttk.Notebook(list_container)
+        self.notebook.pack(fill=BOTH, expand=True)
+        
+        directories_tab = Frame(self.notebook, bg=self.colors['card_bg'])
+        self.notebook.add(directories_tab, text="Directories")
+        self.create_directory_tree(directories_tab)
+        
+        largest_tab = Frame(self.notebook, bg=self.colors['card_bg'])
+        self.notebook.add(largest_tab, text="Largest Files")
+        self.create_largest_files_panel(largest_tab)
+        
+        types_tab = Frame(self.notebook, bg=self.colors['card_bg'])
+        self.notebook.add(types_tab, text="File Types")
+        self.create_type_breakdown_panel(types_tab)
     
     def create_directory_tree(self, parent):
         """Create the directory tree view"""
@@ -207,12 +256,13 @@ class SwiftStyleApp:
         self.tree.column('#0', width=50, minwidth=50)
         self.tree.column('Name', width=300, minwidth=200)
         self.tree.column('Size', width=120, minwidth=100)
-        self.tree.column('Type', width=100, minwidth=80)
+        self.tree.column('Type', width=160, minwidth=100)
         
         # Scrollbars
         v_scrollbar = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(tree_frame, orient=HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(yscrollcommand=lambda first, last: self.on_tree_scrolled(v_scrollbar, first, last),
+                            xscrollcommand=h_scrollbar.set)
         
         # Pack scrollbars and tree
         v_scrollbar.pack(side=RIGHT, fill=Y)
@@ -221,6 +271,8 @@ class SwiftStyleApp:
         
         # Bind double-click
         self.tree.bind('<Double-1>', self.on_directory_double_click)
+        self.tree.bind('<<TreeviewSelect>>', self.on_selection_changed)
+        self.tree.bind('<<TreeviewOpen>>', self.on_tree_open)
         
         # Style the treeview
         style = ttk.Style()
@@ -229,6 +281,101 @@ class SwiftStyleApp:
         style.configure('Treeview.Heading', background=self.colors['bg'], 
                        foreground=self.colors['text_primary'], font=self.fonts['body_medium'])
     
+    def create_largest_files_panel(self, parent):
+        """Create the largest files list, filled from the scan's top-K index"""
+        panel = Frame(parent, bg=self.colors['card_bg'])
+        panel.pack(fill=BOTH, expand=True, padx=1, pady=1)
+        
+        self.largest_scope_label = Label(panel, text="Largest files in the current directory",
+                                         font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                         bg=self.colors['card_bg'], anchor=W)
+        self.largest_scope_label.pack(fill=X, padx=10, pady=(8, 4))
+        
+        columns = ('Name', 'Size', 'Location')
+        self.largest_tree = ttk.Treeview(panel, columns=columns, show='headings', height=20)
+        self.largest_tree.heading('Name', text='Name', anchor=W)
+        self.largest_tree.heading('Size', text='Size', anchor=E)
+        self.largest_tree.heading('Location', text='Location', anchor=W)
+        self.largest_tree.column('Name', width=250, minwidth=150)
+        self.largest_tree.column('Size', width=120, minwidth=100, anchor=E)
+        self.largest_tree.column('Location', width=350, minwidth=150)
+        
+        v_scrollbar = ttk.Scrollbar(panel, orient=VERTICAL, command=self.largest_tree.yview)
+        self.largest_tree.configure(yscrollcommand=v_scrollbar.set)
+        v_scrollbar.pack(side=RIGHT, fill=Y)
+        self.largest_tree.pack(side=LEFT, fill=BOTH, expand=True)
+    
+    def create_type_breakdown_panel(self, parent):
+        """Create the per-category breakdown, read from the scan's rollups"""
+        panel = Frame(parent, bg=self.colors['card_bg'])
+        panel.pack(fill=BOTH, expand=True, padx=1, pady=1)
+        
+        self.types_scope_label = Label(panel, text="File types in the current directory",
+                                       font=self.fonts['caption'], fg=self.colors['text_secondary'],
+                                       bg=self.colors['card_bg'], anchor=W)
+        self.types_scope_label.pack(fill=X, padx=10, pady=(8, 4))
+        
+        columns = ('Type', 'Size', 'Share', 'Files')
+        self.types_tree = ttk.Treeview(panel, columns=columns, show='headings', height=12)
+        self.types_tree.heading('Type', text='Type', anchor=W)
+        self.types_tree.heading('Size', text='Size', anchor=E)
+        self.types_tree.heading('Share', text='Share', anchor=E)
+        self.types_tree.heading('Files', text='Files', anchor=E)
+        self.types_tree.column('Type', width=220, minwidth=150)
+        self.types_tree.column('Size', width=120, minwidth=100, anchor=E)
+        self.types_tree.column('Share', width=80, minwidth=60, anchor=E)
+        self.types_tree.column('Files', width=100, minwidth=80, anchor=E)
+        self.types_tree.pack(fill=BOTH, expand=True)
+    
+    def selected_scan_node(self):
+        """Scan node of the selected directory row, or None for the current directory"""
+        selection = self.tree.selection()
+        if self.scan_result is None or not selection or not selection[0].isdigit():
+            return None
+        return int(selection[0])
+    
+    def on_selection_changed(self, event=None):
+        """Refresh the detail tabs for the selected directory"""
+        self.update_largest_files()
+        self.update_type_breakdown()
+    
+    def update_type_breakdown(self):
+        """Show bytes per file category for the selected directory"""
+        self.types_tree.delete(*self.types_tree.get_children())
+        tree = self.scan_result
+        if tree is None:
+            return
+        
+        node = self.selected_scan_node() or 0
+        total = tree.sizes[node]
+        self.types_scope_label.config(text=f"File types in {tree.path(node)}")
+        for name, size, files in tree.type_breakdown(node):
+            size_display = self.bytes_to_unit(size, self.current_unit)
+            share = size / total * 100 if total else 0
+            self.types_tree.insert('', 'end',
+                                   values=(name, f"{size_display:.2f} {self.current_unit}",
+                                           f"{share:.1f}%", files))
+    
+    def update_largest_files(self):
+        """Show the largest files overall, or under the selected directory"""
+        self.largest_tree.delete(*self.largest_tree.get_children())
+        tree = self.scan_result
+        if tree is None or tree.largest is None:
+            return
+        
+        # A selected row narrows the list to that subdirectory
+        node = self.selected_scan_node()
+        
+        scope = tree.path(node) if node else tree.root_path
+        self.largest_scope_label.config(text=f"Largest files in {scope}")
+        for size, path in tree.largest.results_under(tree, node):
+            size_display = self.bytes_to_unit(size, self.current_unit)
+            self.largest_tree.insert('', 'end',
+                                     values=(os.path.basename(path),
+                                             f"{size_display:.2f} {self.current_unit}",
+                                             os.path.dirname(os.path.relpath(path, tree.root_path)) or '.'),
+                                     tags=(path,))
+    
     def create_filesystem_info(self, parent):
         """Create filesystem information display"""
         fs_section = Frame(parent, bg=self.colors['card_bg'])
@@ -299,22 +446,6 @@ class SwiftStyleApp:
         else:
             return b
     
-    def get_directory_size(self, path):
-        """Get directory size (runs in background thread)"""
-        total = 0
-        try:
-            for entry in os.scandir(path):
-                try:
-                    if entry.is_file(follow_symlinks=False):
-                        total += entry.stat().st_size
-                    elif entry.is_dir(follow_symlinks=False):
-                        total += self.get_directory_size(entry.path)
-                except (PermissionError, OSError):
-                    continue
-        except (PermissionError, OSError):
-            pass
-        return total
-    
     def get_filesystem_info(self, path):
         """Get filesystem information"""
         try:
@@ -339,65 +470,161 @@ class SwiftStyleApp:
             self.used_label.config(text="Used: --")
             self.free_label.config(text="Free: --")
     
-    def refresh_data(self):
-        """Refresh directory data in background thread"""
+    def refresh_data(self, rescan=False):
+        """Refresh directory data in background thread; rescan skips the daemon's cached scan"""
         if self.scanning:
             return
         
         self.scanning = True
         self.show_loading(True)
         self.refresh_btn.config(state=DISABLED)
-        
+        self.path_label.config(text=self.current_path)
+        self.tree.delete(*self.tree.get_children())
+        self.ui.post(self.update_filesystem_info, key='filesystem')
+        self.profile = ScanProfile() if self.profiling else None
+        progress = ScanProgress()
+        self.show_scan_progress(progress)
+        
+        # The thread never touches widgets; everything it shows goes through self.ui
         def scan_thread():
             try:
-                # Update path display
-                self.path_label.config(text=self.current_path)
-                
-                # Update filesystem info
-                self.root.after(0, self.update_filesystem_info)
-                
-                # Clear tree
-                self.root.after(0, lambda: self.tree.delete(*self.tree.get_children()))
-                
-                # Scan directories
-                dirs = []
-                try:
-                    for entry in os.scandir(self.current_path):
-                        if entry.is_dir(follow_symlinks=False):
-                            try:
-                                size = self.get_directory_size(entry.path)
-                                dirs.append((entry.name, entry.path, size))
-                            except (PermissionError, OSError):
-                                dirs.append((entry.name, entry.path, 0))
-                except (PermissionError, OSError):
-                    pass
-                
-                # Sort by size
-                dirs.sort(key=lambda x: x[2], reverse=True)
-                
-                # Update tree in main thread
-                self.root.after(0, lambda: self.populate_tree(dirs))
-                
+                # Scan the whole subtree once; sizes and largest files come from the same pass
+                tree = self.scan_directory(rescan, progress)
+                with self.profile.phase('sort') if self.profile else nullcontext():
+                    tree.sorted_children(0)  # Sort the top level off the main thread
+                self.ui.post(self.show_scan_result, tree)
             finally:
-                self.scanning = False
-                self.root.after(0, lambda: self.show_loading(False))
-                self.root.after(0, lambda: self.refresh_btn.config(state=NORMAL))
+                self.ui.post(self.scan_finished)
         
         threading.Thread(target=scan_thread, daemon=True).start()
     
-    def populate_tree(self, dirs):
-        """Populate the tree view with directory data"""
-        for name, path, size in dirs:
-            size_display = self.bytes_to_unit(size, self.current_unit)
-            if size_display >= 0.01:  # Only show if above threshold
-                # Check permissions
-                accessible = os.access(path, os.R_OK)
-                icon = "📁" if accessible else "🔒"
-                type_text = "Directory" if accessible else "Restricted"
-                
-                self.tree.insert('', 'end', text=icon, 
-                               values=(name, f"{size_display:.2f} {self.current_unit}", type_text),
-                               tags=(path,))
+    def show_scan_progress(self, progress):
+        """Live counters in the loading indicator, refreshed every UI batch while scanning"""
+        if not self.scanning:
+            return
+        self.loading_label.config(text=f"🔄 Scanning directories... {progress.dirs:,} directories, "
+                                       f"{progress.files:,} files")
+        self.ui.post(self.show_scan_progress, progress, key='progress')
+    
+    def show_scan_result(self, tree):
+        """Show a finished scan; rows and detail panels change in the same batch"""
+        self.scan_result = tree
+        self.populate_tree()
+        self.on_selection_changed()
+        if self.profile is not None:
+            self.show_profile()
+    
+    def scan_finished(self):
+        """Re-enable scanning once the scan thread is done, whether or not it succeeded"""
+        self.scanning = False
+        self.show_loading(False)
+        self.refresh_btn.config(state=NORMAL)
+    
+    def scan_directory(self, rescan=False, progress=None):
+        """Tree for the current directory: from the open scan image, the scan daemon, or a local scan"""
+        if self.image is not None:
+            node = None if rescan else self.image.find(self.current_path)
+            if node is not None:
+                return self.image if node == 0 else SubtreeView(self.image, node)
+            # Refresh, or a directory outside the image: back to live scans
+            self.image = None
+        # A profiled scan runs here, where its walk can be timed
+        if self.daemon is not None and self.profile is None:
+            try:
+                return self.daemon.open_tree(self.current_path, refresh=rescan, progress=progress)
+            except (OSError, DaemonError):
+                # Daemon gone or unable to scan this path; fall back to scanning here
+                self.daemon = None
+        return scan_tree(self.current_path, progress=progress, top_files=self.largest_count, file_types=True,
+                         profile=self.profile)
+    
+    def populate_tree(self):
+        """Show the first page of the scanned directory; the rest loads on scroll or expand"""
+        with self.profile.phase('populate_tree') if self.profile else nullcontext():
+            self.tree.delete(*self.tree.get_children())
+            self.pending_more = {}
+            if self.scan_result is not None:
+                self.insert_rows('', 0, 0)
+    
+    def toggle_profiling(self, event=None):
+        """Turn scan profiling on or off; the next scan shows where its time went"""
+        self.profiling = not self.profiling
+        self.root.title("Storage Analyzer (profiling)" if self.profiling else "Storage Analyzer")
+        if self.profiling:
+            self.refresh_data()
+    
+    def show_profile(self):
+        """Show the last scan's profile in a window and on stderr"""
+        text = "\n".join(self.profile.summary())
+        print(text, file=sys.stderr)
+        if self.profile_window is None or not self.profile_window.winfo_exists():
+            self.profile_window = Toplevel(self.root)
+            self.profile_window.title("Scan Profile")
+            self.profile_text = Text(self.profile_window, font='TkFixedFont', width=110, height=30,
+                                     bg=self.colors['card_bg'], fg=self.colors['text_primary'], relief=FLAT)
+            self.profile_text.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        self.profile_text.config(state=NORMAL)
+        self.profile_text.delete('1.0', END)
+        self.profile_text.insert(END, text)
+        self.profile_text.config(state=DISABLED)
+    
+    def insert_rows(self, parent_item, node, start):
+        """Insert the next page of node's children, largest first, under parent_item"""
+        tree = self.scan_result
+        children = tree.sorted_children(node)
+        more_item = f"{node}:more"
+        if self.pending_more.pop(more_item, None):
+            self.tree.delete(more_item)
+        
+        index = start
+        end = min(start + self.page_size, len(children))
+        while index < end:
+            child = children[index]
+            size_display = self.bytes_to_unit(tree.sizes[child], self.current_unit)
+            if size_display < 0.01:  # Only show if above threshold; the rest are smaller still
+                return
+            self.insert_row(parent_item, child, size_display)
+            index += 1
+        
+        if index < len(children):
+            self.tree.insert(parent_item, 'end', iid=more_item, text="⋯",
+                             values=(f"{len(children) - index} more directories...", "", ""))
+            self.pending_more[more_item] = (parent_item, node, index)
+    
+    def insert_row(self, parent_item, node, size_display):
+        """Insert one directory row; permissions come from the scan's mode bits"""
+        tree = self.scan_result
+        accessible, _ = tree.access(node)
+        icon = "📁" if accessible else "🔒"
+        type_text = tree.type_label(node) if accessible else "Restricted"
+        
+        item = str(node)
+        self.tree.insert(parent_item, 'end', iid=item, text=icon,
+                         values=(tree.name(node), f"{size_display:.2f} {self.current_unit}", type_text),
+                         tags=(tree.path(node),))
+        # Placeholder child so the row can be expanded; replaced on first open
+        if tree.first_child[node] >= 0:
+            self.tree.insert(item, 'end', iid=f"{node}:stub", text="")
+    
+    def on_tree_open(self, event):
+        """Load a directory's children the first time it is expanded"""
+        item = self.tree.focus()
+        stub = f"{item}:stub"
+        if self.tree.exists(stub):
+            self.tree.delete(stub)
+            self.insert_rows(item, int(item), 0)
+    
+    def on_tree_scrolled(self, scrollbar, first, last):
+        """Keep the scrollbar in sync and load pages whose "more" row came into view"""
+        scrollbar.set(first, last)
+        if self.pending_more:
+            self.root.after_idle(self.load_visible_pages)
+    
+    def load_visible_pages(self):
+        """Replace visible "more" rows with the next page of directories"""
+        for more_item, page in list(self.pending_more.items()):
+            if more_item in self.pending_more and self.tree.bbox(more_item):
+                self.insert_rows(*page)
     
     def show_loading(self, show):
         """Show or hide loading indicator"""
@@ -410,10 +637,14 @@ class SwiftStyleApp:
         """Handle directory double-click"""
         selection = self.tree.selection()
         if selection:
+            if selection[0] in self.pending_more:
+                self.insert_rows(*self.pending_more[selection[0]])
+                return
             item = self.tree.item(selection[0])
             if item['tags']:
                 new_path = item['tags'][0]
-                if os.access(new_path, os.R_OK):
+                node = self.selected_scan_node()
+                if node is not None and self.scan_result.access(node)[0]:
                     self.history.append(self.current_path)
                     self.current_path = new_path
                     self.refresh_data()
@@ -460,6 +691,45 @@ class SwiftStyleApp:
             self.current_path = folder
             self.refresh_data()
     
+    def open_scan_image(self):
+        """Browse a saved scan image; it opens instantly, without touching the scanned disk"""
+        path = filedialog.askopenfilename(initialdir=DEFAULT_SNAPSHOT_DIR,
+                                          filetypes=[("Scan images", f"*{IMAGE_SUFFIX}")])
+        if not path:
+            return
+        try:
+            image = open_image(path)
+        except (OSError, ImageError) as e:
+            messagebox.showerror("Invalid Scan Image", str(e))
+            return
+        self.image = image
+        self.history.append(self.current_path)
+        self.current_path = image.root_path
+        self.refresh_data()
+    
+    def save_scan_image(self):
+        """Write the current scan as a scan image in the snapshot directory"""
+        tree = self.scan_result
+        if tree is None:
+            messagebox.showinfo("No Scan", "Wait for the current scan to finish first.")
+            return
+        
+        def save_thread():
+            try:
+                if isinstance(tree, RemoteTree):
+                    # The daemon holds the scan and writes all of it, named after its root
+                    os.makedirs(DEFAULT_SNAPSHOT_DIR, exist_ok=True)
+                    target = tree.save_image(DEFAULT_SNAPSHOT_DIR)
+                else:
+                    whole = tree.tree if isinstance(tree, SubtreeView) else tree
+                    target = write_image(whole, os.path.join(DEFAULT_SNAPSHOT_DIR,
+                                                             image_name(whole.root_path, whole.scanned_at)))
+                self.ui.post(messagebox.showinfo, "Scan Saved", f"Saved scan image to {target}")
+            except (OSError, DaemonError) as e:
+                self.ui.post(messagebox.showerror, "Save Failed", str(e))
+        
+        threading.Thread(target=save_thread, daemon=True).start()
+    
     def run(self):
         """Start the application"""
         self.root.mainloop()
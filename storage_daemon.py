@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""
+Storage Daemon - one shared scanner for the storage analyzers
+Owns a ScanCache and answers queries over a Unix socket, so the CLI, the
+GUIs and the power control server reuse one scan instead of each walking
+the disk. Requests and responses are single-line JSON objects.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from storage_image import image_name, write_image
+from storage_scanner import AGE_LABELS, AGE_THRESHOLDS, Mount, ScanCache, ScanCancelled, mode_access
+
+PROTOCOL_VERSION = 1
+DEFAULT_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+                              f"storage-analyzer-{os.getuid()}.sock")
+
+# Everything any front end shows, so one scan serves them all
+DAEMON_SCAN_OPTIONS = {'top_files': 50, 'file_types': True, 'ages': True, 'permissions': True}
+
+PAGE_LIMIT = 1000
+MAX_REQUEST = 64 * 1024
+MAX_WAIT = 30
+
+# Fields of a node row: [node, name, bytes, files, first child, denied, mode, uid, gid, type, mtime ages, atime ages]
+(ROW_NODE, ROW_NAME, ROW_SIZE, ROW_FILES, ROW_FIRST_CHILD, ROW_DENIED,
+ ROW_MODE, ROW_UID, ROW_GID, ROW_TYPE, ROW_MTIME, ROW_ATIME) = range(12)
+
+
+class DaemonError(Exception):
+    """A request the daemon refused or could not answer"""
+
+
+def node_row(tree, node):
+    """Compact list describing one directory of a ScanTree"""
+    has_modes = tree.modes is not None
+    return [
+        node, tree.name(node), tree.sizes[node], tree.file_counts[node], tree.first_child[node],
+        tree.denied[node],
+        tree.modes[node] if has_modes else None,
+        tree.uids[node] if has_modes else None,
+        tree.gids[node] if has_modes else None,
+        tree.type_label(node, default=None),
+        [size for _, size in tree.age_histogram(node, 'mtime')],
+        [size for _, size in tree.age_histogram(node, 'atime')],
+    ]
+
+
+class ScanDaemon:
+    """Scan cache plus the request handlers behind the socket"""
+
+    def __init__(self, max_age=3600, max_entries=8):
+        self.cache = ScanCache(max_age, max_entries, scan_options=DAEMON_SCAN_OPTIONS)
+        self.started = time.time()
+        self.ids = itertools.count(1)
+        # Finished scans handed to clients, kept past cache expiry so open trees stay usable
+        self.scans = {}
+        self.scan_ids = {}
+        self.max_scans = max_entries * 2
+        self.lock = threading.Lock()
+
+    def register(self, job):
+        """Scan id for a finished job"""
+        with self.lock:
+            scan = self.scan_ids.get(job)
+            if scan is None:
+                scan = next(self.ids)
+                self.scans[scan] = job
+                self.scan_ids[job] = scan
+                while len(self.scans) > self.max_scans:
+                    oldest = next(iter(self.scans))
+                    del self.scan_ids[self.scans.pop(oldest)]
+            return scan
+
+    def tree(self, request):
+        """(tree, node) named by a request's scan and node"""
+        job = self.scans.get(request.get('scan'))
+        if job is None:
+            raise DaemonError("Unknown or expired scan; open the path again")
+        node = request.get('node', 0)
+        if not isinstance(node, int) or not 0 <= node < len(job.tree):
+            raise DaemonError(f"No node {node!r} in this scan")
+        return job.tree, node
+
+    def handle(self, request):
+        """Answer one decoded request"""
+        op = request.get('op')
+        handler = getattr(self, f"op_{op}", None) if isinstance(op, str) else None
+        if handler is None:
+            raise DaemonError(f"Unknown op {op!r}")
+        return handler(request)
+
+    def op_ping(self, request):
+        """Daemon identity and load"""
+        return {'version': PROTOCOL_VERSION, 'pid': os.getpid(), 'uptime': time.time() - self.started,
+                'scans': len(self.cache.jobs)}
+
+    def op_open(self, request):
+        """Scan path, or reuse a fresh scan covering it; waits up to 'wait' seconds.
+
+        With start false nothing new is scanned and a path no scan covers
+        comes back with state 'missing'.
+        """
+        path = os.path.abspath(request['path'])
+        refresh = bool(request.get('refresh'))
+        job, node = (None, None) if refresh else self.cache.lookup(path)
+        if job is None or job.state not in ('pending', 'running', 'done'):
+            if not request.get('start', True):
+                return {'path': path, 'state': 'missing'}
+            job = self.cache.start(path, refresh=refresh, polite=bool(request.get('polite')))
+            node = None
+        if job.state != 'done':
+            job.wait(min(float(request.get('wait', 0)), MAX_WAIT))
+
+        status = job.status()
+        if job.state == 'done':
+            tree = job.tree
+            if node is None:
+                node = tree.find(path)
+            if node is None:
+                raise DaemonError(f"{path} is not part of the scan of {job.path}")
+            status.update({
+                'scan': self.register(job),
+                'node': node,
+                'root_path': path,
+                'scanned_at': tree.scanned_at,
+                'row': node_row(tree, node),
+                'skipped_mounts': [[mount.mount_point, mount.fstype, mount.source]
+                                   for mount in tree.skipped_mounts],
+            })
+        return status
+
+    def op_node(self, request):
+        """One directory's row"""
+        tree, node = self.tree(request)
+        return {'row': node_row(tree, node)}
+
+    def op_children(self, request):
+        """A page of a directory's children, largest first"""
+        tree, node = self.tree(request)
+        offset = max(0, int(request.get('offset', 0)))
+        limit = min(max(1, int(request.get('limit', PAGE_LIMIT))), PAGE_LIMIT)
+        children = tree.sorted_children(node)
+        return {'total': len(children),
+                'rows': [node_row(tree, child) for child in children[offset:offset + limit]]}
+
+    def op_path(self, request):
+        """Full path of a node"""
+        tree, node = self.tree(request)
+        return {'path': tree.path(node)}
+
+    def op_find(self, request):
+        """Node id of an absolute path inside a scan, or null"""
+        job = self.scans.get(request.get('scan'))
+        if job is None:
+            raise DaemonError("Unknown or expired scan; open the path again")
+        return {'node': job.tree.find(request['path'])}
+
+    def op_types(self, request):
+        """File type breakdown of a directory"""
+        tree, node = self.tree(request)
+        return {'types': tree.type_breakdown(node)}
+
+    def op_largest(self, request):
+        """Largest files overall or under one directory"""
+        tree, node = self.tree(request)
+        files = tree.largest.results_under(tree, node) if tree.largest is not None else []
+        return {'files': files}
+
+    def op_save(self, request):
+        """Write the whole scan as an image at path, or named after its root inside a directory path.
+
+        Only clients running as the daemon's own user may save.
+        """
+        if request.get('peer_uid', os.getuid()) != os.getuid():
+            raise DaemonError("Only the daemon's own user can save images")
+        tree, _ = self.tree(request)
+        target = os.path.abspath(request['path'])
+        if os.path.isdir(target):
+            target = os.path.join(target, image_name(tree.root_path, tree.scanned_at))
+        try:
+            return {'path': write_image(tree, target)}
+        except OSError as e:
+            raise DaemonError(f"Cannot save image: {e}") from e
+
+    def op_jobs(self, request):
+        """Status of every cached scan"""
+        with self.cache.lock:
+            jobs = list(self.cache.jobs.values())
+        return {'jobs': [job.status() for job in jobs]}
+
+    def op_cancel(self, request):
+        """Stop a running scan of path"""
+        job = self.cache.jobs.get(os.path.abspath(request['path']))
+        if job is None:
+            raise DaemonError("No scan of that path")
+        job.cancel()
+        return job.status()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One client connection; any number of requests, one per line"""
+
+    def handle(self):
+        peer_uid = self.server.peer_uid(self.request)
+        if peer_uid is not None and peer_uid not in self.server.allowed_uids:
+            return
+        while True:
+            line = self.rfile.readline(MAX_REQUEST)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise DaemonError("Requests are JSON objects")
+                request['peer_uid'] = peer_uid
+                response = self.server.daemon.handle(request)
+                response['ok'] = True
+            except (DaemonError, KeyError, ValueError, TypeError) as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server for a ScanDaemon; only its own user (and root) may connect"""
+
+    daemon_threads = True
+
+    def __init__(self, daemon, socket_path=DEFAULT_SOCKET, allowed_uids=()):
+        self.daemon = daemon
+        self.socket_path = socket_path
+        self.allowed_uids = {os.getuid(), 0, *allowed_uids}
+        if os.path.exists(socket_path):
+            if DaemonClient.connect(socket_path) is not None:
+                raise DaemonError(f"A storage daemon is already listening on {socket_path}")
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o600 if self.allowed_uids <= {os.getuid(), 0} else 0o666)
+
+    @staticmethod
+    def peer_uid(connection):
+        """uid of the connected client, None where the platform does not report it"""
+        if not hasattr(socket, 'SO_PEERCRED'):
+            return None
+        credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', credentials)
+        return uid
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+class DaemonClient:
+    """Connection to a running daemon; safe to share between threads"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=MAX_WAIT + 30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.lock = threading.Lock()
+        self.open_socket()
+
+    def open_socket(self):
+        """(Re)connect to the daemon, dropping any previous connection"""
+        if self.sock is not None:
+            self.close()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def exchange(self, message):
+        """Send one encoded request and read its response line (caller holds the lock)"""
+        self.sock.sendall(message)
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("The storage daemon closed the connection")
+        return line
+
+    @classmethod
+    def connect(cls, socket_path=DEFAULT_SOCKET):
+        """A client if a daemon answers at socket_path, else None"""
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+            return None
+        try:
+            client = cls(socket_path)
+            client.request('ping')
+            return client
+        except (OSError, ValueError, DaemonError):
+            return None
+
+    def request(self, op, **args):
+        """Send one request and return the decoded response; raises DaemonError if refused"""
+        message = json.dumps(dict(args, op=op), separators=(',', ':')).encode() + b'\n'
+        with self.lock:
+            try:
+                line = self.exchange(message)
+            except socket.timeout:
+                raise
+            except OSError:
+                # The daemon may have restarted; try a new connection once
+                self.open_socket()
+                line = self.exchange(message)
+        response = json.loads(line)
+        if not response.pop('ok', False):
+            raise DaemonError(response.get('error', 'Request failed'))
+        return response
+
+    def open_tree(self, path, refresh=False, polite=False, progress=None, cancel=None):
+        """RemoteTree for path once the daemon's scan of it is done.
+
+        progress (a ScanProgress) is updated while waiting. cancel stops
+        waiting with ScanCancelled but leaves the daemon's scan running
+        for other clients.
+        """
+        while True:
+            status = self.request('open', path=path, refresh=refresh, polite=polite, wait=1)
+            refresh = False
+            if status['state'] == 'done':
+                return RemoteTree(self, status)
+            if status['state'] not in ('pending', 'running'):
+                raise DaemonError(status.get('error') or f"Scan {status['state']}")
+            if progress is not None:
+                for key, value in status['progress'].items():
+                    setattr(progress, key, value)
+            if cancel is not None and cancel.is_set():
+                raise ScanCancelled()
+
+    def close(self):
+        """Close the connection"""
+        self.reader.close()
+        self.sock.close()
+
+
+class _RemoteColumn:
+    """One per-node field, indexed by node like the ScanTree arrays"""
+
+    def __init__(self, tree, field):
+        self.tree = tree
+        self.field = field
+
+    def __getitem__(self, node):
+        return self.tree.row(node)[self.field]
+
+
+class _RemoteChildren:
+    """A directory's children, largest first, fetched a page at a time as they are indexed"""
+
+    page_size = 500
+
+    def __init__(self, tree, node):
+        self.tree = tree
+        self.node = node
+        self.pages = {}
+        self.total = 0
+        self.fetch(0)
+
+    def fetch(self, page):
+        """Load one page of rows into the tree's cache"""
+        tree = self.tree
+        response = tree.request('children', node=tree.remote(self.node),
+                                offset=page * self.page_size, limit=self.page_size)
+        self.total = response['total']
+        nodes = []
+        for row in response['rows']:
+            child = tree.local(row[ROW_NODE])
+            tree.rows[child] = row
+            tree.parents[child] = self.node
+            nodes.append(child)
+        self.pages[page] = nodes
+        return nodes
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.total))]
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError(index)
+        page, offset = divmod(index, self.page_size)
+        nodes = self.pages.get(page)
+        if nodes is None:
+            nodes = self.fetch(page)
+        return nodes[offset]
+
+    def __iter__(self):
+        for index in range(self.total):
+            yield self[index]
+
+
+class _RemoteLargest:
+    """LargestFiles stand-in answered by the daemon"""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def results(self, tree, top=None):
+        """Largest first as (size, path) pairs, overall or under one directory"""
+        response = self.tree.request('largest', node=self.tree.remote(top or 0))
+        return [tuple(item) for item in response['files']]
+
+    def results_under(self, tree, node):
+        """Largest files under any directory; the daemon already answers for every node"""
+        return self.results(tree, node)
+
+
+class RemoteTree:
+    """Read-only ScanTree stand-in backed by a daemon scan.
+
+    The opened path is node 0 even when the daemon answers from a scan of
+    one of its ancestors. Rows are fetched on first use and cached, and
+    permissions are evaluated for this process's user, not the daemon's.
+    """
+
+    def __init__(self, client, status):
+        self.client = client
+        self.scan = status['scan']
+        self.base = status['node']
+        self.root_path = status['root_path']
+        self.scanned_at = status['scanned_at']
+        self.skipped_mounts = [Mount(point, fstype, source, 0) for point, fstype, source in status['skipped_mounts']]
+        self.rows = {0: status['row']}
+        self.parents = {}
+        self._sorted = {}
+        self.sizes = _RemoteColumn(self, ROW_SIZE)
+        self.file_counts = _RemoteColumn(self, ROW_FILES)
+        self.first_child = _RemoteColumn(self, ROW_FIRST_CHILD)
+        self.largest = _RemoteLargest(self)
+        self.euid = os.geteuid()
+        self.gid_set = {os.getegid(), *os.getgroups()}
+
+    def local(self, remote):
+        """Our node id for a daemon node id"""
+        return 0 if remote == self.base else remote
+
+    def remote(self, node):
+        """The daemon's node id for one of ours"""
+        return self.base if node == 0 else node
+
+    def request(self, op, **args):
+        """Daemon request about this scan"""
+        return self.client.request(op, scan=self.scan, **args)
+
+    def row(self, node):
+        """Cached row for a node"""
+        row = self.rows.get(node)
+        if row is None:
+            row = self.rows[node] = self.request('node', node=self.remote(node))['row']
+        return row
+
+    def name(self, node):
+        """Directory name of a node (the full root path for node 0)"""
+        return self.root_path if node == 0 else self.row(node)[ROW_NAME]
+
+    def sorted_children(self, node):
+        """Children of node, largest first, as a lazily paged sequence"""
+        children = self._sorted.get(node)
+        if children is None:
+            children = self._sorted[node] = _RemoteChildren(self, node)
+        return children
+
+    def children(self, node):
+        """Direct child node ids"""
+        return iter(self.sorted_children(node))
+
+    def path(self, node):
+        """Full path of a node"""
+        parts = []
+        while node > 0:
+            parent = self.parents.get(node)
+            if parent is None:
+                # Reached without listing its parent here; ask the daemon
+                return os.path.join(self.request('path', node=self.remote(node))['path'], *reversed(parts))
+            parts.append(self.row(node)[ROW_NAME])
+            node = parent
+        return os.path.join(self.root_path, *reversed(parts))
+
+    def find(self, path):
+        """Node id for an absolute path inside this tree, or None"""
+        path = os.path.abspath(path)
+        if path == self.root_path:
+            return 0
+        if not path.startswith(self.root_path.rstrip(os.sep) + os.sep):
+            return None
+        node = self.request('find', path=path)['node']
+        return None if node is None else self.local(node)
+
+    def access(self, node):
+        """(can list, can write) for the current user, as ScanTree.access"""
+        row = self.row(node)
+        if row[ROW_DENIED]:
+            return False, False
+        if self.euid == 0:
+            return True, True
+        if row[ROW_MODE] is None:
+            return True, None
+        return mode_access(row[ROW_MODE], row[ROW_UID], row[ROW_GID], self.euid, self.gid_set)
+
+    def type_breakdown(self, node):
+        """Non-empty categories under node as (name, bytes, files), largest first"""
+        return [tuple(item) for item in self.request('types', node=self.remote(node))['types']]
+
+    def type_label(self, node, default='Directory'):
+        """Short label such as "Video & Audio 72%" for list views"""
+        return self.row(node)[ROW_TYPE] or default
+
+    def age_histogram(self, node, kind='mtime'):
+        """Bytes under node per age bucket as (label, bytes)"""
+        return list(zip(AGE_LABELS, self.row(node)[ROW_MTIME if kind == 'mtime' else ROW_ATIME]))
+
+    def cold_bytes(self, node, days, kind='mtime'):
+        """Bytes under node not modified (or accessed) for at least days"""
+        values = self.row(node)[ROW_MTIME if kind == 'mtime' else ROW_ATIME]
+        return sum(values[AGE_THRESHOLDS.index(days) + 1:])
+
+    def describe(self, node):
+        """Plain dict for one node"""
+        return {
+            'name': self.name(node) if node else os.path.basename(self.root_path) or self.root_path,
+            'path': self.path(node),
+            'size': self.sizes[node],
+            'files': self.file_counts[node],
+            'dirs': len(self.sorted_children(node)),
+        }
+
+    def save_image(self, path):
+        """Have the daemon write its whole scan as an image at path (or into directory path); returns the file"""
+        return self.request('save', path=os.path.abspath(path))['path']
+
+
+class RemoteScanJob:
+    """ScanJob stand-in for a daemon scan"""
+
+    def __init__(self, client, status):
+        self.path = status['path']
+        self.state = status['state']
+        self.started = status.get('started')
+        self.finished = status.get('finished')
+        self.error = status.get('error')
+        self.tree = RemoteTree(client, status) if self.state == 'done' else None
+        self._status = {key: status[key] for key in
+                        ('path', 'state', 'started', 'finished', 'progress', 'polite', 'error', 'size', 'nodes')
+                        if key in status}
+
+    def status(self):
+        """Job state as a plain dict"""
+        return dict(self._status)
+
+
+class RemoteScanCache:
+    """ScanCache stand-in that forwards to a daemon, for the power control server"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def start(self, path, refresh=False, polite=False):
+        """Job for path, starting a daemon scan if none covers it"""
+        return RemoteScanJob(self.client, self.client.request('open', path=path, refresh=refresh, polite=polite))
+
+    def lookup(self, path):
+        """(job, 0) for a finished scan covering path, (job, None) while running, else (None, None)"""
+        status = self.client.request('open', path=path, start=False)
+        if status['state'] == 'missing':
+            return None, None
+        job = RemoteScanJob(self.client, status)
+        return job, 0 if job.tree is not None else None
+
+
+def main():
+    """Run the daemon, or query a running one"""
+    parser = argparse.ArgumentParser(description='Shared scan daemon for the storage analyzers')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f'Unix socket path (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--max-age', type=int, default=3600, metavar='SECONDS',
+                        help='Reuse finished scans for this long (default: 3600)')
+    parser.add_argument('--max-scans', type=int, default=8, metavar='N',
+                        help='Scans kept in the cache (default: 8)')
+    parser.add_argument('--preload', action='append', default=[], metavar='PATH',
+                        help='Start scanning PATH right away (repeatable)')
+    parser.add_argument('--allow-uid', action='append', type=int, default=[], metavar='UID',
+                        help='Also accept clients running as UID (repeatable)')
+    parser.add_argument('--status', action='store_true', help='Print the running daemon\'s scans and exit')
+    args = parser.parse_args()
+
+    if args.status:
+        client = DaemonClient.connect(args.socket)
+        if client is None:
+            print(f"No storage daemon on {args.socket}")
+            sys.exit(1)
+        for job in client.request('jobs')['jobs']:
+            progress = job['progress']
+            print(f"{job['state']:>9}  {job['path']}  {progress['dirs']} dirs, {progress['files']} files")
+        return
+
+    daemon = ScanDaemon(args.max_age, args.max_scans)
+    try:
+        server = DaemonServer(daemon, args.socket, args.allow_uid)
+    except (OSError, DaemonError) as e:
+        print(f"Cannot listen on {args.socket}: {e}", file=sys.stderr)
+        sys.exit(1)
+    for path in args.preload:
+        daemon.cache.start(path)
+
+    # systemd stops services with SIGTERM; exit through the finally below so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Storage daemon listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Storage Dedupe - duplicate file finder for the storage analyzers
+Narrows candidates in stages (size, then the first/last 64 KB, then the
+full content) so only files that can still be duplicates are read in full.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from storage_scanner import scan_tree
+
+PARTIAL_BLOCK = 64 * 1024
+HASH_CHUNK = 1024 * 1024
+INSERT_BATCH = 10000
+HASH_BATCH = 512
+
+# Bytes per report unit; other units report plain bytes, as the analyzers' bytes_to_unit does
+UNIT_BYTES = {'GB': 1024 ** 3, 'MB': 1024 ** 2, 'KB': 1024, 'B': 1}
+
+
+def partial_hash(path, size):
+    """Hash the first and last PARTIAL_BLOCK bytes; returns (digest, bytes_read)"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        head = os.pread(fd, PARTIAL_BLOCK, 0)
+        digest.update(head)
+        read = len(head)
+        if size > PARTIAL_BLOCK:
+            tail = os.pread(fd, PARTIAL_BLOCK, max(PARTIAL_BLOCK, size - PARTIAL_BLOCK))
+            digest.update(tail)
+            read += len(tail)
+        return digest.digest(), read
+    finally:
+        os.close(fd)
+
+
+def full_hash(path):
+    """Hash a whole file; returns (digest, bytes_read), digest None on error"""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(HASH_CHUNK)
+    view = memoryview(buffer)
+    read = 0
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+                read += count
+    except OSError:
+        return None, read
+    return digest.digest(), read
+
+
+class FileIndex:
+    """On-disk (sqlite) list of scanned files, so memory stays flat for huge trees"""
+
+    def __init__(self, directory=None):
+        fd, self.db_path = tempfile.mkstemp(prefix='storage-dedupe-', suffix='.db', dir=directory)
+        os.close(fd)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute('PRAGMA journal_mode=OFF')
+        self.db.execute('PRAGMA synchronous=OFF')
+        self.db.execute('CREATE TABLE files (size INTEGER, dev INTEGER, ino INTEGER, node INTEGER, name TEXT)')
+        self.pending = []
+
+    def add(self, size, dev, ino, node, name):
+        """Queue one file for insertion"""
+        self.pending.append((size, dev, ino, node, name))
+        if len(self.pending) >= INSERT_BATCH:
+            self.flush()
+
+    def flush(self):
+        """Write queued rows"""
+        if self.pending:
+            self.db.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?)', self.pending)
+            self.pending = []
+
+    def size_groups(self, min_size):
+        """Yield (size, [(dev, ino, node, name), ...]) for sizes shared by 2+ files, largest first"""
+        self.flush()
+        self.db.execute('CREATE INDEX files_size ON files (size)')
+        sizes = self.db.execute(
+            'SELECT size FROM files WHERE size >= ? GROUP BY size HAVING COUNT(*) > 1 ORDER BY size DESC',
+            (max(1, min_size),))
+        for (size,) in sizes:
+            rows = self.db.execute('SELECT dev, ino, node, name FROM files WHERE size = ?', (size,))
+            yield size, rows.fetchall()
+
+    def close(self):
+        """Drop the temporary database"""
+        self.db.close()
+        try:
+            os.unlink(self.db_path)
+        except OSError:
+            pass
+
+
+class DuplicateGroup:
+    """Files with identical content"""
+
+    __slots__ = ('size', 'digest', 'paths')
+
+    def __init__(self, size, digest, paths):
+        self.size = size
+        self.digest = digest
+        self.paths = paths
+
+    @property
+    def wasted(self):
+        """Bytes reclaimable by keeping a single copy"""
+        return self.size * (len(self.paths) - 1)
+
+
+class DedupeStats:
+    """Counters and timings for each stage"""
+
+    def __init__(self):
+        self.files = 0
+        self.size_candidates = 0
+        self.hardlinks_skipped = 0
+        self.partial_candidates = 0
+        self.full_candidates = 0
+        self.partial_bytes = 0
+        self.full_bytes = 0
+        self.scan_time = 0.0
+        self.partial_time = 0.0
+        self.full_time = 0.0
+        self.groups = 0
+        self.wasted = 0
+
+    @staticmethod
+    def throughput(nbytes, seconds):
+        """MB/s, or 0 when nothing was timed"""
+        return nbytes / (1024 ** 2) / seconds if seconds > 0 else 0.0
+
+    def summary(self, unit='GB'):
+        """Human readable stage report, sizes in unit (GB, MB, KB or B)"""
+        unit = unit.upper() if unit.upper() in UNIT_BYTES else 'B'
+        scale = UNIT_BYTES[unit]
+        return (
+            f"Scanned {self.files} files in {self.scan_time:.1f}s; "
+            f"{self.size_candidates} share a size ({self.hardlinks_skipped} hardlinks skipped)\n"
+            f"Partial hash: {self.partial_candidates} files, "
+            f"{self.throughput(self.partial_bytes, self.partial_time):.1f} MB/s\n"
+            f"Full hash: {self.full_candidates} files, {self.full_bytes / scale:.2f} {unit}, "
+            f"{self.throughput(self.full_bytes, self.full_time):.1f} MB/s\n"
+            f"{self.groups} duplicate groups, {self.wasted / scale:.2f} {unit} wasted"
+        )
+
+
+class DuplicateFinder:
+    """Staged duplicate detection over one directory tree"""
+
+    def __init__(self, path, min_size=1, workers=None, temp_dir=None, scan_options=None):
+        self.path = os.path.abspath(path)
+        self.scan_options = scan_options or {}
+        self.min_size = min_size
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.temp_dir = temp_dir
+        self.stats = DedupeStats()
+
+    def run(self, progress=None, cancel=None):
+        """Yield DuplicateGroups as they are confirmed"""
+        index = FileIndex(self.temp_dir)
+        pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            started = time.time()
+            min_size = self.min_size
+
+            def on_file(tree, node, name, st):
+                if st.st_size >= min_size:
+                    index.add(st.st_size, st.st_dev, st.st_ino, node, name)
+
+            tree = scan_tree(self.path, progress=progress, cancel=cancel, on_file=on_file,
+                             **self.scan_options)
+            self.stats.files = tree.file_counts[0]
+            self.stats.scan_time = time.time() - started
+
+            pending = []
+            for size, rows in index.size_groups(min_size):
+                for group in self.partial_stage(tree, size, rows, pending):
+                    yield self.record(group)
+                if len(pending) >= HASH_BATCH:
+                    yield from self.full_stage(pending, pool)
+                    pending = []
+            if pending:
+                yield from self.full_stage(pending, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            index.close()
+
+    def partial_stage(self, tree, size, rows, pending):
+        """Split one size group by partial hash.
+
+        Small files are fully covered by the partial read and are yielded
+        as confirmed groups; larger survivors are queued on pending.
+        """
+        # Hardlinks share an inode and occupy space once
+        inodes = {}
+        for dev, ino, node, name in rows:
+            if (dev, ino) in inodes:
+                self.stats.hardlinks_skipped += 1
+            else:
+                inodes[(dev, ino)] = os.path.join(tree.path(node), name)
+        if len(inodes) < 2:
+            return
+        self.stats.size_candidates += len(inodes)
+
+        started = time.time()
+        by_partial = {}
+        for path in inodes.values():
+            try:
+                digest, read = partial_hash(path, size)
+            except OSError:
+                continue
+            self.stats.partial_bytes += read
+            by_partial.setdefault(digest, []).append(path)
+        self.stats.partial_time += time.time() - started
+
+        complete = size <= 2 * PARTIAL_BLOCK
+        for digest, paths in by_partial.items():
+            if len(paths) < 2:
+                continue
+            self.stats.partial_candidates += len(paths)
+            if complete:
+                yield DuplicateGroup(size, digest, paths)
+            else:
+                pending.extend((size, digest, path) for path in paths)
+
+    def full_stage(self, pending, pool):
+        """Fully hash queued candidates, in the process pool when available"""
+        started = time.time()
+        paths = [path for _, _, path in pending]
+        if pool is not None:
+            results = pool.map(full_hash, paths, chunksize=max(1, len(paths) // (self.workers * 4)))
+        else:
+            results = map(full_hash, paths)
+
+        groups = {}
+        for (size, partial, path), (digest, read) in zip(pending, results):
+            self.stats.full_bytes += read
+            if digest is not None:
+                groups.setdefault((size, digest), []).append(path)
+        self.stats.full_time += time.time() - started
+        self.stats.full_candidates += len(pending)
+
+        for (size, digest), group_paths in groups.items():
+            if len(group_paths) > 1:
+                yield self.record(DuplicateGroup(size, digest, group_paths))
+
+    def record(self, group):
+        """Count a confirmed group"""
+        self.stats.groups += 1
+        self.stats.wasted += group.wasted
+        return group
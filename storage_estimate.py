@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Storage Estimate - fast size estimates for huge trees by random sampling
+The first levels below the root are listed exactly. Deeper subtrees are
+estimated with random descents (Knuth's tree-size estimator) from frontier
+directories drawn at random, giving each top-level directory an unbiased
+estimate with a 95% confidence interval after a few seconds of I/O.
+"""
+
+import math
+import os
+import random
+import time
+
+from storage_scanner import MountTable, ScanCancelled, ScanProgress, iter_directory_sizes, list_directory
+
+DEFAULT_EXACT_DEPTH = 2
+DEFAULT_ESTIMATE_SECONDS = 10.0
+DEFAULT_TARGET = 0.05
+
+# Two-sided 95% normal quantile; intervals need at least MIN_PROBES samples
+Z_95 = 1.96
+MIN_PROBES = 30
+
+
+class Estimate:
+    """Running estimate for one top-level directory: exact part plus a sampled frontier"""
+
+    __slots__ = ('path', 'exact_bytes', 'exact_files', 'frontier', 'probes',
+                 'sum_bytes', 'sum_bytes_sq', 'sum_files', 'done')
+
+    def __init__(self, path):
+        self.path = path
+        self.exact_bytes = 0
+        self.exact_files = 0
+        self.frontier = []
+        self.probes = 0
+        self.sum_bytes = 0.0
+        self.sum_bytes_sq = 0.0
+        self.sum_files = 0.0
+        self.done = False
+
+    def add(self, size, files):
+        """Record one probe's estimate of the whole frontier"""
+        self.probes += 1
+        self.sum_bytes += size
+        self.sum_bytes_sq += size * size
+        self.sum_files += files
+
+    @property
+    def sampled(self):
+        """Whether part of the subtree is estimated rather than counted"""
+        return bool(self.frontier) and not self.done
+
+    @property
+    def bytes(self):
+        """Estimated total bytes"""
+        if not self.sampled or not self.probes:
+            return self.exact_bytes
+        return self.exact_bytes + self.sum_bytes / self.probes
+
+    @property
+    def files(self):
+        """Estimated total files"""
+        if not self.sampled or not self.probes:
+            return self.exact_files
+        return self.exact_files + round(self.sum_files / self.probes)
+
+    @property
+    def margin(self):
+        """Half-width of the 95% confidence interval in bytes; inf until there are enough probes"""
+        if not self.sampled:
+            return 0.0
+        if self.probes < MIN_PROBES:
+            return math.inf
+        mean = self.sum_bytes / self.probes
+        variance = max(self.sum_bytes_sq / self.probes - mean * mean, 0.0) * self.probes / (self.probes - 1)
+        return Z_95 * math.sqrt(variance / self.probes)
+
+    @property
+    def relative_margin(self):
+        """margin as a fraction of the estimate"""
+        margin = self.margin
+        if margin == 0:
+            return 0.0
+        return margin / self.bytes if self.bytes else math.inf
+
+    def as_dict(self):
+        """Plain dict for reports"""
+        margin = self.margin
+        return {
+            'path': self.path,
+            'bytes': round(self.bytes),
+            'files': self.files,
+            'margin': None if math.isinf(margin) else round(margin),
+            'probes': self.probes,
+            'exact': not self.sampled,
+        }
+
+
+class SampledScan:
+    """Size estimates for every top-level directory of a tree, refined by sampling.
+
+    Directories down to exact_depth below the root are listed in full; the
+    subtrees below them are the frontier and are only sampled. Mount and
+    filter options behave as in scan_tree.
+    """
+
+    def __init__(self, path, exact_depth=DEFAULT_EXACT_DEPTH, skip_virtual=True, one_file_system=False,
+                 path_filter=None, throttle=None, seed=None, progress=None, profile=None):
+        self.root_path = os.path.abspath(path)
+        self.exact_depth = max(exact_depth, 1)
+        self.skip_virtual = skip_virtual
+        self.one_file_system = one_file_system
+        self.path_filter = path_filter
+        self.throttle = throttle
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.progress = progress or ScanProgress()
+        self.mounts = MountTable.read()
+        self.root_mount = self.mounts.mount_for(self.root_path)
+        self.root_bytes = 0
+        self.root_files = 0
+        self.entries = []
+        self.started = time.monotonic()
+
+    def list_directory(self, path):
+        """(bytes, files, subdirectories) directly in path, skipping what a scan would skip"""
+        size, files, subdirs, entries = list_directory(path, self.mounts, self.root_mount, self.skip_virtual,
+                                                       self.one_file_system, self.path_filter, self.progress,
+                                                       self.profile)
+        if self.throttle is not None:
+            self.throttle.wait(entries, files + 1, self.progress)
+        return size, files, subdirs
+
+    def walk_exact(self, cancel=None):
+        """List the root and the levels below it down to exact_depth, collecting the frontier"""
+        if self.throttle is not None:
+            self.throttle.start()
+        self.root_bytes, self.root_files, top_dirs = self.list_directory(self.root_path)
+        for top in sorted(top_dirs):
+            estimate = Estimate(top)
+            level = [top]
+            for _ in range(self.exact_depth):
+                next_level = []
+                for path in level:
+                    if cancel is not None and cancel.is_set():
+                        raise ScanCancelled(self.root_path)
+                    size, files, subdirs = self.list_directory(path)
+                    estimate.exact_bytes += size
+                    estimate.exact_files += files
+                    next_level.extend(subdirs)
+                level = next_level
+            estimate.frontier = level
+            self.entries.append(estimate)
+        return self.entries
+
+    def probe(self, estimate):
+        """One random descent from a random frontier directory, scaled to the whole frontier.
+
+        Each level multiplies the weight by its number of subdirectories,
+        so the bytes found along the path are an unbiased estimate of the
+        subtree; averaging many descents narrows the interval.
+        """
+        weight = len(estimate.frontier)
+        path = self.random.choice(estimate.frontier)
+        total_bytes = total_files = 0.0
+        while True:
+            size, files, subdirs = self.list_directory(path)
+            total_bytes += weight * size
+            total_files += weight * files
+            if not subdirs:
+                break
+            weight *= len(subdirs)
+            path = self.random.choice(subdirs)
+        estimate.add(total_bytes, total_files)
+
+    def settled(self, estimate, target):
+        """Interval within target of the estimate, or too small to matter next to the total"""
+        margin = estimate.margin
+        return margin <= target * estimate.bytes or estimate.bytes + margin <= target * self.total_bytes
+
+    def run(self, seconds=DEFAULT_ESTIMATE_SECONDS, target=DEFAULT_TARGET, cancel=None, on_round=None):
+        """Sample until every interval is settled (see settled) or seconds have passed.
+
+        Each probe goes to the directory whose interval is widest in bytes,
+        so sampling effort follows the directories that matter for the
+        ranking. on_round(self) is called about once a second.
+        """
+        if not self.entries:
+            self.walk_exact(cancel)
+        deadline = self.started + seconds
+        next_report = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            if cancel is not None and cancel.is_set():
+                raise ScanCancelled(self.root_path)
+            sampled = [estimate for estimate in self.entries if estimate.sampled]
+            if not sampled:
+                break
+            if all(self.settled(estimate, target) for estimate in sampled):
+                break
+            self.probe(max(sampled, key=lambda estimate: estimate.margin))
+            if on_round is not None and time.monotonic() >= next_report:
+                next_report += 1.0
+                on_round(self)
+        return self.ranked()
+
+    def ranked(self):
+        """Estimates, largest first"""
+        return sorted(self.entries, key=lambda estimate: estimate.bytes, reverse=True)
+
+    @property
+    def total_bytes(self):
+        """Estimated bytes under the root"""
+        return self.root_bytes + sum(estimate.bytes for estimate in self.entries)
+
+    @property
+    def total_margin(self):
+        """95% half-width for total_bytes; the top-level estimates are independent"""
+        return math.sqrt(sum(estimate.margin ** 2 for estimate in self.entries))
+
+    def refine(self, cancel=None):
+        """Replace the estimates with exact sizes, yielding each top-level Estimate as it is finished"""
+        by_path = {estimate.path: estimate for estimate in self.entries}
+        walk = iter_directory_sizes(self.root_path, 1, progress=self.progress, cancel=cancel,
+                                    skip_virtual=self.skip_virtual, one_file_system=self.one_file_system,
+                                    path_filter=self.path_filter, throttle=self.throttle, profile=self.profile)
+        for depth, path, size, files in walk:
+            estimate = by_path.get(path)
+            if depth != 1 or estimate is None:
+                continue
+            estimate.exact_bytes, estimate.exact_files = size, files
+            estimate.done = True
+            yield estimate
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Storage History - directory sizes over time for the storage analyzers
+Each recorded run stores only the directories whose size changed since
+the previous run of the same root, so daily runs of a large tree stay
+small; a directory's growth series is read back from its own rows.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from storage_scanner import iter_directory_sizes
+
+DEFAULT_HISTORY_DB = os.path.join(os.path.expanduser('~'), '.local', 'share', 'storage-analyzer', 'history.db')
+DEFAULT_HISTORY_DEPTH = 3
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, root TEXT NOT NULL, taken_at REAL NOT NULL,
+    depth INTEGER NOT NULL, dirs INTEGER NOT NULL, changed INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS runs_root ON runs (root, id);
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY, root TEXT NOT NULL, path TEXT NOT NULL, UNIQUE (root, path));
+CREATE TABLE IF NOT EXISTS changes (
+    path INTEGER NOT NULL, run INTEGER NOT NULL, size INTEGER, PRIMARY KEY (path, run)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS current (
+    path INTEGER PRIMARY KEY, root TEXT NOT NULL, size INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS current_root ON current (root);
+'''
+
+
+def parse_interval(text):
+    """Seconds from an interval such as 90, 30m, 6h or 1d"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    text = text.strip().lower()
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+class HistoryStore:
+    """sqlite-backed size history; a changes row is written only when a size differs from the last run"""
+
+    def __init__(self, path=DEFAULT_HISTORY_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(_SCHEMA)
+
+    def record(self, root, depth=DEFAULT_HISTORY_DEPTH, **scan_options):
+        """Scan root down to depth and store what changed; returns the run's summary dict"""
+        root = os.path.abspath(root)
+        taken_at = time.time()
+
+        # Walk before taking the lock; the scan is the slow part
+        sizes = [(os.path.relpath(path, root), size)
+                 for _, path, size, _ in iter_directory_sizes(root, depth, **scan_options)]
+
+        with self.lock, self.db:
+            path_ids = dict(self.db.execute('SELECT path, id FROM paths WHERE root = ?', (root,)))
+            current = dict(self.db.execute('SELECT path, size FROM current WHERE root = ?', (root,)))
+            cursor = self.db.execute('INSERT INTO runs (root, taken_at, depth, dirs, changed) VALUES (?, ?, ?, ?, 0)',
+                                     (root, taken_at, depth, len(sizes)))
+            run = cursor.lastrowid
+
+            changes = []
+            seen = set()
+            for relative, size in sizes:
+                relative = '' if relative == os.curdir else relative
+                path_id = path_ids.get(relative)
+                if path_id is None:
+                    path_id = self.db.execute('INSERT INTO paths (root, path) VALUES (?, ?)',
+                                              (root, relative)).lastrowid
+                    path_ids[relative] = path_id
+                seen.add(path_id)
+                if current.get(path_id) != size:
+                    changes.append((path_id, run, size))
+
+            # Directories gone since the last run get a NULL size
+            vanished = [path_id for path_id in current if path_id not in seen]
+            changes.extend((path_id, run, None) for path_id in vanished)
+
+            self.db.executemany('INSERT INTO changes (path, run, size) VALUES (?, ?, ?)', changes)
+            self.db.executemany('INSERT OR REPLACE INTO current (path, root, size) VALUES (?, ?, ?)',
+                                [(path_id, root, size) for path_id, _, size in changes if size is not None])
+            self.db.executemany('DELETE FROM current WHERE path = ?', [(path_id,) for path_id in vanished])
+            self.db.execute('UPDATE runs SET changed = ? WHERE id = ?', (len(changes), run))
+
+        return {'run': run, 'root': root, 'taken_at': taken_at, 'depth': depth,
+                'dirs': len(sizes), 'changed': len(changes)}
+
+    def roots(self):
+        """Recorded roots with their run count and latest run time"""
+        with self.lock:
+            rows = self.db.execute('SELECT root, COUNT(*), MAX(taken_at) FROM runs GROUP BY root ORDER BY root')
+            return [{'root': root, 'runs': runs, 'latest': latest} for root, runs, latest in rows]
+
+    def locate(self, path):
+        """(root, path id) of the recorded root holding path with the most runs, or (None, None)"""
+        path = os.path.abspath(path)
+        with self.lock:
+            candidates = self.db.execute('SELECT root FROM runs GROUP BY root ORDER BY COUNT(*) DESC, LENGTH(root) DESC')
+            for (root,) in candidates.fetchall():
+                if path != root and not path.startswith(root.rstrip(os.sep) + os.sep):
+                    continue
+                relative = '' if path == root else os.path.relpath(path, root)
+                row = self.db.execute('SELECT id FROM paths WHERE root = ? AND path = ?',
+                                      (root, relative)).fetchone()
+                if row:
+                    return root, row[0]
+        return None, None
+
+    def latest_run(self, root):
+        """Id of the newest run of root, 0 if none"""
+        with self.lock:
+            row = self.db.execute('SELECT MAX(id) FROM runs WHERE root = ?', (root,)).fetchone()
+        return row[0] or 0
+
+    def series(self, path, since=None):
+        """[(taken_at, size)] for one directory, one point per run; size None while it did not exist"""
+        root, path_id = self.locate(path)
+        if root is None:
+            return []
+        query = '''
+            SELECT r.taken_at,
+                   (SELECT c.size FROM changes c WHERE c.path = ? AND c.run <= r.id
+                    ORDER BY c.run DESC LIMIT 1)
+            FROM runs r WHERE r.root = ? AND r.taken_at >= ? ORDER BY r.id'''
+        with self.lock:
+            return list(self.db.execute(query, (path_id, root, since or 0)))
+
+    def close(self):
+        """Close the database"""
+        self.db.close()
+
+
+class HistoryScheduler:
+    """Built-in timer recording roots every interval seconds, for hosts without systemd timers"""
+
+    def __init__(self, store, roots, interval=86400, depth=DEFAULT_HISTORY_DEPTH, scan_options=None):
+        self.store = store
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.interval = interval
+        self.depth = depth
+        self.scan_options = scan_options or {}
+        self.last_results = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def due(self, root):
+        """Seconds until root should be recorded again"""
+        with self.store.lock:
+            row = self.store.db.execute('SELECT MAX(taken_at) FROM runs WHERE root = ?', (root,)).fetchone()
+        if not row[0]:
+            return 0
+        return max(0.0, row[0] + self.interval - time.time())
+
+    def run(self):
+        """Record each root when it is due; runs until stop()"""
+        while not self.stop_event.is_set():
+            for root in self.roots:
+                if self.stop_event.is_set():
+                    return
+                if self.due(root) == 0:
+                    try:
+                        self.last_results[root] = self.store.record(root, self.depth, **self.scan_options)
+                    except (OSError, sqlite3.Error) as e:
+                        self.last_results[root] = {'root': root, 'error': str(e)}
+            wait = min(self.due(root) for root in self.roots) if self.roots else self.interval
+            self.stop_event.wait(max(wait, 1.0))
+
+    def start(self):
+        """Run in a daemon thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop after the current recording"""
+        self.stop_event.set()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Storage Image - binary scan files that open instantly with mmap
+An image stores a ScanTree's per-directory arrays as aligned, typed
+sections, plus a string table and each directory's children in size
+order. Opening maps the file and views the sections in place, so nothing
+is parsed up front and only the pages for the directories being viewed
+are ever read.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from storage_scanner import LargestFiles, Mount, ScanTree, SubtreeView
+from storage_snapshot import read_snapshot, snapshot_info, snapshot_name, tree_entries
+
+IMAGE_MAGIC = b'STORSCAN'
+IMAGE_VERSION = 1
+IMAGE_SUFFIX = '.scan'
+
+# magic, version, byte order (1 = little endian), node count, scanned_at, section count
+_HEADER = struct.Struct('<8sIIQdI4x')
+# tag, offset, length in bytes
+_SECTION = struct.Struct('<4s4xQQ')
+# size, node, top-level child (-1 for the overall list), name id
+_LARGEST = struct.Struct('<QiiI')
+
+# Typed sections: tag -> (array typecode, ScanTree attribute)
+_COLUMNS = {
+    b'size': ('Q', 'sizes'),
+    b'file': ('Q', 'file_counts'),
+    b'prnt': ('i', 'parents'),
+    b'name': ('I', 'name_ids'),
+    b'deny': ('B', 'denied'),
+    b'mode': ('H', 'modes'),
+    b'uids': ('I', 'uids'),
+    b'gids': ('I', 'gids'),
+    b'tbyt': ('Q', 'type_bytes'),
+    b'tcnt': ('Q', 'type_counts'),
+    b'mage': ('Q', 'mtime_bytes'),
+    b'aage': ('Q', 'atime_bytes'),
+}
+
+
+class ImageError(ValueError):
+    """Not a scan image, or one this version cannot read"""
+
+
+def is_image(path):
+    """Whether path starts with the image magic"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(IMAGE_MAGIC)) == IMAGE_MAGIC
+    except OSError:
+        return False
+
+
+def image_name(root_path, when=None):
+    """Default file name for an image of root_path"""
+    return snapshot_name(root_path, when)[:-len('.snap.gz')] + IMAGE_SUFFIX
+
+
+def _encode(text):
+    return text.encode('utf-8', 'surrogateescape')
+
+
+def write_image(tree, path):
+    """Save a ScanTree as an image; children are stored largest first.
+
+    A SubtreeView saves the whole tree it is a view of.
+    """
+    if isinstance(tree, SubtreeView):
+        tree = tree.tree
+    count = len(tree)
+    sizes = tree.sizes
+
+    # Children of every node, contiguous and sorted, indexed by child_start
+    child_start = array('I', [0]) * (count + 1)
+    kids = array('I')
+    first_child = array('i', [-1]) * count
+    for node in range(count):
+        child_start[node] = len(kids)
+        ordered = sorted(tree.children(node), key=sizes.__getitem__, reverse=True)
+        if ordered:
+            first_child[node] = ordered[0]
+            kids.extend(ordered)
+    child_start[count] = len(kids)
+
+    # String table: directory names by pool id, then the largest files' names
+    strings = list(tree.pool.names)
+    largest = bytearray()
+    if tree.largest is not None:
+        entries = [(size, node, -1, name) for size, node, name in tree.largest.overall]
+        for top, heap in tree.largest.by_top.items():
+            entries.extend((size, node, top, name) for size, node, name in heap)
+        for size, node, top, name in entries:
+            largest += _LARGEST.pack(size, node, top, len(strings))
+            strings.append(name)
+    string_offsets = array('Q', [0])
+    string_data = bytearray()
+    for text in strings:
+        string_data += _encode(text)
+        string_offsets.append(len(string_data))
+
+    mounts = '\n'.join(f"{mount.mount_point}\t{mount.fstype}\t{mount.source}" for mount in tree.skipped_mounts)
+    extensions = '\n'.join(f"{extension}\t{size}\t{files}"
+                           for extension, (size, files) in (tree.extension_totals or {}).items())
+
+    sections = [(b'root', _encode(tree.root_path)), (b'fchd', first_child),
+                (b'cidx', child_start), (b'kids', kids),
+                (b'stro', string_offsets), (b'strd', string_data),
+                (b'lrgs', largest), (b'mnts', _encode(mounts)), (b'exts', _encode(extensions))]
+    for tag, (typecode, attribute) in _COLUMNS.items():
+        values = getattr(tree, attribute)
+        if values is not None:
+            sections.append((tag, values))
+    if tree.largest is not None:
+        sections.append((b'lrgk', struct.pack('<I', tree.largest.k)))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        offset = _HEADER.size + _SECTION.size * len(sections)
+        table = []
+        for tag, data in sections:
+            offset = (offset + 7) & ~7
+            length = memoryview(data).nbytes
+            table.append((tag, offset, length))
+            offset += length
+        f.write(_HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, sys.byteorder == 'little', count,
+                             tree.scanned_at, len(sections)))
+        for entry in table:
+            f.write(_SECTION.pack(*entry))
+        for (tag, data), (_, offset, _) in zip(sections, table):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+    os.replace(temp_path, path)
+    return path
+
+
+class _StringTable:
+    """Strings decoded from the mapped table on access; stands in for a NamePool"""
+
+    ids = None
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @property
+    def names(self):
+        return self
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8', 'surrogateescape')
+
+
+class MappedTree(ScanTree):
+    """Read-only ScanTree over a mapped image.
+
+    The per-node arrays are memoryviews of the file, so ScanTree's
+    readers work on them unchanged. Children come from the stored
+    size-ordered lists instead of the sibling links.
+    """
+
+    def __init__(self, path):
+        self.image_path = path
+        if not is_image(path):
+            raise ImageError(f"{path}: not a scan image")
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load()
+        except (struct.error, KeyError, ValueError, TypeError) as e:
+            self.close()
+            raise ImageError(f"{path}: {e}") from e
+
+    def _load(self):
+        """Read the header and section table and view each section in place"""
+        view = memoryview(self._map)
+        self._views = [view]
+        _, version, little_endian, count, scanned_at, section_count = _HEADER.unpack_from(view)
+        if version != IMAGE_VERSION:
+            raise ImageError(f"image version {version} is not supported")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ImageError("image was written on a machine with a different byte order")
+
+        sections = {}
+        for index in range(section_count):
+            tag, offset, length = _SECTION.unpack_from(view, _HEADER.size + index * _SECTION.size)
+            if offset + length > len(view):
+                raise ImageError("truncated image")
+            sections[tag] = view[offset:offset + length]
+        self._views.extend(sections.values())
+
+        def column(tag, typecode):
+            data = sections.get(tag)
+            if data is None:
+                return None
+            values = data.cast(typecode)
+            self._views.append(values)
+            return values
+
+        self.root_path = bytes(sections[b'root']).decode('utf-8', 'surrogateescape')
+        self.scanned_at = scanned_at
+        for tag, (typecode, attribute) in _COLUMNS.items():
+            setattr(self, attribute, column(tag, typecode))
+        self.first_child = column(b'fchd', 'i')
+        self.next_sibling = None
+        self.child_start = column(b'cidx', 'I')
+        self.kids = column(b'kids', 'I')
+        if len(self.sizes) != count or len(self.child_start) != count + 1:
+            raise ImageError("section sizes do not match the node count")
+
+        self.pool = _StringTable(column(b'stro', 'Q'), sections[b'strd'])
+
+        self.skipped_mounts = []
+        for line in bytes(sections[b'mnts']).decode('utf-8', 'surrogateescape').splitlines():
+            mount_point, fstype, source = line.split('\t')
+            self.skipped_mounts.append(Mount(mount_point, fstype, source, 0))
+        self.extension_totals = {}
+        for line in bytes(sections[b'exts']).decode('utf-8', 'surrogateescape').splitlines():
+            extension, size, files = line.split('\t')
+            self.extension_totals[extension] = [int(size), int(files)]
+
+        # The largest-files lists are small; rebuild them as a LargestFiles
+        self.largest = None
+        if b'lrgk' in sections:
+            self.largest = LargestFiles(struct.unpack('<I', sections[b'lrgk'])[0])
+            for size, node, top, name_id in _LARGEST.iter_unpack(sections[b'lrgs']):
+                heap = self.largest.overall if top < 0 else self.largest.by_top.setdefault(top, [])
+                heap.append((size, node, self.pool[name_id]))
+
+        self.root_mount = None
+        self.mount_nodes = {}
+        self.euid = os.geteuid()
+        self.gid_set = {os.getegid(), *os.getgroups()}
+        self.errors = 0
+        self.aged_at = scanned_at if self.mtime_bytes is not None else None
+        self._sorted = {}
+
+    def children(self, node):
+        """Direct child node ids, largest first"""
+        return iter(self.sorted_children(node))
+
+    def sorted_children(self, node):
+        """Children of node, largest first, as a view of the mapped list"""
+        return self.kids[self.child_start[node]:self.child_start[node + 1]]
+
+    def find(self, path):
+        """Node id for an absolute path inside this tree, or None"""
+        path = os.path.abspath(path)
+        if path == self.root_path:
+            return 0
+        relative = os.path.relpath(path, self.root_path)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+        node = 0
+        for part in relative.split(os.sep):
+            for child in self.sorted_children(node):
+                if self.name(child) == part:
+                    node = child
+                    break
+            else:
+                return None
+        return node
+
+    def close(self):
+        """Release the views and unmap the file"""
+        # Casts first: a view cannot be released while views derived from it are alive
+        for data in reversed(getattr(self, '_views', [])):
+            data.release()
+        self._views = []
+        try:
+            self._map.close()
+        except BufferError:
+            # A caller still holds a children list; the mapping goes when that does
+            pass
+
+
+def open_image(path):
+    """Map an image and return its MappedTree"""
+    return MappedTree(path)
+
+
+def saved_entries(path):
+    """(root path, scanned_at, snapshot entries) from a snapshot or an image, for diff_entries"""
+    if is_image(path):
+        image = open_image(path)
+        return image.root_path, image.scanned_at, tree_entries(image)
+    root_path, scanned_at = snapshot_info(path)
+    return root_path, scanned_at, read_snapshot(path)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Storage Parallel - directory totals from several worker processes
+The top of the tree is listed here and split into subtrees, which are
+handed to worker processes round-robin across devices. Each worker walks
+its subtree with the streaming walker and returns its directory totals
+as fixed-width records in a shared memory block, so only a block name
+and a few counters are pickled per subtree.
+"""
+
+import os
+import struct
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+
+from storage_scanner import MountTable, ScanCancelled, ScanProgress, iter_directory_sizes, list_directory
+
+# Subtrees per worker to aim for when splitting, so uneven subtrees even out
+UNITS_PER_WORKER = 4
+
+# Levels listed here at most while looking for enough subtrees
+MAX_SPLIT_DEPTH = 3
+
+# bytes, files, path offset, path length, depth below the subtree's root
+_RECORD = struct.Struct('<QQQIi')
+
+
+def _scan_unit(path, max_depth, options):
+    """Worker: walk one subtree and pack its totals into a new shared memory block.
+
+    Returns (block name, record count, dirs, files, entries, errors); the
+    caller unlinks the block after reading it.
+    """
+    progress = ScanProgress()
+    records = bytearray()
+    names = bytearray()
+    count = 0
+    for depth, dir_path, size, files in iter_directory_sizes(path, max_depth, progress=progress, **options):
+        relative = '' if dir_path == path else os.path.relpath(dir_path, path)
+        encoded = relative.encode('utf-8', 'surrogateescape')
+        records += _RECORD.pack(size, files, len(names), len(encoded), depth)
+        names += encoded
+        count += 1
+    block = shared_memory.SharedMemory(create=True, size=max(len(records) + len(names), 1))
+    block.buf[:len(records)] = records
+    block.buf[len(records):len(records) + len(names)] = names
+    name = block.name
+    block.close()
+    return name, count, progress.dirs, progress.files, progress.entries, progress.errors
+
+
+def _read_unit(name, count):
+    """Records from a worker's block as (depth, relative path, bytes, files); unlinks the block"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        names_at = count * _RECORD.size
+        records = []
+        for index in range(count):
+            size, files, offset, length, depth = _RECORD.unpack_from(block.buf, index * _RECORD.size)
+            relative = bytes(block.buf[names_at + offset:names_at + offset + length]).decode('utf-8', 'surrogateescape')
+            records.append((depth, relative, size, files))
+        return records
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _discard_unit(name):
+    """Unlink a worker's block without reading it"""
+    block = shared_memory.SharedMemory(name=name)
+    block.close()
+    block.unlink()
+
+
+def _device(path):
+    try:
+        return os.stat(path, follow_symlinks=False).st_dev
+    except OSError:
+        return None
+
+
+def interleave_by_device(units):
+    """Units reordered round-robin across their devices, so every disk gets work early"""
+    by_device = defaultdict(deque)
+    for unit in units:
+        by_device[_device(unit[0])].append(unit)
+    queues = list(by_device.values())
+    ordered = []
+    while queues:
+        for queue in list(queues):
+            ordered.append(queue.popleft())
+            if not queue:
+                queues.remove(queue)
+    return ordered
+
+
+def parallel_directory_sizes(path, max_depth=1, workers=None, per_device=None, progress=None, cancel=None,
+                             skip_virtual=True, one_file_system=False, path_filter=None, profile=None):
+    """Yield (depth, path, bytes, files) like iter_directory_sizes, walking subtrees in worker processes.
+
+    Subtrees are yielded as each worker finishes (children first within
+    a subtree); the directories listed here to split the work come last,
+    deepest first. per_device caps the subtrees scanned at once on one
+    device, for spinning disks that slow down under parallel seeks.
+    profile times the listing done here and the wait for the workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    progress = progress or ScanProgress()
+    root_path = os.path.abspath(path)
+    mounts = MountTable.read()
+    root_mount = mounts.mount_for(root_path)
+    options = {'skip_virtual': skip_virtual, 'one_file_system': one_file_system, 'path_filter': path_filter}
+
+    # List the top levels here until there are enough subtrees to share out
+    listed = {}
+    frontier = [(root_path, 0)]
+    while frontier and len(frontier) < workers * UNITS_PER_WORKER and frontier[0][1] < MAX_SPLIT_DEPTH:
+        next_frontier = []
+        for dir_path, depth in frontier:
+            if cancel is not None and cancel.is_set():
+                raise ScanCancelled(path)
+            size, files, subdirs, _ = list_directory(dir_path, mounts, root_mount, skip_virtual,
+                                                     one_file_system, path_filter, progress, profile)
+            listed[dir_path] = [depth, size, files]
+            next_frontier.extend((subdir, depth + 1) for subdir in subdirs)
+        frontier = next_frontier
+    units = deque(interleave_by_device(frontier))
+
+    # Share one resource tracker with the workers, so blocks they create are unlinked here cleanly
+    resource_tracker.ensure_running()
+    running = {}
+    device_load = defaultdict(int)
+    with ProcessPoolExecutor(workers) as pool:
+        try:
+            while units or running:
+                if cancel is not None and cancel.is_set():
+                    raise ScanCancelled(path)
+                # Start what the worker and per-device limits allow
+                skipped = deque()
+                while units and len(running) < workers:
+                    unit_path, depth = units.popleft()
+                    device = _device(unit_path)
+                    # Something always runs, whatever the per-device limit
+                    if per_device is not None and device_load[device] >= per_device and running:
+                        skipped.append((unit_path, depth))
+                        continue
+                    future = pool.submit(_scan_unit, unit_path, max(max_depth - depth, 0), options)
+                    running[future] = (unit_path, depth, device)
+                    device_load[device] += 1
+                units.extendleft(reversed(skipped))
+
+                waited = time.perf_counter()
+                done, _ = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                if profile is not None:
+                    profile.add('wait for workers', time.perf_counter() - waited)
+                for future in done:
+                    unit_path, depth, device = running.pop(future)
+                    device_load[device] -= 1
+                    name, count, dirs, files, entries, errors = future.result()
+                    progress.dirs += dirs
+                    progress.entries += entries
+                    progress.errors += errors
+                    progress.current = unit_path
+                    for level, relative, size, file_count in _read_unit(name, count):
+                        if level == 0:
+                            # The subtree's total feeds the directory it was split from
+                            parent = listed[os.path.dirname(unit_path)]
+                            parent[1] += size
+                            parent[2] += file_count
+                            progress.files += file_count
+                            progress.bytes += size
+                        if depth + level <= max_depth:
+                            yield depth + level, os.path.join(unit_path, relative) if relative else unit_path, \
+                                size, file_count
+        except BaseException:
+            # Let the subtrees in flight finish so their blocks can be unlinked
+            for future in wait(running).done:
+                if future.exception() is None:
+                    name, *_ = future.result()
+                    _discard_unit(name)
+            raise
+
+    # The directories listed here, deepest first, each adding to its parent once complete
+    for dir_path in sorted(listed, key=lambda item: listed[item][0], reverse=True):
+        depth, size, files = listed[dir_path]
+        if dir_path != root_path:
+            parent = listed[os.path.dirname(dir_path)]
+            parent[1] += size
+            parent[2] += files
+        if depth <= max_depth:
+            yield depth, dir_path, size, files
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Storage Profile - where a slow scan spends its time
+A ScanProfile handed to the walkers collects per-phase timers, counters,
+error kinds and the slowest directories; without one the walkers only
+pay a None check per directory. profile_calls adds a cProfile run of the
+same work for function-level detail.
+"""
+
+import cProfile
+import errno
+import io
+import pstats
+import time
+from contextlib import contextmanager
+
+# Slowest directories kept for the summary
+SLOWEST_DIRECTORIES = 10
+
+# Functions listed from a cProfile run, by cumulative time
+PSTATS_LINES = 20
+
+
+class ScanProfile:
+    """Timers and counters for one or more scans"""
+
+    def __init__(self, slowest=SLOWEST_DIRECTORIES):
+        self.phases = {}
+        self.phase_calls = {}
+        self.dirs = 0
+        self.files = 0
+        self.entries = 0
+        self.stat_calls = 0
+        self.errors = {}
+        self.slowest_count = slowest
+        self.slowest = {}
+        self.slowest_floor = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds, calls=1):
+        """Add time to a phase"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.phase_calls[name] = self.phase_calls.get(name, 0) + calls
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body as one call of a phase"""
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def directory(self, path, seconds, entries, files, stats, stat_seconds=0.0):
+        """Record one listed directory: seconds spent in it, of which stat_seconds in stat calls"""
+        self.dirs += 1
+        self.files += files
+        self.entries += entries
+        self.stat_calls += stats
+        self.add('list', seconds - stat_seconds)
+        if stats:
+            self.add('stat', stat_seconds, stats)
+        if seconds <= self.slowest_floor and len(self.slowest) >= self.slowest_count:
+            return
+        # Keyed by path: sampling lists the same directories many times
+        if seconds > self.slowest.get(path, (0.0,))[0]:
+            self.slowest[path] = (seconds, entries)
+            if len(self.slowest) > self.slowest_count:
+                del self.slowest[min(self.slowest, key=lambda item: self.slowest[item][0])]
+            if len(self.slowest) >= self.slowest_count:
+                self.slowest_floor = min(seconds for seconds, _ in self.slowest.values())
+
+    def slowest_directories(self):
+        """(seconds, path, entries) for the slowest directories, slowest first"""
+        return sorted(((seconds, path, entries) for path, (seconds, entries) in self.slowest.items()),
+                      reverse=True)
+
+    def error(self, exc):
+        """Count a failed listing or stat by its kind"""
+        if isinstance(exc, PermissionError):
+            kind = 'permission denied'
+        elif isinstance(exc, FileNotFoundError):
+            kind = 'vanished during scan'
+        else:
+            kind = errno.errorcode.get(getattr(exc, 'errno', None) or 0, type(exc).__name__)
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    @property
+    def syscalls(self):
+        """Approximate system calls: a stat per file plus open, getdents and close per directory"""
+        return self.stat_calls + 3 * self.dirs
+
+    def as_dict(self):
+        """Plain dict for reports"""
+        return {
+            'elapsed': time.perf_counter() - self.started,
+            'phases': {name: {'seconds': seconds, 'calls': self.phase_calls[name]}
+                       for name, seconds in self.phases.items()},
+            'dirs': self.dirs,
+            'files': self.files,
+            'entries': self.entries,
+            'stat_calls': self.stat_calls,
+            'syscalls': self.syscalls,
+            'errors': dict(self.errors),
+            'slowest': [{'path': path, 'seconds': seconds, 'entries': entries}
+                        for seconds, path, entries in self.slowest_directories()],
+        }
+
+    def summary(self):
+        """Human-readable report lines"""
+        elapsed = time.perf_counter() - self.started
+        lines = [f"Profile: {elapsed:.2f}s, {self.dirs} directories, {self.files} files, "
+                 f"{self.entries} entries, {self.stat_calls} stat calls (~{self.syscalls} syscalls)"]
+        lines.append("  Phases:")
+        for name, seconds in sorted(self.phases.items(), key=lambda item: item[1], reverse=True):
+            calls = self.phase_calls[name]
+            per_call = f"{seconds / calls * 1e6:9.1f} us/call" if calls > 1 else ""
+            lines.append(f"    {name:<16}{seconds:9.3f}s {calls:>10} calls {per_call}")
+        if self.errors:
+            lines.append("  Errors:")
+            for kind, count in sorted(self.errors.items(), key=lambda item: item[1], reverse=True):
+                lines.append(f"    {kind:<24}{count:>8}")
+        if self.slowest:
+            lines.append("  Slowest directories:")
+            for seconds, path, entries in self.slowest_directories():
+                lines.append(f"    {seconds * 1000:9.1f} ms {entries:>8} entries  {path}")
+        return lines
+
+
+@contextmanager
+def profile_calls(stats_path=None, lines=PSTATS_LINES, out=None):
+    """Run the body under cProfile; dump pstats to stats_path and print the top functions to out"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if stats_path:
+            profiler.dump_stats(stats_path)
+        if out is not None:
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(lines)
+            out.write(text.getvalue())
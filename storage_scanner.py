@@ -0,0 +1,1272 @@
+#!/usr/bin/env python3
+"""
+Storage Scanner - shared directory walker for the storage analyzers
+Builds a directory size tree in a single pass so front ends can navigate
+any level of it without rescanning the disk.
+"""
+
+import ctypes
+import fnmatch
+import heapq
+import os
+import platform
+import re
+import stat
+from bisect import bisect_right
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import nullcontext
+
+# File categories; ids index the fixed per-directory breakdown arrays
+CATEGORIES = ('Other', 'Video & Audio', 'Images', 'Documents', 'Archives',
+              'Disk & VM Images', 'Build Artifacts', 'Caches', 'Source Code')
+CATEGORY_ID = {name: index for index, name in enumerate(CATEGORIES)}
+
+_CATEGORY_EXTENSIONS = {
+    'Video & Audio': 'mp4 mkv avi mov webm wmv flv m4v mpg mpeg mp3 flac wav ogg opus m4a aac wma',
+    'Images': 'jpg jpeg png gif bmp tif tiff webp heic raw cr2 nef svg ico psd xcf',
+    'Documents': 'pdf doc docx odt xls xlsx ods ppt pptx odp txt md rtf epub djvu csv',
+    'Archives': 'zip tar gz tgz bz2 xz zst 7z rar lz4 lzma cab deb rpm',
+    'Disk & VM Images': 'iso img qcow2 qcow vdi vmdk vhd vhdx ova ovf',
+    'Build Artifacts': 'o a so obj lib dll exe class jar pyc pyo whl rlib rmeta d',
+    'Source Code': 'c h cc cpp hpp rs go py js ts jsx tsx java kt rb php sh lua zig',
+}
+EXTENSION_CATEGORY = {}
+for _category, _extensions in _CATEGORY_EXTENSIONS.items():
+    for _extension in _extensions.split():
+        EXTENSION_CATEGORY.setdefault(_extension, CATEGORY_ID[_category])
+
+# Everything below these directories is counted as their category
+DIRECTORY_CATEGORY = {
+    '.cache': CATEGORY_ID['Caches'],
+    'cache': CATEGORY_ID['Caches'],
+    'Cache': CATEGORY_ID['Caches'],
+    '__pycache__': CATEGORY_ID['Caches'],
+    '.npm': CATEGORY_ID['Caches'],
+    '.gradle': CATEGORY_ID['Caches'],
+    'node_modules': CATEGORY_ID['Build Artifacts'],
+    'target': CATEGORY_ID['Build Artifacts'],
+    'build': CATEGORY_ID['Build Artifacts'],
+    'dist': CATEGORY_ID['Build Artifacts'],
+    '.tox': CATEGORY_ID['Build Artifacts'],
+}
+
+
+# Age buckets for last-modified/last-accessed histograms, split at these day counts
+AGE_THRESHOLDS = (30, 90, 365)
+AGE_LABELS = ('< 30 days', '30-90 days', '90-365 days', '> 1 year')
+_AGE_LIMITS = tuple(days * 86400 for days in AGE_THRESHOLDS)
+_AGE_COUNT = len(AGE_LABELS)
+_AGE_ZEROS = array('Q', [0] * _AGE_COUNT)
+
+
+# Filesystems that hold no disk data (kernel views, memory) or live on another machine
+PSEUDO_FILESYSTEMS = frozenset((
+    'proc', 'sysfs', 'devtmpfs', 'devpts', 'tmpfs', 'ramfs', 'cgroup', 'cgroup2',
+    'securityfs', 'debugfs', 'tracefs', 'configfs', 'pstore', 'bpf', 'mqueue',
+    'hugetlbfs', 'autofs', 'binfmt_misc', 'fusectl', 'efivarfs', 'rpc_pipefs',
+    'nsfs', 'selinuxfs',
+))
+REMOTE_FILESYSTEMS = frozenset((
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', '9p', 'ceph', 'glusterfs',
+    'afs', 'lustre', 'gpfs', 'fuse',
+))
+
+_MOUNTINFO_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+# statx(2) constants from <linux/stat.h> and <fcntl.h>
+_AT_FDCWD = -100
+_AT_SYMLINK_NOFOLLOW = 0x100
+_AT_STATX_DONT_SYNC = 0x4000
+_STATX_ATIME = 0x20
+_STATX_MTIME = 0x40
+_STATX_SIZE = 0x200
+_STATX_BLOCKS = 0x400
+
+# ioprio_set(2): syscall numbers per architecture and the idle class value
+_IOPRIO_SET_SYSCALL = {
+    'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'arm64': 30,
+    'riscv64': 30, 'armv7l': 314, 'ppc64le': 273, 's390x': 282,
+}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+
+def file_extension(name):
+    """Lower-case extension without the dot, '' if there is none"""
+    stem, dot, extension = name.rpartition('.')
+    return extension.lower() if dot and stem else ''
+
+
+class Mount:
+    """One line of /proc/self/mountinfo"""
+
+    __slots__ = ('mount_point', 'fstype', 'source', 'dev')
+
+    def __init__(self, mount_point, fstype, source, dev):
+        self.mount_point = mount_point
+        self.fstype = fstype
+        self.source = source
+        self.dev = dev
+
+    @property
+    def virtual(self):
+        """Pseudo, remote or FUSE filesystem (fuseblk is a local disk and is not)"""
+        return (self.fstype in PSEUDO_FILESYSTEMS or self.fstype in REMOTE_FILESYSTEMS
+                or self.fstype.startswith('fuse.'))
+
+
+class MountTable:
+    """Mounts keyed by mount point, read once per scan"""
+
+    def __init__(self, mounts=()):
+        self.by_point = {}
+        for mount in mounts:
+            # Later lines are stacked on top of earlier mounts at the same point
+            self.by_point[mount.mount_point] = mount
+
+    @classmethod
+    def read(cls, path='/proc/self/mountinfo'):
+        """Parse mountinfo; an empty table where it does not exist"""
+        mounts = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    fields = line.split()
+                    separator = fields.index('-')
+                    major, minor = fields[2].split(':')
+                    mount_point = _MOUNTINFO_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), fields[4])
+                    mounts.append(Mount(mount_point, fields[separator + 1], fields[separator + 2],
+                                        os.makedev(int(major), int(minor))))
+        except (OSError, ValueError, IndexError):
+            pass
+        return cls(mounts)
+
+    def mount_for(self, path):
+        """Mount containing path (longest matching mount point), or None"""
+        path = os.path.abspath(path)
+        while True:
+            mount = self.by_point.get(path)
+            if mount is not None:
+                return mount
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+class PathFilter:
+    """Include/exclude globs, each list compiled into a single regular expression.
+
+    Patterns are matched against full paths; a pattern without a slash
+    matches the entry name at any depth ("node_modules", "*.iso").
+    Excludes prune files and directories; includes limit which files
+    are counted, while every directory is still walked.
+    """
+
+    def __init__(self, include=(), exclude=()):
+        self.include = self.compile(include)
+        self.exclude = self.compile(exclude)
+
+    @staticmethod
+    def compile(patterns):
+        """One match function for any of patterns, or None for an empty list"""
+        if not patterns:
+            return None
+        expressions = [fnmatch.translate(pattern if '/' in pattern else '*/' + pattern)
+                       for pattern in patterns]
+        return re.compile('|'.join(expressions)).match
+
+    def skip_dir(self, path):
+        """Whether a directory is excluded"""
+        return self.exclude is not None and self.exclude(path) is not None
+
+    def skip_file(self, path):
+        """Whether a file is excluded or not included"""
+        if self.exclude is not None and self.exclude(path) is not None:
+            return True
+        return self.include is not None and self.include(path) is None
+
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_int64), ('tv_nsec', ctypes.c_uint32), ('reserved', ctypes.c_int32)]
+
+
+class _StatxBuffer(ctypes.Structure):
+    _fields_ = [
+        ('stx_mask', ctypes.c_uint32), ('stx_blksize', ctypes.c_uint32),
+        ('stx_attributes', ctypes.c_uint64), ('stx_nlink', ctypes.c_uint32),
+        ('stx_uid', ctypes.c_uint32), ('stx_gid', ctypes.c_uint32),
+        ('stx_mode', ctypes.c_uint16), ('spare0', ctypes.c_uint16),
+        ('stx_ino', ctypes.c_uint64), ('stx_size', ctypes.c_uint64),
+        ('stx_blocks', ctypes.c_uint64), ('stx_attributes_mask', ctypes.c_uint64),
+        ('stx_atime', _StatxTimestamp), ('stx_btime', _StatxTimestamp),
+        ('stx_ctime', _StatxTimestamp), ('stx_mtime', _StatxTimestamp),
+        ('spare', ctypes.c_uint64 * 18),
+    ]
+
+
+class Statx:
+    """statx(2) through ctypes, asking only for the fields the scan uses.
+
+    With a size/blocks mask and AT_STATX_DONT_SYNC, network filesystems
+    can answer from cached attributes instead of a server round trip.
+    On local filesystems os.lstat is as cheap and has less call overhead.
+    """
+
+    def __init__(self, times=False):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.call = libc.statx
+        self.call.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.c_void_p]
+        self.call.restype = ctypes.c_int
+        self.buffer = _StatxBuffer()
+        self.pointer = ctypes.byref(self.buffer)
+        self.mask = _STATX_SIZE | _STATX_BLOCKS | (_STATX_ATIME | _STATX_MTIME if times else 0)
+
+    @classmethod
+    def create(cls, times=False):
+        """A working Statx, or None without glibc statx or kernel support"""
+        try:
+            statx = cls(times)
+            statx('/')
+        except (AttributeError, OSError):
+            return None
+        return statx
+
+    def __call__(self, path):
+        """(size, mtime, atime) of path, not following symlinks"""
+        if self.call(_AT_FDCWD, os.fsencode(path), _AT_SYMLINK_NOFOLLOW | _AT_STATX_DONT_SYNC,
+                     self.mask, self.pointer):
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        buffer = self.buffer
+        return buffer.stx_size, buffer.stx_mtime.tv_sec, buffer.stx_atime.tv_sec
+
+
+def set_idle_io_priority():
+    """Move the calling thread to the idle I/O class; False where unsupported.
+
+    The idle class is honoured by the BFQ and CFQ I/O schedulers; others
+    ignore it, which is why the scan also rate-limits itself.
+    """
+    number = _IOPRIO_SET_SYSCALL.get(platform.machine().lower())
+    if number is None:
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        # who=0 is the calling thread
+        result = libc.syscall(number, _IOPRIO_WHO_PROCESS, 0, _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT)
+    except (OSError, AttributeError):
+        return False
+    return result == 0
+
+
+def io_pressure(path='/proc/pressure/io'):
+    """Share of the last 10 seconds some task stalled on I/O (percent), None without PSI"""
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith('some '):
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition('=')
+                        if key == 'avg10':
+                            return float(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class PoliteThrottle:
+    """Keeps a scan out of the way of production I/O.
+
+    The scanning thread drops to the idle I/O class, listing speed is
+    capped in entries/s and metadata operations (stats and directory
+    opens) per second, and the scan pauses while /proc/pressure/io shows
+    other tasks stalling on I/O. Time spent below the rates (slow listings,
+    cold caches) earns at most burst_seconds of allowance, so the walk
+    never races to catch up.
+    """
+
+    def __init__(self, entries_per_second=2000, ops_per_second=None, pressure_limit=10.0,
+                 pressure_interval=1.0, pause_interval=2.0, burst_seconds=1.0):
+        self.entries_per_second = entries_per_second
+        self.ops_per_second = ops_per_second
+        self.pressure_limit = pressure_limit
+        self.pressure_interval = pressure_interval
+        self.pause_interval = pause_interval
+        self.burst_seconds = burst_seconds
+        self.idle_priority = False
+        self.paused_seconds = 0.0
+        self.reset()
+
+    def reset(self):
+        """Start a new rate window"""
+        self.window_start = time.monotonic()
+        self.entries = 0
+        self.ops = 0
+        self.pressure_checked = self.window_start
+
+    def start(self):
+        """Called on the scanning thread before the walk"""
+        self.idle_priority = set_idle_io_priority()
+        self.reset()
+
+    def wait(self, entries, ops, progress=None, cancel=None):
+        """Account for one listed directory and sleep as needed"""
+        self.entries += entries
+        self.ops += ops
+        now = time.monotonic()
+
+        # Sleep until the running totals are back under the configured rates
+        due = 0.0
+        if self.entries_per_second:
+            due = self.entries / self.entries_per_second
+        if self.ops_per_second:
+            due = max(due, self.ops / self.ops_per_second)
+        delay = self.window_start + due - now
+        if delay > 0:
+            if cancel is not None:
+                if cancel.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+            now = time.monotonic()
+        elif -delay > self.burst_seconds:
+            # Behind the rates: keep only burst_seconds of unused allowance
+            self.window_start += -delay - self.burst_seconds
+
+        if self.pressure_limit is None or now - self.pressure_checked < self.pressure_interval:
+            return
+        self.pressure_checked = now
+        pressure = io_pressure()
+        if pressure is None or pressure < self.pressure_limit:
+            return
+
+        if progress is not None:
+            progress.paused = True
+        paused_at = time.monotonic()
+        while pressure is not None and pressure >= self.pressure_limit:
+            if cancel is not None and cancel.wait(self.pause_interval):
+                break
+            if cancel is None:
+                time.sleep(self.pause_interval)
+            pressure = io_pressure()
+        self.paused_seconds += time.monotonic() - paused_at
+        if progress is not None:
+            progress.paused = False
+        # Don't burst to catch up on the time spent paused
+        self.reset()
+
+
+class ScanCancelled(Exception):
+    """Raised inside a scan when its cancel event is set"""
+
+
+class ScanProgress:
+    """Counters updated by a running scan, readable from other threads"""
+
+    def __init__(self):
+        self.dirs = 0
+        self.files = 0
+        self.entries = 0
+        self.stat_calls = 0
+        self.bytes = 0
+        self.errors = 0
+        self.paused = False
+        self.current = ''
+
+    def as_dict(self):
+        """Snapshot of the counters"""
+        return {
+            'dirs': self.dirs,
+            'files': self.files,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'paused': self.paused,
+            'current': self.current,
+        }
+
+
+_CATEGORY_COUNT = len(CATEGORIES)
+_CATEGORY_ZEROS = array('Q', [0] * _CATEGORY_COUNT)
+
+
+class LargestFiles:
+    """Bounded min-heaps of the K largest files, overall and per top-level child.
+
+    Entries are (size, parent_node, name); paths are rebuilt from the tree
+    only when results are read.
+    """
+
+    def __init__(self, k=25):
+        self.k = k
+        self.overall = []
+        self.by_top = {}
+
+    def push(self, heap, item):
+        """Keep item if it beats the smallest of the current K"""
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def add(self, size, node, name, top):
+        """Record one file; top is the top-level child it lives under (0 = root)"""
+        overall = self.overall
+        if len(overall) < self.k or size > overall[0][0]:
+            self.push(overall, (size, node, name))
+        heap = self.by_top.get(top)
+        if heap is None:
+            heap = self.by_top[top] = []
+        if len(heap) < self.k or size > heap[0][0]:
+            self.push(heap, (size, node, name))
+
+    def results(self, tree, top=None):
+        """Largest first as (size, path) pairs, overall or under one top-level child"""
+        heap = self.overall if top is None else self.by_top.get(top, [])
+        return [(size, os.path.join(tree.path(node), name))
+                for size, node, name in sorted(heap, reverse=True)]
+
+    def results_under(self, tree, node):
+        """Largest files under any directory.
+
+        The root and top-level children have lists of their own; deeper
+        directories get the files of their top-level ancestor's list that
+        fall inside them, which may be fewer than the directory holds.
+        """
+        if not node:
+            return self.results(tree)
+        top = node
+        while tree.parents[top] > 0:
+            top = tree.parents[top]
+        prefix = tree.path(node) + os.sep
+        files = self.results(tree, top)
+        if top == node:
+            return files
+        return [(size, path) for size, path in files if path.startswith(prefix)]
+
+
+class NamePool:
+    """Interned directory names; each distinct name is stored once and referenced by id"""
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def intern(self, name):
+        """Id for name, adding it on first use"""
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def __len__(self):
+        return len(self.names)
+
+
+def mode_access(mode, uid, gid, euid, gid_set):
+    """(can list, can write) a directory with these mode bits and owner, for a non-root user"""
+    if uid == euid:
+        mode >>= 6
+    elif gid in gid_set:
+        mode >>= 3
+    return mode & 5 == 5, mode & 3 == 3
+
+
+class ScanTree:
+    """Directory size tree; nodes are integer ids and 0 is the root.
+
+    Storage is struct-of-arrays: one typed array per field, indexed by
+    node id, with children linked through first_child/next_sibling and
+    names kept as ids into a shared NamePool. Full paths are rebuilt on
+    demand. Directories are numbered in the order they are discovered,
+    so every child has a larger id than its parent and sizes can be
+    rolled up with one reverse pass.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = os.path.abspath(root_path)
+        self.pool = NamePool()
+        self.name_ids = array('I', [self.pool.intern(self.root_path)])
+        self.parents = array('i', [-1])
+        self.first_child = array('i', [-1])
+        self.next_sibling = array('i', [-1])
+        self.sizes = array('Q', [0])
+        self.file_counts = array('Q', [0])
+        self.modes = None
+        self.uids = None
+        self.gids = None
+        self.denied = bytearray(1)
+        self.root_mount = None
+        self.mount_nodes = {}
+        self.skipped_mounts = []
+        self.euid = os.geteuid()
+        self.gid_set = {os.getegid(), *os.getgroups()}
+        self.errors = 0
+        self.scanned_at = time.time()
+        self.largest = None
+        self.type_bytes = None
+        self.type_counts = None
+        self.extension_totals = None
+        self.mtime_bytes = None
+        self.atime_bytes = None
+        self.aged_at = None
+        self._sorted = {}
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add_dir(self, parent, name):
+        """Append a directory node under parent and return its id"""
+        node = len(self.parents)
+        self.name_ids.append(self.pool.intern(name))
+        self.parents.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(self.first_child[parent])
+        self.first_child[parent] = node
+        self.sizes.append(0)
+        self.file_counts.append(0)
+        self.denied.append(0)
+        if self.modes is not None:
+            self.modes.append(0)
+            self.uids.append(0)
+            self.gids.append(0)
+        if self.type_bytes is not None:
+            self.type_bytes.extend(_CATEGORY_ZEROS)
+            self.type_counts.extend(_CATEGORY_ZEROS)
+        if self.mtime_bytes is not None:
+            self.mtime_bytes.extend(_AGE_ZEROS)
+            self.atime_bytes.extend(_AGE_ZEROS)
+        return node
+
+    def enable_file_types(self):
+        """Allocate the per-directory category arrays (one fixed slot per category)"""
+        self.type_bytes = array('Q', _CATEGORY_ZEROS) * len(self)
+        self.type_counts = array('Q', _CATEGORY_ZEROS) * len(self)
+        self.extension_totals = {}
+
+    def add_file_type(self, node, category, extension, size):
+        """Count one file towards its directory's category slot"""
+        slot = node * _CATEGORY_COUNT + category
+        self.type_bytes[slot] += size
+        self.type_counts[slot] += 1
+        totals = self.extension_totals.get(extension)
+        if totals is None:
+            self.extension_totals[extension] = [size, 1]
+        else:
+            totals[0] += size
+            totals[1] += 1
+
+    def enable_ages(self, now=None):
+        """Allocate the per-directory mtime/atime histograms, aged relative to now"""
+        self.aged_at = now if now is not None else time.time()
+        self.mtime_bytes = array('Q', _AGE_ZEROS) * len(self)
+        self.atime_bytes = array('Q', _AGE_ZEROS) * len(self)
+
+    def add_file_age(self, node, mtime, atime, size):
+        """Count one file's bytes into its directory's age buckets"""
+        now = self.aged_at
+        base = node * _AGE_COUNT
+        self.mtime_bytes[base + bisect_right(_AGE_LIMITS, now - mtime)] += size
+        self.atime_bytes[base + bisect_right(_AGE_LIMITS, now - atime)] += size
+
+    def bucket_arrays(self):
+        """Enabled fixed-width per-node arrays as (values, width) pairs"""
+        arrays = []
+        if self.type_bytes is not None:
+            arrays += [(self.type_bytes, _CATEGORY_COUNT), (self.type_counts, _CATEGORY_COUNT)]
+        if self.mtime_bytes is not None:
+            arrays += [(self.mtime_bytes, _AGE_COUNT), (self.atime_bytes, _AGE_COUNT)]
+        return arrays
+
+    def rollup(self):
+        """Turn per-directory file sizes into recursive totals"""
+        sizes, counts, parents = self.sizes, self.file_counts, self.parents
+        for node in range(len(sizes) - 1, 0, -1):
+            parent = parents[node]
+            sizes[parent] += sizes[node]
+            counts[parent] += counts[node]
+
+        for values, width in self.bucket_arrays():
+            for node in range(len(sizes) - 1, 0, -1):
+                source = node * width
+                target = parents[node] * width
+                for offset in range(width):
+                    values[target + offset] += values[source + offset]
+        self._sorted.clear()
+
+    def type_breakdown(self, node):
+        """Non-empty categories under node as (name, bytes, files), largest first"""
+        if self.type_bytes is None:
+            return []
+        start = node * _CATEGORY_COUNT
+        breakdown = [(CATEGORIES[category], self.type_bytes[start + category], self.type_counts[start + category])
+                     for category in range(_CATEGORY_COUNT) if self.type_counts[start + category]]
+        breakdown.sort(key=lambda item: item[1], reverse=True)
+        return breakdown
+
+    def dominant_type(self, node):
+        """(category name, share of bytes) for the largest category under node"""
+        breakdown = self.type_breakdown(node)
+        if not breakdown or not self.sizes[node]:
+            return None, 0.0
+        name, size, _ = breakdown[0]
+        return name, size / self.sizes[node]
+
+    def type_label(self, node, default='Directory'):
+        """Short label such as "Video & Audio 72%" for list views"""
+        name, share = self.dominant_type(node)
+        if name is None:
+            return default
+        return f"{name} {share * 100:.0f}%"
+
+    def age_histogram(self, node, kind='mtime'):
+        """Bytes under node per age bucket as (label, bytes); kind is 'mtime' or 'atime'"""
+        values = self.mtime_bytes if kind == 'mtime' else self.atime_bytes
+        if values is None:
+            return []
+        start = node * _AGE_COUNT
+        return list(zip(AGE_LABELS, values[start:start + _AGE_COUNT]))
+
+    def cold_bytes(self, node, days, kind='mtime'):
+        """Bytes under node not modified (or accessed) for at least days, one of AGE_THRESHOLDS"""
+        values = self.mtime_bytes if kind == 'mtime' else self.atime_bytes
+        if values is None:
+            return 0
+        start = node * _AGE_COUNT
+        return sum(values[start + AGE_THRESHOLDS.index(days) + 1:start + _AGE_COUNT])
+
+    def enable_permissions(self):
+        """Allocate the per-directory mode and owner arrays"""
+        self.modes = array('H', [0]) * len(self)
+        self.uids = array('I', [0]) * len(self)
+        self.gids = array('I', [0]) * len(self)
+
+    def set_owner(self, node, st):
+        """Keep a directory's permission bits and owner from its stat result"""
+        self.modes[node] = stat.S_IMODE(st.st_mode)
+        self.uids[node] = st.st_uid
+        self.gids[node] = st.st_gid
+
+    def access(self, node):
+        """(can list, can write) for the current user, from the recorded mode bits.
+
+        Directories the walk itself could not open are never listable.
+        Without recorded permissions (see scan_tree) listing is known
+        from the walk and writing is None.
+        """
+        if self.denied[node]:
+            return False, False
+        if self.euid == 0:
+            return True, True
+        if self.modes is None:
+            return True, None
+        return mode_access(self.modes[node], self.uids[node], self.gids[node], self.euid, self.gid_set)
+
+    def mount_totals(self):
+        """(mount, bytes) for the root's filesystem and every mount crossed, largest first.
+
+        Bytes are each filesystem's own share: nested mounts are subtracted.
+        """
+        owners = {0: self.root_mount}
+        owners.update(self.mount_nodes)
+        totals = {node: self.sizes[node] for node in owners}
+        for node in self.mount_nodes:
+            parent = self.parents[node]
+            while parent not in owners:
+                parent = self.parents[parent]
+            totals[parent] -= self.sizes[node]
+        return sorted(((owners[node], size) for node, size in totals.items() if owners[node] is not None),
+                      key=lambda item: item[1], reverse=True)
+
+    def name(self, node):
+        """Directory name of a node (the full root path for node 0)"""
+        return self.pool.names[self.name_ids[node]]
+
+    def children(self, node):
+        """Direct child node ids, newest first"""
+        child = self.first_child[node]
+        next_sibling = self.next_sibling
+        while child >= 0:
+            yield child
+            child = next_sibling[child]
+
+    def path(self, node):
+        """Full path of a node, rebuilt from its ancestors"""
+        names, name_ids, parents = self.pool.names, self.name_ids, self.parents
+        parts = []
+        while node > 0:
+            parts.append(names[name_ids[node]])
+            node = parents[node]
+        return os.path.join(self.root_path, *reversed(parts))
+
+    def find(self, path):
+        """Node id for an absolute path inside this tree, or None"""
+        path = os.path.abspath(path)
+        if path == self.root_path:
+            return 0
+        try:
+            relative = os.path.relpath(path, self.root_path)
+        except ValueError:
+            return None
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+
+        node = 0
+        for part in relative.split(os.sep):
+            # Names are interned, so a name missing from the pool can't be in the tree
+            name_id = self.pool.ids.get(part)
+            if name_id is None:
+                return None
+            for child in self.children(node):
+                if self.name_ids[child] == name_id:
+                    node = child
+                    break
+            else:
+                return None
+        return node
+
+    def sorted_children(self, node):
+        """Children of node, largest first (cached per node)"""
+        ordered = self._sorted.get(node)
+        if ordered is None:
+            ordered = sorted(self.children(node), key=self.sizes.__getitem__, reverse=True)
+            self._sorted[node] = ordered
+        return ordered
+
+    def describe(self, node):
+        """Plain dict for one node"""
+        return {
+            'name': self.name(node) if node else os.path.basename(self.root_path) or self.root_path,
+            'path': self.path(node),
+            'size': self.sizes[node],
+            'files': self.file_counts[node],
+            'dirs': sum(1 for _ in self.children(node)),
+        }
+
+
+class _RebasedColumn:
+    """A per-node array seen through a SubtreeView"""
+
+    __slots__ = ('values', 'base')
+
+    def __init__(self, values, base):
+        self.values = values
+        self.base = base
+
+    def __getitem__(self, node):
+        return self.values[node or self.base]
+
+
+class _SubtreeLargest:
+    """LargestFiles results for a SubtreeView"""
+
+    def __init__(self, view):
+        self.view = view
+
+    def results(self, tree, top=None):
+        """Largest first as (size, path) pairs under the view's root or one of its directories"""
+        view = self.view
+        return view.tree.largest.results_under(view.tree, top or view.base)
+
+    def results_under(self, tree, node):
+        """Largest files under any directory of the view"""
+        return self.results(tree, node)
+
+
+class SubtreeView:
+    """A scanned tree re-rooted at one of its directories, which becomes node 0.
+
+    Other node ids are unchanged: the original root can never appear
+    below the new one, so only id 0 needs translating.
+    """
+
+    def __init__(self, tree, node):
+        self.tree = tree
+        self.base = node
+        self.root_path = tree.path(node)
+        self.scanned_at = tree.scanned_at
+        prefix = self.root_path.rstrip(os.sep) + os.sep
+        self.skipped_mounts = [mount for mount in tree.skipped_mounts if mount.mount_point.startswith(prefix)]
+        self.sizes = _RebasedColumn(tree.sizes, node)
+        self.file_counts = _RebasedColumn(tree.file_counts, node)
+        self.first_child = _RebasedColumn(tree.first_child, node)
+        self.largest = _SubtreeLargest(self) if tree.largest is not None else None
+
+    def name(self, node):
+        return self.root_path if node == 0 else self.tree.name(node)
+
+    def path(self, node):
+        return self.tree.path(node or self.base)
+
+    def children(self, node):
+        return self.tree.children(node or self.base)
+
+    def sorted_children(self, node):
+        return self.tree.sorted_children(node or self.base)
+
+    def find(self, path):
+        path = os.path.abspath(path)
+        if path == self.root_path:
+            return 0
+        if not path.startswith(self.root_path.rstrip(os.sep) + os.sep):
+            return None
+        return self.tree.find(path)
+
+    def access(self, node):
+        return self.tree.access(node or self.base)
+
+    def type_breakdown(self, node):
+        return self.tree.type_breakdown(node or self.base)
+
+    def type_label(self, node, default='Directory'):
+        return self.tree.type_label(node or self.base, default)
+
+    def age_histogram(self, node, kind='mtime'):
+        return self.tree.age_histogram(node or self.base, kind)
+
+    def cold_bytes(self, node, days, kind='mtime'):
+        return self.tree.cold_bytes(node or self.base, days, kind)
+
+    def describe(self, node):
+        return self.tree.describe(node or self.base)
+
+
+def scan_tree(path, progress=None, cancel=None, top_files=0, on_file=None, file_types=False,
+              ages=False, skip_virtual=True, one_file_system=False, path_filter=None,
+              permissions=False, use_statx=False, throttle=None, profile=None):
+    """Walk path once and return a ScanTree with rolled-up sizes.
+
+    With top_files > 0 the tree also gets a LargestFiles index of that
+    many files, built from the stat results the walk already has.
+    With file_types the tree keeps per-directory category totals
+    (see ScanTree.type_breakdown) and whole-tree extension totals.
+    With ages it keeps last-modified/last-accessed histograms per
+    directory (see ScanTree.age_histogram).
+    on_file(tree, node, name, stat) is called for every regular file.
+
+    Mount points are read from /proc/self/mountinfo. Pseudo, remote and
+    FUSE filesystems below path are skipped unless skip_virtual is off;
+    one_file_system skips every other filesystem, like du -x. Skipped
+    mounts are listed in tree.skipped_mounts. path_filter is a PathFilter.
+
+    The walk trusts the entry types from the directory listing, so
+    regular files cost one stat each and directories none. permissions
+    stats directories too, to keep their mode bits and owners for
+    ScanTree.access. use_statx sizes files with a minimal statx mask
+    (see Statx); it is ignored when on_file needs full stat results.
+    throttle (a PoliteThrottle) is consulted after every directory.
+    profile (a storage_profile.ScanProfile) gets per-directory timings.
+    """
+    tree = ScanTree(path)
+    progress = progress or ScanProgress()
+    largest = tree.largest = LargestFiles(top_files) if top_files > 0 else None
+    if file_types:
+        tree.enable_file_types()
+    if ages:
+        tree.enable_ages()
+    if permissions:
+        tree.enable_permissions()
+    if throttle is not None:
+        throttle.start()
+    statx = Statx.create(times=ages) if use_statx and on_file is None else None
+    extension_category = EXTENSION_CATEGORY
+    mounts = MountTable.read()
+    mount_points = mounts.by_point
+    tree.root_mount = root_mount = mounts.mount_for(tree.root_path)
+    stack = [(0, tree.root_path, 0, None)]
+    timed = profile is not None
+    perf_counter = time.perf_counter
+    if permissions:
+        try:
+            tree.set_owner(0, os.lstat(tree.root_path))
+        except OSError:
+            pass
+
+    while stack:
+        if cancel is not None and cancel.is_set():
+            raise ScanCancelled(path)
+
+        node, dir_path, top, forced_category = stack.pop()
+        progress.current = dir_path
+        dir_bytes = dir_files = dir_entries = dir_stats = 0
+        if timed:
+            dir_started = perf_counter()
+            stat_seconds = 0.0
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    dir_entries += 1
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            if path_filter is not None and path_filter.skip_file(entry.path):
+                                continue
+                            dir_stats += 1
+                            if timed:
+                                stat_started = perf_counter()
+                            if statx is not None:
+                                size, mtime, atime = statx(entry.path)
+                            else:
+                                st = entry.stat(follow_symlinks=False)
+                                size, mtime, atime = st.st_size, st.st_mtime, st.st_atime
+                            if timed:
+                                stat_seconds += perf_counter() - stat_started
+                            dir_bytes += size
+                            dir_files += 1
+                            if largest is not None:
+                                largest.add(size, node, entry.name, top)
+                            if file_types:
+                                extension = file_extension(entry.name)
+                                category = forced_category
+                                if category is None:
+                                    category = extension_category.get(extension, 0)
+                                tree.add_file_type(node, category, extension, size)
+                            if ages:
+                                tree.add_file_age(node, mtime, atime, size)
+                            if on_file is not None:
+                                on_file(tree, node, entry.name, st)
+                        elif entry.is_dir(follow_symlinks=False):
+                            # Decided from mountinfo alone, so a dead network mount is never touched
+                            mount = mount_points.get(entry.path)
+                            if mount is not None and (
+                                    (skip_virtual and mount.virtual)
+                                    or (one_file_system and root_mount is not None
+                                        and mount.dev != root_mount.dev)):
+                                tree.skipped_mounts.append(mount)
+                                continue
+                            if path_filter is not None and path_filter.skip_dir(entry.path):
+                                continue
+                            if permissions:
+                                dir_stat = entry.stat(follow_symlinks=False)
+                                dir_stats += 1
+                            child = tree.add_dir(node, entry.name)
+                            if permissions:
+                                tree.set_owner(child, dir_stat)
+                            if mount is not None:
+                                tree.mount_nodes[child] = mount
+                            child_category = forced_category
+                            if file_types and child_category is None:
+                                child_category = DIRECTORY_CATEGORY.get(entry.name)
+                            stack.append((child, entry.path, top or child, child_category))
+                    except (PermissionError, OSError) as e:
+                        # Skip entries we can't stat
+                        progress.errors += 1
+                        if timed:
+                            profile.error(e)
+        except PermissionError as e:
+            tree.denied[node] = 1
+            progress.errors += 1
+            if timed:
+                profile.error(e)
+        except OSError as e:
+            progress.errors += 1
+            if timed:
+                profile.error(e)
+        # Typed array slots are written once per directory, not per file
+        tree.sizes[node] = dir_bytes
+        tree.file_counts[node] = dir_files
+        progress.files += dir_files
+        progress.entries += dir_entries
+        progress.stat_calls += dir_stats
+        progress.bytes += dir_bytes
+        progress.dirs += 1
+        if timed:
+            profile.directory(dir_path, perf_counter() - dir_started, dir_entries, dir_files, dir_stats,
+                              stat_seconds)
+        if throttle is not None:
+            with profile.phase('throttle') if timed else nullcontext():
+                throttle.wait(dir_entries, dir_stats + 1, progress, cancel)
+
+    tree.errors = progress.errors
+    with profile.phase('rollup') if timed else nullcontext():
+        tree.rollup()
+    return tree
+
+
+def list_directory(path, mounts, root_mount, skip_virtual=True, one_file_system=False, path_filter=None,
+                   progress=None, profile=None):
+    """(bytes, files, subdirectories, entries) directly in path, skipping what a scan would skip.
+
+    For callers that walk on their own terms (sampling, work splitting);
+    counts go to progress and profile like a scan's.
+    """
+    size = files = dir_entries = 0
+    subdirs = []
+    errors = 0
+    timed = profile is not None
+    if timed:
+        started = time.perf_counter()
+        stat_seconds = 0.0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                dir_entries += 1
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        if path_filter is not None and path_filter.skip_file(entry.path):
+                            continue
+                        if timed:
+                            stat_started = time.perf_counter()
+                        size += entry.stat(follow_symlinks=False).st_size
+                        if timed:
+                            stat_seconds += time.perf_counter() - stat_started
+                        files += 1
+                    elif entry.is_dir(follow_symlinks=False):
+                        mount = mounts.by_point.get(entry.path)
+                        if mount is not None and (
+                                (skip_virtual and mount.virtual)
+                                or (one_file_system and root_mount is not None and mount.dev != root_mount.dev)):
+                            continue
+                        if path_filter is not None and path_filter.skip_dir(entry.path):
+                            continue
+                        subdirs.append(entry.path)
+                except (PermissionError, OSError) as e:
+                    errors += 1
+                    if timed:
+                        profile.error(e)
+    except (PermissionError, OSError) as e:
+        errors += 1
+        if timed:
+            profile.error(e)
+    if timed:
+        profile.directory(path, time.perf_counter() - started, dir_entries, files, files, stat_seconds)
+    if progress is not None:
+        progress.current = path
+        progress.dirs += 1
+        progress.files += files
+        progress.bytes += size
+        progress.entries += dir_entries
+        progress.stat_calls += files
+        progress.errors += errors
+    return size, files, subdirs, dir_entries
+
+
+class _DirFrame:
+    """One directory on the streaming walk's stack"""
+
+    __slots__ = ('path', 'depth', 'pending', 'bytes', 'files')
+
+    def __init__(self, path, depth, pending):
+        self.path = path
+        self.depth = depth
+        self.pending = pending
+        self.bytes = 0
+        self.files = 0
+
+
+def iter_directory_sizes(path, max_depth=1, progress=None, cancel=None, skip_virtual=True,
+                         one_file_system=False, path_filter=None, throttle=None, pending_list=list, profile=None):
+    """Yield (depth, path, bytes, files) for directories down to max_depth, children first.
+
+    Unlike scan_tree nothing is kept for finished subtrees, so memory is
+    bounded by the unvisited subdirectories along the current path, and
+    each directory is yielded as soon as its subtree is done. Mount and
+    filter options behave as in scan_tree. pending_list makes the list of
+    a directory's unvisited subdirectories; a storage_spill.SpillList
+    factory bounds even that.
+    """
+    progress = progress or ScanProgress()
+    timed = profile is not None
+    perf_counter = time.perf_counter
+    mounts = MountTable.read()
+    mount_points = mounts.by_point
+    root_path = os.path.abspath(path)
+    root_mount = mounts.mount_for(root_path)
+    if throttle is not None:
+        throttle.start()
+
+    def list_directory(frame):
+        progress.current = frame.path
+        dir_entries = dir_stats = 0
+        if timed:
+            started = perf_counter()
+            stat_seconds = 0.0
+        try:
+            with os.scandir(frame.path) as entries:
+                for entry in entries:
+                    dir_entries += 1
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            if path_filter is not None and path_filter.skip_file(entry.path):
+                                continue
+                            dir_stats += 1
+                            if timed:
+                                stat_started = perf_counter()
+                            frame.bytes += entry.stat(follow_symlinks=False).st_size
+                            if timed:
+                                stat_seconds += perf_counter() - stat_started
+                            frame.files += 1
+                        elif entry.is_dir(follow_symlinks=False):
+                            mount = mount_points.get(entry.path)
+                            if mount is not None and (
+                                    (skip_virtual and mount.virtual)
+                                    or (one_file_system and root_mount is not None
+                                        and mount.dev != root_mount.dev)):
+                                continue
+                            if path_filter is not None and path_filter.skip_dir(entry.path):
+                                continue
+                            frame.pending.append(entry.path)
+                    except (PermissionError, OSError) as e:
+                        progress.errors += 1
+                        if timed:
+                            profile.error(e)
+        except (PermissionError, OSError) as e:
+            progress.errors += 1
+            if timed:
+                profile.error(e)
+        if timed:
+            profile.directory(frame.path, perf_counter() - started, dir_entries, frame.files, dir_stats,
+                              stat_seconds)
+        progress.dirs += 1
+        progress.files += frame.files
+        progress.bytes += frame.bytes
+        progress.entries += dir_entries
+        progress.stat_calls += dir_stats
+        if throttle is not None:
+            with profile.phase('throttle') if timed else nullcontext():
+                throttle.wait(dir_entries, dir_stats + 1, progress, cancel)
+        return frame
+
+    stack = [list_directory(_DirFrame(root_path, 0, pending_list()))]
+    while stack:
+        if cancel is not None and cancel.is_set():
+            raise ScanCancelled(path)
+        frame = stack[-1]
+        if frame.pending:
+            stack.append(list_directory(_DirFrame(frame.pending.pop(), frame.depth + 1, pending_list())))
+            continue
+        stack.pop()
+        if frame.depth <= max_depth:
+            yield frame.depth, frame.path, frame.bytes, frame.files
+        if stack:
+            stack[-1].bytes += frame.bytes
+            stack[-1].files += frame.files
+
+
+class ScanJob:
+    """Background scan of one path"""
+
+    def __init__(self, path, polite=False, options=None):
+        self.path = os.path.abspath(path)
+        self.options = options or {}
+        self.throttle = PoliteThrottle() if polite else None
+        self.state = 'pending'
+        self.tree = None
+        self.error = None
+        self.progress = ScanProgress()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    def start(self):
+        """Run the scan in a daemon thread"""
+        self.state = 'running'
+        self.started = time.time()
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def run(self):
+        """Scan and record the outcome"""
+        try:
+            self.tree = scan_tree(self.path, self.progress, self.cancel_event, throttle=self.throttle,
+                                  **self.options)
+            self.state = 'done'
+        except ScanCancelled:
+            self.state = 'cancelled'
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'error'
+        finally:
+            self.finished = time.time()
+            self.done_event.set()
+
+    def wait(self, timeout=None):
+        """Block until the scan ends or timeout passes; True if it ended"""
+        return self.done_event.wait(timeout)
+
+    def cancel(self):
+        """Ask a running scan to stop"""
+        self.cancel_event.set()
+
+    def status(self):
+        """Job state as a plain dict"""
+        status = {
+            'path': self.path,
+            'state': self.state,
+            'started': self.started,
+            'finished': self.finished,
+            'progress': self.progress.as_dict(),
+            'polite': self.throttle is not None,
+        }
+        if self.error:
+            status['error'] = self.error
+        if self.tree is not None:
+            status['size'] = self.tree.sizes[0]
+            status['nodes'] = len(self.tree)
+        return status
+
+
+class ScanCache:
+    """Scan jobs keyed by path; finished scans are reused until they expire"""
+
+    def __init__(self, max_age=600, max_entries=8, scan_options=None):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.scan_options = scan_options
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def is_fresh(self, job):
+        """Whether a job is running or finished recently enough to reuse"""
+        if job.state in ('pending', 'running'):
+            return True
+        return job.state == 'done' and time.time() - job.finished < self.max_age
+
+    def start(self, path, refresh=False, polite=False):
+        """Return a fresh job for path, starting a new scan if needed.
+
+        refresh replaces a finished scan but reuses one still pending or
+        running, which other callers may be waiting on. polite runs a new
+        scan with a PoliteThrottle; a fresh finished or running job is
+        reused either way.
+        """
+        path = os.path.abspath(path)
+        with self.lock:
+            job = self.jobs.get(path)
+            if job is not None and (job.state in ('pending', 'running') or not refresh and self.is_fresh(job)):
+                self.jobs.move_to_end(path)
+                return job
+            if job is not None:
+                job.cancel()
+
+            job = ScanJob(path, polite=polite, options=self.scan_options).start()
+            self.jobs[path] = job
+            self.jobs.move_to_end(path)
+            while len(self.jobs) > self.max_entries:
+                _, evicted = self.jobs.popitem(last=False)
+                evicted.cancel()
+            return job
+
+    def lookup(self, path):
+        """Best job covering path: an exact one, else a finished ancestor scan.
+
+        Returns (job, node) where node is None while the job is not done.
+        """
+        path = os.path.abspath(path)
+        with self.lock:
+            job = self.jobs.get(path)
+            if job is not None and job.state != 'done':
+                return job, None
+            candidates = list(self.jobs.values())
+
+        for job in sorted(candidates, key=lambda j: len(j.path), reverse=True):
+            if job.state == 'done' and self.is_fresh(job):
+                node = job.tree.find(path)
+                if node is not None:
+                    return job, node
+        return None, None
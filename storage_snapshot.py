@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Storage Snapshot - saved directory sizes and what changed between scans
+A snapshot is a gzip'd text file with one line per directory, in a fixed
+path order, so two snapshots can be compared with a single merge pass.
+"""
+
+import gzip
+import heapq
+import os
+import re
+import time
+
+SNAPSHOT_HEADER = '# storage-snapshot v1'
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), '.local', 'share', 'storage-analyzer', 'snapshots')
+
+_ESCAPES = {'\\': '\\\\', '\t': '\\t', '\n': '\\n'}
+_UNESCAPES = {value: key for key, value in _ESCAPES.items()}
+_ESCAPE_PATTERN = re.compile(r'[\\\t\n]')
+_UNESCAPE_PATTERN = re.compile(r'\\[\\tn]')
+
+
+def escape_path(path):
+    """Make a path safe for a tab separated line"""
+    return _ESCAPE_PATTERN.sub(lambda m: _ESCAPES[m.group()], path)
+
+
+def unescape_path(text):
+    """Inverse of escape_path"""
+    return _UNESCAPE_PATTERN.sub(lambda m: _UNESCAPES[m.group()], text)
+
+
+def path_key(relative):
+    """Sort key shared by writers and the merge: path components, so a subtree follows its root"""
+    return relative.split('/') if relative else []
+
+
+def tree_entries(tree):
+    """(relative path, bytes, files) for every directory of a ScanTree, in snapshot order"""
+    stack = [(0, '')]
+    while stack:
+        node, relative = stack.pop()
+        yield relative, tree.sizes[node], tree.file_counts[node]
+        children = sorted(tree.children(node), key=tree.name, reverse=True)
+        for child in children:
+            name = tree.name(child)
+            stack.append((child, f"{relative}/{name}" if relative else name))
+
+
+def write_snapshot(tree, path):
+    """Save a ScanTree's directory sizes to path"""
+    return write_snapshot_entries(tree.root_path, tree.scanned_at, tree_entries(tree), path)
+
+
+def write_snapshot_entries(root_path, scanned_at, entries, path):
+    """Save (relative path, bytes, files) entries, already in path_key order, as a snapshot"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8', errors='surrogateescape') as f:
+        f.write(f"{SNAPSHOT_HEADER}\t{escape_path(root_path)}\t{scanned_at:.0f}\n")
+        for relative, size, files in entries:
+            f.write(f"{escape_path(relative)}\t{size}\t{files}\n")
+    return path
+
+
+def snapshot_info(path):
+    """(root path, scanned_at) from a snapshot's header"""
+    with gzip.open(path, 'rt', encoding='utf-8', errors='surrogateescape') as f:
+        header = f.readline().rstrip('\n').split('\t')
+    if len(header) != 3 or header[0] != SNAPSHOT_HEADER:
+        raise ValueError(f"Not a storage snapshot: {path}")
+    return unescape_path(header[1]), float(header[2])
+
+
+def read_snapshot(path):
+    """Stream (relative path, bytes, files) from a snapshot without loading it"""
+    snapshot_info(path)
+    with gzip.open(path, 'rt', encoding='utf-8', errors='surrogateescape') as f:
+        f.readline()
+        for line in f:
+            relative, size, files = line.rstrip('\n').split('\t')
+            yield unescape_path(relative), int(size), int(files)
+
+
+def snapshot_name(root_path, when=None):
+    """Default file name for a snapshot of root_path"""
+    label = re.sub(r'[^A-Za-z0-9._-]+', '_', root_path.strip(os.sep)) or 'root'
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(when))
+    return f"{label}-{stamp}.snap.gz"
+
+
+def list_snapshots(root_path, directory=DEFAULT_SNAPSHOT_DIR):
+    """Snapshot files in directory taken of root_path, newest first"""
+    snapshots = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    for name in names:
+        if not name.endswith('.snap.gz'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            root, scanned_at = snapshot_info(path)
+        except (OSError, ValueError):
+            continue
+        if root == root_path:
+            snapshots.append((scanned_at, path))
+    return [path for _, path in sorted(snapshots, reverse=True)]
+
+
+class Change:
+    """One directory's size in two snapshots; before or after is None for new/vanished trees"""
+
+    __slots__ = ('path', 'before', 'after')
+
+    def __init__(self, path, before, after):
+        self.path = path
+        self.before = before
+        self.after = after
+
+    @property
+    def delta(self):
+        """Growth in bytes (negative when it shrank)"""
+        return (self.after or 0) - (self.before or 0)
+
+    @property
+    def ratio(self):
+        """Relative growth (0.5 = +50%), None for new trees"""
+        if not self.before:
+            return None
+        return self.delta / self.before
+
+    @property
+    def kind(self):
+        """'new', 'vanished', 'grown', 'shrunk' or 'same'"""
+        if self.before is None:
+            return 'new'
+        if self.after is None:
+            return 'vanished'
+        if self.delta > 0:
+            return 'grown'
+        return 'shrunk' if self.delta < 0 else 'same'
+
+
+class SnapshotDiff:
+    """Top-N rankings from one merge pass; memory is O(limit), not O(snapshot)"""
+
+    def __init__(self, limit=50, min_change=1024 * 1024):
+        self.limit = limit
+        self.min_change = min_change
+        self.total_before = 0
+        self.total_after = 0
+        self.compared = 0
+        self.new_trees = 0
+        self.vanished_trees = 0
+        self._grown = []
+        self._shrunk = []
+        self._relative = []
+        self._new = []
+        self._vanished = []
+        self._sequence = 0
+
+    def keep(self, heap, score, change):
+        """Push onto a bounded min-heap of the highest scores"""
+        self._sequence += 1
+        item = (score, self._sequence, change)
+        if len(heap) < self.limit:
+            heapq.heappush(heap, item)
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def add(self, change):
+        """Rank one change"""
+        self.compared += 1
+        kind = change.kind
+        if kind == 'new':
+            self.new_trees += 1
+            self.keep(self._new, change.after, change)
+        elif kind == 'vanished':
+            self.vanished_trees += 1
+            self.keep(self._vanished, change.before, change)
+        elif kind == 'grown':
+            self.keep(self._grown, change.delta, change)
+            if change.delta >= self.min_change:
+                self.keep(self._relative, change.ratio, change)
+        elif kind == 'shrunk':
+            self.keep(self._shrunk, -change.delta, change)
+
+    @staticmethod
+    def ranked(heap):
+        """Changes from a heap, highest score first"""
+        return [change for _, _, change in sorted(heap, reverse=True)]
+
+    @property
+    def grown(self):
+        return self.ranked(self._grown)
+
+    @property
+    def shrunk(self):
+        return self.ranked(self._shrunk)
+
+    @property
+    def relative(self):
+        return self.ranked(self._relative)
+
+    @property
+    def new(self):
+        return self.ranked(self._new)
+
+    @property
+    def vanished(self):
+        return self.ranked(self._vanished)
+
+
+def _under(key, root_key):
+    """Whether key is root_key or inside it"""
+    return root_key is not None and key[:len(root_key)] == root_key
+
+
+def diff_entries(before, after, limit=50, min_change=1024 * 1024):
+    """Merge-join two snapshot-ordered entry streams into a SnapshotDiff.
+
+    Linear in the total number of entries. A new or vanished directory is
+    reported once, at the top of its subtree.
+    """
+    diff = SnapshotDiff(limit, min_change)
+    old = iter(before)
+    new = iter(after)
+    old_entry = next(old, None)
+    new_entry = next(new, None)
+    new_root = vanished_root = None
+
+    while old_entry is not None or new_entry is not None:
+        old_key = path_key(old_entry[0]) if old_entry is not None else None
+        new_key = path_key(new_entry[0]) if new_entry is not None else None
+
+        if new_key is None or (old_key is not None and old_key < new_key):
+            # Only in the old snapshot
+            if not _under(old_key, vanished_root):
+                vanished_root = old_key
+                diff.add(Change(old_entry[0], old_entry[1], None))
+            old_entry = next(old, None)
+        elif old_key is None or new_key < old_key:
+            # Only in the new snapshot
+            if not _under(new_key, new_root):
+                new_root = new_key
+                diff.add(Change(new_entry[0], None, new_entry[1]))
+            new_entry = next(new, None)
+        else:
+            if not old_key:
+                diff.total_before = old_entry[1]
+                diff.total_after = new_entry[1]
+            diff.add(Change(new_entry[0], old_entry[1], new_entry[1]))
+            old_entry = next(old, None)
+            new_entry = next(new, None)
+    return diff
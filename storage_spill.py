@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Storage Spill - bounded-memory building blocks for very large scans
+A MemoryBudget is shared by the lists a scan grows. Past the budget, the
+walk's pending-directory lists move to temporary files and sorted output
+is produced by an external merge sort, so reports over any number of
+directories run in a roughly fixed amount of memory.
+"""
+
+import heapq
+import os
+import tempfile
+import weakref
+
+from storage_snapshot import escape_path, unescape_path
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 ** 2
+
+# Rough resident cost of one path string in a list, on top of its characters
+ENTRY_OVERHEAD = 80
+
+# Entries read back from a spilled list at a time
+REFILL_ENTRIES = 4096
+
+# Runs merged at once; more runs are merged in passes
+MAX_FAN_IN = 64
+
+
+class MemoryBudget:
+    """Approximate bytes held by the lists sharing this budget"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.spills = 0
+        self.spilled_bytes = 0
+        self.holders = weakref.WeakSet()
+
+    @property
+    def exceeded(self):
+        """Whether the lists should spill"""
+        return self.used > self.limit
+
+    def register(self, holder):
+        """Share the budget with a list that can spill()"""
+        self.holders.add(holder)
+
+    def relieve(self, keep=None):
+        """Spill the largest in-memory buffers, however short, until the budget holds again.
+
+        keep is left alone, for a list that has just read entries back.
+        """
+        if not self.exceeded:
+            return
+        for holder in sorted(self.holders, key=lambda holder: holder.held, reverse=True):
+            if not self.exceeded or not holder.held:
+                break
+            if holder is not keep:
+                holder.spill()
+
+    def as_dict(self):
+        """Counters for reports"""
+        return {'limit': self.limit, 'used': self.used, 'spills': self.spills, 'spilled_bytes': self.spilled_bytes}
+
+
+def _entry_cost(path):
+    """Approximate bytes a path costs while held in a list"""
+    return len(path) + ENTRY_OVERHEAD
+
+
+class SpillList:
+    """Stack of paths that moves to a temporary file while its budget is exceeded.
+
+    Paths are appended while a directory is listed and popped afterwards,
+    in any order; a spilled list is read back a chunk at a time.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.items = []
+        self.file = None
+        self.read_at = 0
+        self.spilled = 0
+        self.held = 0
+        budget.register(self)
+
+    def append(self, path):
+        """Add a path, spilling the largest lists if the budget is exceeded"""
+        self.items.append(path)
+        cost = _entry_cost(path)
+        self.held += cost
+        self.budget.used += cost
+        if self.budget.exceeded:
+            self.budget.relieve()
+
+    def spill(self):
+        """Write the in-memory paths to the list's file and release them"""
+        if self.file is None:
+            self.file = tempfile.TemporaryFile('w+', encoding='utf-8', errors='surrogateescape')
+        text = ''.join(f"{escape_path(path)}\n" for path in self.items)
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(text)
+        self.spilled += len(self.items)
+        self.budget.spills += 1
+        self.budget.spilled_bytes += len(text)
+        self.budget.used -= self.held
+        self.items = []
+        self.held = 0
+
+    def refill(self):
+        """Read the next chunk of spilled paths back into memory"""
+        self.file.seek(self.read_at)
+        for _ in range(min(REFILL_ENTRIES, self.spilled)):
+            path = unescape_path(self.file.readline()[:-1])
+            self.items.append(path)
+            cost = _entry_cost(path)
+            self.held += cost
+            self.budget.used += cost
+            self.spilled -= 1
+        self.read_at = self.file.tell()
+        if not self.spilled:
+            self.file.close()
+            self.file = None
+            self.read_at = 0
+        self.budget.relieve(keep=self)
+
+    def pop(self):
+        """Remove and return a path, reading spilled ones back as needed"""
+        if not self.items and self.spilled:
+            self.refill()
+        path = self.items.pop()
+        cost = _entry_cost(path)
+        self.held -= cost
+        self.budget.used -= cost
+        return path
+
+    def __len__(self):
+        return len(self.items) + self.spilled
+
+    def __bool__(self):
+        return bool(self.items) or self.spilled > 0
+
+    def close(self):
+        """Release memory and the temporary file of an abandoned list"""
+        self.budget.used -= self.held
+        self.items = []
+        self.held = 0
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.spilled = 0
+
+
+class ExternalSorter:
+    """Sort (path, int, ...) records of any count in bounded memory.
+
+    Records are buffered up to the budget, then sorted and written to a
+    temporary run; iterating merges the runs (in passes of MAX_FAN_IN) with
+    the last in-memory buffer. key receives the path.
+    """
+
+    def __init__(self, key, budget, directory=None):
+        self.key = key
+        self.budget = budget
+        self.buffer = []
+        self.held = 0
+        self.runs = []
+        self.run_serial = 0
+        self.tempdir = tempfile.TemporaryDirectory(prefix='storage-sort-', dir=directory)
+        self.count = 0
+        budget.register(self)
+
+    def add(self, record):
+        """Buffer a record, spilling the largest buffers if the budget is exceeded"""
+        self.buffer.append(record)
+        cost = _entry_cost(record[0]) + 16 * len(record)
+        self.held += cost
+        self.budget.used += cost
+        self.count += 1
+        if self.budget.exceeded:
+            self.budget.relieve()
+
+    def spill(self):
+        """Write the buffer out as a sorted run"""
+        self.write_run(self._sorted_buffer())
+
+    def _sorted_buffer(self):
+        """The buffered records in key order; empties the buffer"""
+        key = self.key
+        records = sorted(self.buffer, key=lambda record: key(record[0]))
+        self.buffer = []
+        self.budget.used -= self.held
+        self.held = 0
+        return records
+
+    def write_run(self, records):
+        """Write sorted records to a new run file"""
+        path = os.path.join(self.tempdir.name, f"run-{self.run_serial:06d}")
+        self.run_serial += 1
+        with open(path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+            for record in records:
+                line = '\t'.join((escape_path(record[0]), *map(str, record[1:]))) + '\n'
+                f.write(line)
+                self.budget.spilled_bytes += len(line)
+        self.budget.spills += 1
+        self.runs.append(path)
+        return path
+
+    @staticmethod
+    def read_run(path):
+        """Stream the records of one run"""
+        with open(path, encoding='utf-8', errors='surrogateescape') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                yield (unescape_path(fields[0]), *map(int, fields[1:]))
+
+    def merge(self, sources):
+        """Merge sorted record streams"""
+        key = self.key
+        return heapq.merge(*sources, key=lambda record: key(record[0]))
+
+    def __iter__(self):
+        """Records in key order; the temporary runs are removed when done"""
+        try:
+            # Merge in passes so no more than MAX_FAN_IN runs are open at once
+            while len(self.runs) >= MAX_FAN_IN:
+                runs, self.runs = self.runs, []
+                for start in range(0, len(runs), MAX_FAN_IN):
+                    group = runs[start:start + MAX_FAN_IN]
+                    self.write_run(self.merge([self.read_run(run) for run in group]))
+                    for run in group:
+                        os.remove(run)
+            yield from self.merge([self.read_run(run) for run in self.runs] + [self._sorted_buffer()])
+        finally:
+            self.close()
+
+    def close(self):
+        """Remove the runs and release the buffer"""
+        self.budget.used -= self.held
+        self.buffer = []
+        self.held = 0
+        self.runs = []
+        self.tempdir.cleanup()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Storage Treemap - squarified treemap layout over a scanned tree
+A directory is laid out from its largest child down and stops at the
+first child too small to see; that child, everything smaller and the
+directory's own files share one block. A layout therefore costs as much
+as the space it fills, however many entries the directory holds.
+"""
+
+from collections import OrderedDict, namedtuple
+
+# Node id of the block holding a directory's own files and its culled children
+REST = -1
+
+# Smallest tile worth drawing, in square pixels
+MIN_TILE_AREA = 64
+
+# Position relative to the laid-out rectangle's corner, and the bytes it stands for
+Tile = namedtuple('Tile', 'node x y width height size')
+
+
+def _worst(largest, smallest, row_area, side):
+    """Worst aspect ratio in a row of tiles with this total area along side"""
+    length = row_area / side
+    return max(largest / (length * length), (length * length) / smallest)
+
+
+def _place(row, row_area, x, y, width, height, tiles):
+    """Lay a finished row along the shorter side; returns the rectangle left over"""
+    if width >= height:
+        column = row_area / height
+        offset = y
+        for node, area, size in row:
+            tiles.append(Tile(node, x, offset, column, area / column, size))
+            offset += area / column
+        return x + column, y, width - column, height
+    band = row_area / width
+    offset = x
+    for node, area, size in row:
+        tiles.append(Tile(node, offset, y, area / band, band, size))
+        offset += area / band
+    return x, y + band, width, height - band
+
+
+def squarify(items, width, height, scale):
+    """Tiles for (node, size) pairs, largest first, filling width x height; scale is pixels per byte"""
+    tiles = []
+    row = []
+    row_area = row_max = row_min = 0.0
+    x = y = 0.0
+    for node, size in items:
+        area = size * scale
+        if area <= 0:
+            continue
+        if row:
+            # Keep growing the row while that makes its tiles squarer
+            side = min(width, height)
+            if _worst(max(row_max, area), min(row_min, area), row_area + area, side) > \
+                    _worst(row_max, row_min, row_area, side):
+                x, y, width, height = _place(row, row_area, x, y, width, height, tiles)
+                row = []
+        if not row:
+            row_area = 0.0
+            row_max = row_min = area
+        row.append((node, area, size))
+        row_area += area
+        row_max = max(row_max, area)
+        row_min = min(row_min, area)
+    if row:
+        _place(row, row_area, x, y, width, height, tiles)
+    return tiles
+
+
+class TreemapLayout:
+    """Per-directory treemap layouts for one scan, cached by node and size"""
+
+    def __init__(self, tree, min_area=MIN_TILE_AREA, max_cached=4096):
+        self.tree = tree
+        self.min_area = min_area
+        self.max_cached = max_cached
+        self.cache = OrderedDict()
+
+    def layout(self, node, width, height):
+        """Tiles for node's children over an integer width x height rectangle"""
+        key = (node, width, height)
+        tiles = self.cache.get(key)
+        if tiles is None:
+            tiles = self.compute(node, width, height)
+            self.cache[key] = tiles
+            if len(self.cache) > self.max_cached:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return tiles
+
+    def compute(self, node, width, height):
+        """Squarified layout of node's children down to the smallest visible tile"""
+        sizes = self.tree.sizes
+        total = sizes[node]
+        if total <= 0 or width <= 0 or height <= 0:
+            return []
+        scale = width * height / total
+        min_size = self.min_area / scale
+
+        items = []
+        shown = 0
+        for child in self.tree.sorted_children(node):
+            size = sizes[child]
+            if size < min_size:
+                break
+            items.append((child, size))
+            shown += size
+        if total > shown:
+            items.append((REST, total - shown))
+        return squarify(items, width, height, scale)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Storage UI - one channel from worker threads to the Tk front ends
+Worker threads post updates instead of touching widgets; the main loop
+applies everything posted since the last drain in one batch every 50 ms,
+so Tk lays out and redraws once per batch. Updates posted under the same
+key replace each other, so a fast scan cannot flood the event queue.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+DRAIN_INTERVAL_MS = 50
+
+
+class UIUpdateQueue:
+    """Updates posted from any thread and applied by the Tk main loop in batches"""
+
+    def __init__(self, root, interval=DRAIN_INTERVAL_MS):
+        self.root = root
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()
+        self.serial = 0
+        self.root.after(interval, self.drain)
+
+    def post(self, callback, *args, key=None):
+        """Run callback(*args) on the main loop at the next drain.
+
+        An update with a key replaces any not yet applied update with the
+        same key and moves to the end of the batch; keyless updates all run,
+        in the order posted.
+        """
+        with self.lock:
+            if key is None:
+                self.serial += 1
+                key = ('update', self.serial)
+            else:
+                self.pending.pop(key, None)
+            self.pending[key] = (callback, args)
+
+    def drain(self):
+        """Apply the batch posted since the last drain (main loop only)"""
+        with self.lock:
+            batch, self.pending = self.pending, OrderedDict()
+        # Scheduled first, so a modal dialog opened by an update doesn't stall later ones
+        self.root.after(self.interval, self.drain)
+        for callback, args in batch.values():
+            try:
+                callback(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
@@ -3,6 +3,36 @@ import os
 import sys
 import pwd
 import subprocess
+import argparse
+import csv
+import heapq
+import json
+import time
+from contextlib import nullcontext
+
+from storage_scanner import (scan_tree, iter_directory_sizes, AGE_LABELS, PathFilter, PoliteThrottle,
+                             ScanProgress, Statx, SubtreeView)
+from storage_dedupe import DuplicateFinder
+from storage_estimate import DEFAULT_ESTIMATE_SECONDS, DEFAULT_EXACT_DEPTH, SampledScan
+from storage_snapshot import (DEFAULT_SNAPSHOT_DIR, diff_entries, path_key, snapshot_name, tree_entries,
+                              write_snapshot_entries)
+from storage_parallel import parallel_directory_sizes
+from storage_spill import DEFAULT_MEMORY_BUDGET, ExternalSorter, MemoryBudget, SpillList
+from storage_daemon import DAEMON_SCAN_OPTIONS, DEFAULT_SOCKET, DaemonClient, DaemonError
+from storage_image import ImageError, image_name, open_image, saved_entries, write_image
+from storage_profile import ScanProfile, profile_calls
+from storage_history import (DEFAULT_HISTORY_DB, DEFAULT_HISTORY_DEPTH, HistoryScheduler, HistoryStore,
+                             parse_interval)
+
+# Files kept in the largest-files index during each scan
+LARGEST_FILES_DEFAULT = 20
+
+# Batch mode exit codes (2 is left to argparse usage errors)
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_THRESHOLD = 3
+
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
 
 def is_root():
     """Check if running as root user"""
@@ -26,39 +56,6 @@ def bytes_to_unit(b, unit):
     else:
         return b
 
-def get_directory_size(path):
-    """Recursively calculate directory size"""
-    total = 0
-    try:
-        for entry in os.scandir(path):
-            try:
-                if entry.is_file(follow_symlinks=False):
-                    total += entry.stat().st_size
-                elif entry.is_dir(follow_symlinks=False):
-                    total += get_directory_size(entry.path)
-            except (PermissionError, OSError):
-                # Skip directories/files we can't access
-                continue
-    except (PermissionError, OSError):
-        pass
-    return total
-
-def list_subdirectories(path):
-    """List subdirectories and their sizes"""
-    dirs = []
-    try:
-        for entry in os.scandir(path):
-            if entry.is_dir(follow_symlinks=False):
-                try:
-                    size = get_directory_size(entry.path)
-                    dirs.append((entry.name, entry.path, size))
-                except (PermissionError, OSError):
-                    # Add with size 0 if we can't calculate
-                    dirs.append((entry.name, entry.path, 0))
-    except (PermissionError, OSError) as e:
-        print(f"Error scanning {path}: {e}")
-    return dirs
-
 def get_filesystem_info(path):
     """Get filesystem information for the given path"""
     try:
@@ -70,10 +67,426 @@ def get_filesystem_info(path):
     except Exception:
         return None, None, None
 
-def interactive_scan(initial_path, unit):
-    """Interactive directory scanning with navigation"""
+def print_largest_files(tree, unit, top=None, limit=None):
+    """Print the largest files from a scan, overall or under one subdirectory"""
+    files = tree.largest.results(tree, top) if tree.largest else []
+    if limit:
+        files = files[:limit]
+    if not files:
+        print("No files found.")
+        return
+    
+    root = tree.path(top) if top else tree.root_path
+    print(f"\nLargest files in {root}:")
+    for idx, (size, path) in enumerate(files, start=1):
+        print(f"{idx:2d}. {bytes_to_unit(size, unit):>8.2f} {unit}  {os.path.relpath(path, root)}")
+
+def print_skipped_mounts(tree):
+    """One line naming the mounts the scan did not enter"""
+    if tree.skipped_mounts:
+        names = ", ".join(f"{mount.mount_point} ({mount.fstype})" for mount in tree.skipped_mounts[:6])
+        more = f" and {len(tree.skipped_mounts) - 6} more" if len(tree.skipped_mounts) > 6 else ""
+        print(f"Skipped mounts: {names}{more}")
+
+def mounts_report(path, unit, scan_options):
+    """Non-interactive per-filesystem subtotals for --mounts"""
+    print(f"Scanning {path}...")
+    tree = scan_tree(path, **scan_options)
+    print(f"\nSpace by filesystem under {path}:")
+    for mount, size in tree.mount_totals():
+        print(f"  {bytes_to_unit(size, unit):>10.2f} {unit}  {mount.mount_point} ({mount.fstype}, {mount.source})")
+    print_skipped_mounts(tree)
+
+def largest_files_report(path, unit, limit, scan_options):
+    """Non-interactive largest-files report for --largest"""
+    print(f"Scanning {path}...")
+    tree = scan_tree(path, top_files=limit, **scan_options)
+    print_largest_files(tree, unit, limit=limit)
+    
+    # Per top-level directory, largest directories first
+    for node in tree.sorted_children(0):
+        if tree.largest.by_top.get(node):
+            print_largest_files(tree, unit, top=node, limit=min(limit, 5))
+
+def duplicates_report(path, unit, min_size, workers, scan_options):
+    """Non-interactive duplicate file report for --duplicates"""
+    print(f"Scanning {path} for duplicate files...")
+    finder = DuplicateFinder(path, min_size=min_size, workers=workers, scan_options=scan_options)
+    for group in finder.run():
+        print(f"\n{bytes_to_unit(group.wasted, unit):.2f} {unit} wasted "
+              f"({len(group.paths)} copies of {bytes_to_unit(group.size, unit):.2f} {unit}):")
+        for file_path in group.paths:
+            print(f"    {file_path}")
+    print()
+    print(finder.stats.summary(unit))
+
+def age_report(path, unit, kind, cold_days, scan_options, limit=20):
+    """Non-interactive data-age report for --ages"""
+    print(f"Scanning {path}...")
+    tree = scan_tree(path, ages=True, **scan_options)
+    label = "modified" if kind == 'mtime' else "accessed"
+    
+    print(f"\nBytes by last {label} time in {path}:")
+    total = tree.sizes[0]
+    for bucket, size in tree.age_histogram(0, kind):
+        share = size / total * 100 if total else 0
+        print(f"  {bucket:>12}: {bytes_to_unit(size, unit):>10.2f} {unit} ({share:5.1f}%)")
+    
+    # Subdirectories holding the most cold data
+    children = sorted(tree.children(0), key=lambda node: tree.cold_bytes(node, cold_days, kind), reverse=True)
+    children = [node for node in children if tree.cold_bytes(node, cold_days, kind)][:limit]
+    if not children:
+        print(f"\nNo data older than {cold_days} days.")
+        return
+    
+    print(f"\nNot {label} for {cold_days}+ days, by subdirectory:")
+    header = "".join(f"{bucket:>14}" for bucket in AGE_LABELS)
+    print(f"{'Directory':<30}{'Cold':>14}{header}")
+    for node in children:
+        row = "".join(f"{bytes_to_unit(size, unit):>11.2f} {unit}" for _, size in tree.age_histogram(node, kind))
+        cold = bytes_to_unit(tree.cold_bytes(node, cold_days, kind), unit)
+        print(f"{tree.name(node)[:29]:<30}{cold:>11.2f} {unit}{row}")
+
+def benchmark_report(path, scan_options):
+    """Non-interactive walker benchmark for --benchmark"""
+    modes = [
+        ("stat files and directories", {'permissions': True, 'use_statx': False}),
+        ("stat files only (default)", {'use_statx': False}),
+    ]
+    if Statx.create() is not None:
+        modes.append(("statx size/blocks mask", {'use_statx': True}))
+    else:
+        print("statx is not available here; skipping that mode")
+    
+    # Warm the dentry and inode caches so every mode sees the same state
+    print(f"Warming caches on {path}...")
+    scan_tree(path, **scan_options)
+    
+    print(f"\n{'Mode':<30}{'Entries':>10}{'Seconds':>10}{'Entries/s':>12}{'Stats/entry':>13}{'Opens/entry':>13}")
+    for label, options in modes:
+        progress = ScanProgress()
+        started = time.perf_counter()
+        scan_tree(path, progress=progress, **dict(scan_options, **options))
+        elapsed = time.perf_counter() - started
+        entries = max(progress.entries, 1)
+        print(f"{label:<30}{progress.entries:>10}{elapsed:>10.2f}{progress.entries / elapsed:>12.0f}"
+              f"{progress.stat_calls / entries:>13.3f}{progress.dirs / entries:>13.3f}")
+    print("\nEach directory also costs an open, one or more getdents and a close; entry types come "
+          "from getdents, so Stats/entry + Opens/entry approximates syscalls per entry.")
+
+def parse_size(text):
+    """Bytes from a size such as 500M, 10G or 1.5T (binary units; a bare number is bytes)"""
+    text = text.strip().upper().rstrip('B')
+    multiplier = SIZE_SUFFIXES.get(text[-1:], 1)
+    if text[-1:] in SIZE_SUFFIXES:
+        text = text[:-1]
+    try:
+        return int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+def positive_int(text):
+    """An integer of at least 1, for counts such as --processes"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid count: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return value
+
+class BatchWriter:
+    """Streams directory records to stdout as json, csv or ndjson"""
+    
+    FIELDS = ('path', 'depth', 'bytes', 'files', 'breach')
+    
+    def __init__(self, fmt, out=sys.stdout):
+        self.format = fmt
+        self.out = out
+        self.count = 0
+        if fmt == 'csv':
+            self.csv = csv.writer(out)
+            self.csv.writerow(self.FIELDS)
+        elif fmt == 'json':
+            out.write('[')
+    
+    def write(self, record):
+        """Emit one record and flush, so consumers see it immediately"""
+        if self.format == 'csv':
+            self.csv.writerow([json.dumps(record[field]) if isinstance(record[field], bool) else record[field]
+                               for field in self.FIELDS])
+        elif self.format == 'json':
+            self.out.write((',\n ' if self.count else '\n ') + json.dumps(record))
+        else:
+            self.out.write(json.dumps(record) + '\n')
+        self.count += 1
+        self.out.flush()
+    
+    def close(self):
+        """Finish the document"""
+        if self.format == 'json':
+            self.out.write('\n]\n' if self.count else ']\n')
+        self.out.flush()
+
+def bounded_options(scan_options, memory_budget):
+    """iter_directory_sizes keyword arguments, with spilling pending lists under a memory budget"""
+    options = dict(scan_options)
+    options.pop('use_statx', None)
+    if memory_budget is not None:
+        options['pending_list'] = lambda: SpillList(memory_budget)
+    return options
+
+def report_spills(budget):
+    """Tell the user when the memory budget made the scan use temporary files"""
+    if budget is not None and budget.spills:
+        print(f"Kept within the {budget.limit / 1024 ** 2:.3g} MB memory budget by spilling "
+              f"{budget.spilled_bytes / 1024 ** 2:.1f} MB to temporary files ({budget.spills} times)",
+              file=sys.stderr)
+
+def batch_report(path, fmt, depth, top, fail_above, scan_options, sort='walk', memory_limit=None,
+                 processes=None, per_device=None):
+    """Non-interactive machine-readable report; returns the process exit code"""
+    budget = MemoryBudget(memory_limit) if memory_limit is not None else None
+    options = bounded_options(scan_options, budget)
+    progress = ScanProgress()
+    writer = BatchWriter(fmt)
+    breached = False
+    
+    def record(level, dir_path, size, files):
+        return {
+            'path': dir_path,
+            'depth': level,
+            'bytes': size,
+            'files': files,
+            'breach': fail_above is not None and size > fail_above,
+        }
+    
+    try:
+        if processes:
+            sizes = parallel_directory_sizes(path, depth, processes, per_device, progress=progress,
+                                             skip_virtual=options['skip_virtual'],
+                                             one_file_system=options['one_file_system'],
+                                             path_filter=options['path_filter'], profile=options['profile'])
+        else:
+            sizes = iter_directory_sizes(path, depth, progress=progress, **options)
+        if top:
+            # Only the N largest are kept, so memory stays bounded however many directories there are
+            largest = heapq.nlargest(top, sizes, key=lambda item: item[2])
+            if sort == 'path':
+                largest.sort(key=lambda item: item[1].split(os.sep))
+            for level, dir_path, size, files in largest:
+                entry = record(level, dir_path, size, files)
+                breached = breached or entry['breach']
+                writer.write(entry)
+        else:
+            if sort == 'path':
+                # Parents come after their children in the walk; an external merge sort
+                # puts every directory before its subtree within the memory budget
+                sorter = ExternalSorter(lambda dir_path: dir_path.split(os.sep),
+                                        budget or MemoryBudget(DEFAULT_MEMORY_BUDGET))
+                for level, dir_path, size, files in sizes:
+                    sorter.add((dir_path, level, size, files))
+                sizes = ((level, dir_path, size, files) for dir_path, level, size, files in sorter)
+            for level, dir_path, size, files in sizes:
+                entry = record(level, dir_path, size, files)
+                breached = breached or entry['breach']
+                writer.write(entry)
+    except KeyboardInterrupt:
+        writer.close()
+        return EXIT_ERROR
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); don't fail again flushing at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    writer.close()
+    report_spills(budget)
+    
+    if progress.errors:
+        print(f"{progress.errors} entries could not be read", file=sys.stderr)
+    if breached:
+        print(f"Directories larger than {fail_above} bytes found", file=sys.stderr)
+        return EXIT_THRESHOLD
+    return EXIT_OK
+
+def save_snapshot_report(path, target, scan_options, memory_limit=None):
+    """Scan path and save a snapshot for --save-snapshot; returns the file written.
+
+    With a memory limit the snapshot is written from the streaming walk
+    through an external sort instead of from an in-memory tree.
+    """
+    print(f"Scanning {path}...")
+    if memory_limit is None:
+        tree = scan_tree(path, **scan_options)
+        root_path, scanned_at, count = tree.root_path, tree.scanned_at, len(tree)
+        entries = tree_entries(tree)
+    else:
+        budget = MemoryBudget(memory_limit)
+        root_path, scanned_at = os.path.abspath(path), time.time()
+        sorter = ExternalSorter(path_key, budget)
+        for _, dir_path, size, files in iter_directory_sizes(path, sys.maxsize,
+                                                              **bounded_options(scan_options, budget)):
+            relative = os.path.relpath(dir_path, root_path)
+            sorter.add(('' if relative == os.curdir else relative, size, files))
+        count = sorter.count
+        entries = iter(sorter)
+    if not target:
+        target = os.path.join(DEFAULT_SNAPSHOT_DIR, snapshot_name(root_path, scanned_at))
+    write_snapshot_entries(root_path, scanned_at, entries, target)
+    print(f"Saved snapshot of {root_path} ({count} directories) to {target}")
+    if memory_limit is not None:
+        report_spills(budget)
+    return target
+
+def format_estimate(estimate, unit):
+    """Size with its 95% interval, e.g. "12.40 GB ± 0.31 (2.5%)\""""
+    size = f"{bytes_to_unit(estimate.bytes, unit):>10.2f} {unit}"
+    if not estimate.sampled:
+        return f"{size}  exact"
+    margin = estimate.margin
+    if margin == float('inf'):
+        return f"{size}  ± ?"
+    return f"{size}  ± {bytes_to_unit(margin, unit):.2f} ({estimate.relative_margin * 100:.1f}%)"
+
+def estimate_report(path, unit, seconds, target, exact_depth, refine, limit, scan_options):
+    """Sampled size estimates per top-level directory for --estimate, optionally refined to exact sizes"""
+    options = dict(scan_options)
+    options.pop('use_statx', None)
+    sampler = SampledScan(path, exact_depth, **options)
+    
+    def on_round(sampler):
+        elapsed = time.monotonic() - sampler.started
+        print(f"  {elapsed:4.0f}s  {sampler.progress.dirs} directories listed, total ~"
+              f"{bytes_to_unit(sampler.total_bytes, unit):.2f} {unit}", file=sys.stderr)
+    
+    print(f"Estimating {path} for up to {seconds:g}s (exact to depth {exact_depth}, then sampled)...")
+    try:
+        ranked = sampler.run(seconds, target, on_round=on_round)
+    except KeyboardInterrupt:
+        ranked = sampler.ranked()
+    elapsed = time.monotonic() - sampler.started
+    
+    print(f"\nEstimated {bytes_to_unit(sampler.total_bytes, unit):.2f} {unit} "
+          f"± {bytes_to_unit(sampler.total_margin, unit):.2f} under {path} "
+          f"after {elapsed:.1f}s and {sampler.progress.dirs} directory listings (95% intervals):")
+    for estimate in ranked[:limit]:
+        print(f"  {format_estimate(estimate, unit)}  {estimate.path}  ({estimate.probes} probes)")
+    if len(ranked) > limit:
+        print(f"  ... {len(ranked) - limit} more")
+    if not refine:
+        return
+    
+    # Keep the sampled figures to show how close they were
+    before = {estimate.path: (estimate.bytes, estimate.margin) for estimate in ranked}
+    print("\nRefining to exact sizes (Ctrl+C to stop):")
+    try:
+        for estimate in sampler.refine():
+            guess, margin = before[estimate.path]
+            inside = "inside" if abs(estimate.bytes - guess) <= margin else "outside"
+            print(f"  {bytes_to_unit(estimate.bytes, unit):>10.2f} {unit}  {estimate.path}  "
+                  f"(estimated {bytes_to_unit(guess, unit):.2f}, {inside} the interval)")
+    except KeyboardInterrupt:
+        return
+    print(f"\nExact total: {bytes_to_unit(sampler.total_bytes, unit):.2f} {unit}")
+
+def save_image_report(path, target, scan_options):
+    """Scan path and save a scan image for --save-image; returns the file written"""
+    print(f"Scanning {path}...")
+    # The same columns the daemon keeps, so an opened image answers everything a live scan does
+    tree = scan_tree(path, **DAEMON_SCAN_OPTIONS, **scan_options)
+    if not target:
+        target = os.path.join(DEFAULT_SNAPSHOT_DIR, image_name(tree.root_path, tree.scanned_at))
+    write_image(tree, target)
+    print(f"Saved scan image of {tree.root_path} ({len(tree)} directories, "
+          f"{os.path.getsize(target) / 1024 ** 2:.1f} MB) to {target}")
+    return target
+
+def print_changes(title, changes, root, unit, show_ratio=False):
+    """One ranked section of a snapshot diff"""
+    if not changes:
+        return
+    print(f"\n{title}:")
+    for change in changes:
+        before = bytes_to_unit(change.before or 0, unit)
+        after = bytes_to_unit(change.after or 0, unit)
+        delta = bytes_to_unit(change.delta, unit)
+        ratio = f"  {change.ratio * 100:+.0f}%" if show_ratio and change.ratio is not None else ""
+        location = os.path.join(root, change.path) if change.path else root
+        print(f"  {delta:>+10.2f} {unit}  ({before:.2f} -> {after:.2f}){ratio}  {location}")
+
+def diff_report(snapshots, path, unit, limit, scan_options):
+    """Non-interactive snapshot comparison for --diff"""
+    try:
+        old_root, old_time, before = saved_entries(snapshots[0])
+        if len(snapshots) > 1:
+            new_root, new_time, after = saved_entries(snapshots[1])
+    except (OSError, EOFError, ValueError) as e:
+        print(f"Cannot read snapshot: {e}", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if len(snapshots) == 1:
+        # Compare against the disk as it is now
+        new_root = path or old_root
+        print(f"Scanning {new_root}...")
+        tree = scan_tree(new_root, **scan_options)
+        new_time = tree.scanned_at
+        after = tree_entries(tree)
+    
+    diff = diff_entries(before, after, limit=limit)
+    print(f"\nChanges in {new_root} from {time.ctime(old_time)} to {time.ctime(new_time)}")
+    print(f"Total: {bytes_to_unit(diff.total_before, unit):.2f} {unit} -> "
+          f"{bytes_to_unit(diff.total_after, unit):.2f} {unit} "
+          f"({bytes_to_unit(diff.total_after - diff.total_before, unit):+.2f} {unit})")
+    print_changes("Grew the most", diff.grown, new_root, unit)
+    print_changes("Grew the most relative to their size", diff.relative, new_root, unit, show_ratio=True)
+    print_changes(f"New directories ({diff.new_trees})", diff.new, new_root, unit)
+    print_changes(f"Vanished directories ({diff.vanished_trees})", diff.vanished, new_root, unit)
+    print_changes("Shrank the most", diff.shrunk, new_root, unit)
+
+def record_history_report(path, db_path, depth, every, scan_options):
+    """Record PATH's directory sizes for --record-history, once or every interval"""
+    options = dict(scan_options)
+    options.pop('use_statx', None)
+    store = HistoryStore(db_path)
+    if not every:
+        result = store.record(path, depth, **options)
+        print(f"Recorded {result['dirs']} directories of {path} ({result['changed']} changed) to {db_path}")
+        return
+    
+    scheduler = HistoryScheduler(store, [path], parse_interval(every), depth, options)
+    print(f"Recording {path} every {every} to {db_path} (Ctrl+C to stop)")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+def history_report(path, db_path, unit, limit):
+    """Print PATH's recorded sizes over time for --history"""
+    store = HistoryStore(db_path)
+    points = store.series(path)
+    if not points:
+        print(f"No history for {path} in {db_path}; record it with --record-history")
+        return
+    
+    print(f"\nSize of {path} over {len(points)} recorded runs:")
+    previous = None
+    for taken_at, size in points[-limit:] if limit else points:
+        stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(taken_at))
+        if size is None:
+            print(f"  {stamp}  (missing)")
+        else:
+            change = f"  {bytes_to_unit(size - previous, unit):+.2f}" if previous is not None else ""
+            print(f"  {stamp}  {bytes_to_unit(size, unit):>10.2f} {unit}{change}")
+        previous = size
+
+def interactive_scan(initial_path, unit, largest_count=LARGEST_FILES_DEFAULT, scan_options=None, daemon=None,
+                     image=None):
+    """Interactive directory scanning with navigation.
+
+    Directories inside an opened scan image are read from it; others come
+    from the shared daemon when given, or a local scan.
+    """
     current_path = initial_path
     history = []
+    scan_options = scan_options or {}
     
     while True:
         print(f"\nCurrent directory: {current_path}")
@@ -85,8 +498,24 @@ def interactive_scan(initial_path, unit):
                   f"{bytes_to_unit(used, unit):.2f} {unit} used, "
                   f"{bytes_to_unit(free, unit):.2f} {unit} free")
         
-        print("Calculating sizes for subdirectories... (this may take a while)")
-        subdirs = list_subdirectories(current_path)
+        tree = None
+        node = image.find(current_path) if image is not None else None
+        if node is not None:
+            print(f"From scan image {image.image_path} ({time.ctime(image.scanned_at)})")
+            tree = image if node == 0 else SubtreeView(image, node)
+        else:
+            print("Calculating sizes for subdirectories... (this may take a while)")
+        if tree is None and daemon is not None:
+            try:
+                tree = daemon.open_tree(current_path, polite=scan_options.get('throttle') is not None)
+            except (OSError, DaemonError) as e:
+                print(f"Scan daemon unavailable ({e}); scanning locally")
+                daemon = None
+        if tree is None:
+            tree = scan_tree(current_path, top_files=largest_count, **scan_options)
+        print_skipped_mounts(tree)
+        subdirs = [(tree.name(node), tree.path(node), tree.sizes[node])
+                   for node in tree.children(0)]
         
         # Filter directories above threshold
         filtered_subdirs = []
@@ -113,6 +542,7 @@ def interactive_scan(initial_path, unit):
         print("  c. Change starting directory")
         print("  h. Go to home directory")
         print("  r. Go to root directory")
+        print("  l. Show largest files")
         
         choice = input("Select a directory number to drill down, or an option: ").strip()
         
@@ -138,6 +568,9 @@ def interactive_scan(initial_path, unit):
         elif choice.lower() == "r":
             history = []
             current_path = "/"
+        elif choice.lower() == "l":
+            print_largest_files(tree, unit, limit=largest_count)
+            input("\nPress Enter to continue...")
         else:
             try:
                 idx = int(choice)
@@ -151,14 +584,218 @@ def interactive_scan(initial_path, unit):
                 else:
                     print("Invalid selection number.")
             except ValueError:
-                print("Please enter a valid number, 'b' to go back, 'c' to change directory, 'h' for home, or 'r' for root.")
+                print("Please enter a valid number, 'b' to go back, 'c' to change directory, 'h' for home, 'r' for root, or 'l' for largest files.")
 
-def main():
-    """Main function"""
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Arch Linux Storage Analyzer')
+    parser.add_argument('path', nargs='?', help='Directory to analyze')
+    parser.add_argument('--path', dest='path_option', metavar='PATH',
+                        help='Directory to analyze (same as the positional argument)')
+    parser.add_argument('--format', choices=['json', 'csv', 'ndjson'],
+                        help='Batch mode: stream directory sizes to stdout in this format and exit')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='Batch mode: report directories down to this depth below PATH (default: 1)')
+    parser.add_argument('--top', type=int, metavar='N',
+                        help='Batch mode: only the N largest directories, largest first')
+    parser.add_argument('--sort', choices=['walk', 'path'], default='walk',
+                        help='Batch record order: as each subtree finishes (walk, streamed) or by path, '
+                             'parents before children (external merge sort)')
+    parser.add_argument('--memory-budget', type=parse_size, metavar='SIZE',
+                        help='Keep batch mode and --save-snapshot within about SIZE of memory (e.g. 512M) '
+                             'by spilling to temporary files; with --processes only --sort path is bounded, '
+                             'not the workers\' own walks')
+    parser.add_argument('--processes', type=positive_int, metavar='N',
+                        help='Batch mode: walk subtrees in N worker processes (for arrays and several disks)')
+    parser.add_argument('--per-device', type=positive_int, metavar='N',
+                        help='With --processes, scan at most N subtrees of one device at a time')
+    parser.add_argument('--fail-above', type=parse_size, metavar='SIZE',
+                        help='Batch mode: exit with status 3 if a reported directory exceeds SIZE (e.g. 50G)')
+    parser.add_argument('--save-snapshot', nargs='?', const='', metavar='FILE',
+                        help=f'Save a snapshot of PATH and exit (default file under {DEFAULT_SNAPSHOT_DIR})')
+    parser.add_argument('--diff', metavar='SNAPSHOT',
+                        help='Show what changed between a snapshot or scan image and a fresh scan of PATH '
+                             '(default: the snapshot\'s own root)')
+    parser.add_argument('--against', metavar='SNAPSHOT',
+                        help='With --diff, compare with this later snapshot or scan image instead of a fresh scan')
+    parser.add_argument('--estimate', nargs='?', type=float, const=DEFAULT_ESTIMATE_SECONDS, metavar='SECONDS',
+                        help=f'Estimate top-level directory sizes by sampling within SECONDS '
+                             f'(default: {DEFAULT_ESTIMATE_SECONDS:g}), with 95%% confidence intervals')
+    parser.add_argument('--target', type=float, default=5.0, metavar='PCT',
+                        help='With --estimate, stop early once every interval is within PCT percent (default: 5)')
+    parser.add_argument('--exact-depth', type=int, default=DEFAULT_EXACT_DEPTH, metavar='N',
+                        help=f'With --estimate, list the first N levels in full (default: {DEFAULT_EXACT_DEPTH})')
+    parser.add_argument('--refine', action='store_true',
+                        help='With --estimate, continue into an exact scan and report each directory as it finishes')
+    parser.add_argument('--save-image', nargs='?', const='', metavar='FILE',
+                        help=f'Scan PATH and save a binary scan image that opens instantly (default: {DEFAULT_SNAPSHOT_DIR})')
+    parser.add_argument('--open', dest='open_image', metavar='IMAGE',
+                        help='Browse a saved scan image interactively instead of scanning')
+    parser.add_argument('--limit', type=int, default=20, metavar='N',
+                        help='Entries per section in --diff reports, runs shown by --history (default: 20)')
+    parser.add_argument('--record-history', action='store_true',
+                        help='Record directory sizes under PATH into the history database and exit')
+    parser.add_argument('--every', metavar='INTERVAL',
+                        help='With --record-history, keep running and record every INTERVAL (e.g. 6h, 1d)')
+    parser.add_argument('--history-depth', type=int, default=DEFAULT_HISTORY_DEPTH, metavar='N',
+                        help=f'Directory depth recorded by --record-history (default: {DEFAULT_HISTORY_DEPTH})')
+    parser.add_argument('--history', action='store_true',
+                        help='Print recorded sizes of PATH over time and exit')
+    parser.add_argument('--history-db', default=DEFAULT_HISTORY_DB, metavar='FILE',
+                        help=f'History database (default: {DEFAULT_HISTORY_DB})')
+    parser.add_argument('--largest', type=int, metavar='N',
+                        help='Print the N largest files under PATH and exit')
+    parser.add_argument('--duplicates', action='store_true',
+                        help='Find duplicate files under PATH and exit')
+    parser.add_argument('--ages', action='store_true',
+                        help='Print how much data under PATH has not been modified/accessed recently and exit')
+    parser.add_argument('--atime', action='store_true',
+                        help='Age files by last access instead of last modification (with --ages)')
+    parser.add_argument('--cold-days', type=int, choices=[30, 90, 365], default=90,
+                        help='Age that counts as cold in the --ages report (default: 90)')
+    parser.add_argument('--min-size', type=int, default=1024, metavar='BYTES',
+                        help='Ignore smaller files when looking for duplicates (default: 1024)')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='Processes for full-content hashing (default: CPU count)')
+    parser.add_argument('--mounts', action='store_true',
+                        help='Print space per mounted filesystem under PATH and exit')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Time the directory walker under PATH in each stat mode and exit')
+    parser.add_argument('--statx', action='store_true',
+                        help='Size files with a minimal statx(2) call (faster on network filesystems)')
+    parser.add_argument('--polite', action='store_true',
+                        help='Idle I/O priority, rate limits and pausing under I/O pressure, for busy servers')
+    parser.add_argument('--max-rate', type=int, default=2000, metavar='ENTRIES',
+                        help='Entries listed per second in --polite mode (default: 2000, 0 = unlimited)')
+    parser.add_argument('--max-iops', type=int, metavar='OPS',
+                        help='Stat calls and directory opens per second in --polite mode')
+    parser.add_argument('--pressure', type=float, default=10.0, metavar='PCT',
+                        help='Pause --polite scans while /proc/pressure/io "some avg10" is at least PCT (default: 10)')
+    parser.add_argument('-x', '--one-file-system', action='store_true',
+                        help='Stay on the filesystem PATH is on')
+    parser.add_argument('--all-filesystems', action='store_true',
+                        help='Also walk pseudo (/proc, /sys, tmpfs, ...), network and FUSE mounts')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help='Only count files matching GLOB (repeatable)')
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help='Skip files and directories matching GLOB (repeatable)')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Scan in this process even if the shared scan daemon is running')
+    parser.add_argument('--daemon-socket', default=DEFAULT_SOCKET, metavar='PATH',
+                        help=f'Scan daemon socket used in interactive mode (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print where the scan spent its time (phases, counters, slowest directories) to stderr')
+    parser.add_argument('--profile-stats', metavar='FILE',
+                        help='Also run under cProfile, print the top functions and save pstats data to FILE')
+    parser.add_argument('--unit', choices=['GB', 'MB', 'KB'], default='GB',
+                        help='Display unit for reports (default: GB)')
+    return parser.parse_args()
+
+def scan_options(args, profile=None):
+    """scan_tree keyword arguments from the command line"""
+    path_filter = PathFilter(args.include, args.exclude) if args.include or args.exclude else None
+    return {
+        'skip_virtual': not args.all_filesystems,
+        'one_file_system': args.one_file_system,
+        'path_filter': path_filter,
+        'use_statx': args.statx,
+        'throttle': PoliteThrottle(args.max_rate or None, args.max_iops, args.pressure) if args.polite else None,
+        'profile': profile,
+    }
+
+def daemon_client(args):
+    """Connection to the shared scan daemon, if one is running and the walk options are its defaults"""
+    if args.no_daemon or args.include or args.exclude or args.one_file_system or args.all_filesystems \
+            or args.statx or args.profile or args.profile_stats:
+        return None
+    return DaemonClient.connect(args.daemon_socket)
+
+def run(args, profile=None):
+    """Run the mode chosen on the command line"""
+    options = scan_options(args, profile)
+    args.path = args.path_option or args.path
+    
+    if args.against and not args.diff:
+        print("--against needs --diff", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if args.diff:
+        snapshots = [args.diff] + ([args.against] if args.against else [])
+        for snapshot in snapshots:
+            if not os.path.isfile(snapshot):
+                print(f"Not a snapshot file: '{snapshot}'", file=sys.stderr)
+                sys.exit(EXIT_ERROR)
+        path = os.path.abspath(args.path) if args.path else None
+        if path and not args.against and not os.path.isdir(path):
+            print(f"Invalid directory '{path}'", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        diff_report(snapshots, path, args.unit, args.limit, options)
+        return
+    
+    if args.record_history or args.history:
+        path = os.path.abspath(args.path or os.path.expanduser("~"))
+        if args.record_history:
+            if not os.path.isdir(path):
+                print(f"Invalid directory '{path}'", file=sys.stderr)
+                sys.exit(EXIT_ERROR)
+            record_history_report(path, args.history_db, args.history_depth, args.every, options)
+        if args.history:
+            history_report(path, args.history_db, args.unit, args.limit)
+        return
+    
+    if args.estimate is not None:
+        path = os.path.abspath(args.path or os.path.expanduser("~"))
+        if not os.path.isdir(path):
+            print(f"Invalid directory '{path}'", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        estimate_report(path, args.unit, args.estimate, args.target / 100, args.exact_depth, args.refine,
+                        args.limit, options)
+        return
+    
+    if args.format:
+        path = os.path.abspath(args.path or os.path.expanduser("~"))
+        if not os.path.isdir(path):
+            print(f"Invalid directory '{path}'", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        if args.processes and args.polite:
+            print("--processes cannot be combined with --polite", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+        sys.exit(batch_report(path, args.format, args.depth, args.top, args.fail_above, options,
+                              args.sort, args.memory_budget, args.processes, args.per_device))
+    
+    if args.largest or args.duplicates or args.ages or args.mounts or args.benchmark \
+            or args.save_snapshot is not None or args.save_image is not None:
+        path = os.path.abspath(args.path or os.path.expanduser("~"))
+        if not os.path.isdir(path):
+            print(f"Invalid directory '{path}'")
+            sys.exit(1)
+        if args.largest:
+            largest_files_report(path, args.unit, args.largest, options)
+        if args.duplicates:
+            duplicates_report(path, args.unit, args.min_size, args.workers, options)
+        if args.ages:
+            age_report(path, args.unit, 'atime' if args.atime else 'mtime', args.cold_days, options)
+        if args.mounts:
+            mounts_report(path, args.unit, options)
+        if args.benchmark:
+            benchmark_report(path, options)
+        if args.save_snapshot is not None:
+            save_snapshot_report(path, args.save_snapshot, options, args.memory_budget)
+        if args.save_image is not None:
+            save_image_report(path, args.save_image, options)
+        return
+    
+    image = None
+    if args.open_image:
+        try:
+            image = open_image(args.open_image)
+        except (OSError, ImageError) as e:
+            print(f"Cannot open scan image: {e}", file=sys.stderr)
+            sys.exit(EXIT_ERROR)
+    
     print("=== Arch Linux Storage Analyzer ===")
     print("Interactive directory size scanner\n")
     
-    if not is_root():
+    if image is None and not is_root():
         print("INFO: Running as regular user. Some system directories may be inaccessible.")
         print("      Run with 'sudo' for full system access.")
         cont = input("Continue? (Y/n): ").strip().lower()
@@ -183,6 +820,14 @@ def main():
         print("Invalid choice. Defaulting to GB.")
         unit = "GB"
     
+    if image is not None:
+        start_dir = image.root_path
+        if args.path and image.find(args.path) is not None:
+            start_dir = os.path.abspath(args.path)
+        print(f"\nBrowsing scan image of {image.root_path} from {time.ctime(image.scanned_at)}")
+        interactive_scan(start_dir, unit, scan_options=options, daemon=daemon_client(args), image=image)
+        return
+    
     # Starting directory selection
     print("\nStarting directory options:")
     print("  1. Root directory (/)")
@@ -211,7 +856,28 @@ def main():
     start_dir = os.path.abspath(start_dir)
     print(f"\nStarting analysis from: {start_dir}")
     
-    interactive_scan(start_dir, unit)
+    daemon = daemon_client(args)
+    if daemon is not None:
+        print(f"Using the shared scan daemon at {daemon.socket_path}")
+    interactive_scan(start_dir, unit, scan_options=options, daemon=daemon)
+
+def main():
+    """Main function"""
+    args = parse_args()
+    if not (args.profile or args.profile_stats):
+        run(args)
+        return
+    
+    # The summary goes to stderr so batch output on stdout stays machine-readable
+    profile = ScanProfile()
+    try:
+        with profile_calls(args.profile_stats, out=sys.stderr) if args.profile_stats else nullcontext():
+            run(args, profile)
+    finally:
+        print("\n".join(profile.summary()), file=sys.stderr)
+        if args.profile_stats:
+            print(f"cProfile statistics written to {args.profile_stats} (python -m pstats {args.profile_stats})",
+                  file=sys.stderr)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file